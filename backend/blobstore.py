@@ -0,0 +1,95 @@
+"""Content-addressed local blob store for media derived from uploads.
+
+Blobs are keyed by the SHA-256 of their bytes plus an extension, and laid
+out in two levels of hash-prefix directories (``ab/cd/abcd...webp``) so no
+directory grows unbounded. Identical content is stored once. Keys are safe
+to put in URLs, and because content never changes under a key the blobs can
+be cached forever.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]{1,8})?$")
+
+
+class InvalidBlobKey(ValueError):
+    pass
+
+
+class LocalBlobStore:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    @staticmethod
+    def make_key(digest: str, extension: str = "") -> str:
+        return digest + (f".{extension.lstrip('.')}" if extension else "")
+
+    def path(self, key: str) -> Path:
+        if not _KEY_RE.match(key):
+            raise InvalidBlobKey(key)
+        return self.root / key[:2] / key[2:4] / key
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).is_file()
+
+    def put(self, data: bytes, extension: str = "", digest: Optional[str] = None) -> str:
+        """Store ``data`` and return its key"""
+        key = self.make_key(digest or hashlib.sha256(data).hexdigest(), extension)
+        target = self.path(key)
+        if target.exists():
+            return key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so readers never see partial blobs
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return key
+
+    def staging_file(self, suffix: str = "") -> Path:
+        """Empty temp file on the store's filesystem, for ``put_file``"""
+        staging = self.root / ".staging"
+        staging.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=staging, suffix=suffix)
+        os.close(fd)
+        return Path(name)
+
+    def put_file(self, source: Path, extension: str = "", digest: Optional[str] = None) -> str:
+        """Move an already written file (see ``staging_file``) into the store"""
+        if digest is None:
+            h = hashlib.sha256()
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            digest = h.hexdigest()
+        key = self.make_key(digest, extension)
+        target = self.path(key)
+        if target.exists():
+            os.unlink(source)
+            return key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+        return key
+
+    def get(self, key: str) -> bytes:
+        return self.path(key).read_bytes()
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+def blob_url(key: str) -> str:
+    """Public URL of a blob; MEDIA_BASE_URL lets a CDN front the store"""
+    return f"{os.environ.get('MEDIA_BASE_URL', '')}/api/blobs/{key}"
@@ -0,0 +1,94 @@
+"""In-process caches warmed at startup.
+
+``UserSummaryCache`` holds the few user fields that video listings are
+enriched with (name, username). They never change after registration, so
+entries only age out to bound memory. ``PageCache`` keeps rendered listing
+pages for a few seconds, which absorbs the burst of identical first-page
+requests every client makes on load.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+SUMMARY_FIELDS = {"_id": 0, "id": 1, "name": 1, "username": 1}
+
+
+class UserSummaryCache:
+    """LRU of ``{id, name, username}`` by user id"""
+
+    def __init__(self, users, max_size: int = 10000, ttl: float = 600):
+        self.users = users
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, user: Dict):
+        self._entries[user["id"]] = (time.monotonic() + self.ttl, {key: user.get(key) for key in ("id", "name", "username")})
+        self._entries.move_to_end(user["id"])
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _cached(self, user_id: str) -> Optional[Dict]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[1]
+
+    async def get_many(self, user_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Summaries by id; misses are fetched with one ``$in`` query"""
+        found, missing = {}, []
+        for user_id in set(user_ids):
+            summary = self._cached(user_id)
+            if summary is None:
+                missing.append(user_id)
+            else:
+                found[user_id] = summary
+        if missing:
+            for user in await self.users.find({"id": {"$in": missing}}, SUMMARY_FIELDS).to_list(len(missing)):
+                self.put(user)
+                found[user["id"]] = self._cached(user["id"])
+        return found
+
+    async def warm(self, limit: int = 1000) -> int:
+        """Load the most recently registered users"""
+        users = await self.users.find({}, SUMMARY_FIELDS).sort("created_at", -1).limit(limit).to_list(limit)
+        for user in users:
+            self.put(user)
+        return len(users)
+
+
+class PageCache:
+    """Short-lived cache of rendered pages, dropped wholesale on writes"""
+
+    def __init__(self, ttl: float = 5, max_size: int = 64):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._pages: Dict[Hashable, tuple] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._pages.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        if len(self._pages) >= self.max_size:
+            self._pages.clear()
+        self._pages[key] = (time.monotonic() + self.ttl, value)
+
+    async def get_or_load(self, key: Hashable, load: Callable) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = await load()
+            self.put(key, value)
+        return value
+
+    def invalidate(self):
+        self._pages.clear()
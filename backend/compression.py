@@ -0,0 +1,170 @@
+"""Negotiated response compression.
+
+``CompressionMiddleware`` compresses compressible responses with brotli or
+gzip, streamed ones chunk by chunk. Media, ranges, already-encoded responses
+and Server-Sent Events are left alone.
+"""
+import zlib
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/vnd.apple.mpegurl",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+NEVER_COMPRESSED_TYPES = ("text/event-stream",)
+UNCOMPRESSED_STATUSES = {204, 206, 304}
+
+
+def accepted_encodings(accept_encoding: str) -> List[Tuple[str, float]]:
+    encodings = []
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            encodings.append((name.strip().lower(), quality))
+    return encodings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """``br`` or ``gzip``, whichever the client prefers; br wins ties"""
+    available = ("br", "gzip") if brotli is not None else ("gzip",)
+    qualities = {}
+    for name, quality in accepted_encodings(accept_encoding):
+        if name == "*":
+            for encoding in available:
+                qualities.setdefault(encoding, quality)
+        elif name in available:
+            qualities[name] = quality
+    candidates = [(quality, encoding == "br") for encoding, quality in qualities.items() if quality > 0]
+    if not candidates:
+        return None
+    return "br" if max(candidates)[1] else "gzip"
+
+
+def compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    if content_type.startswith(NEVER_COMPRESSED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        out = self._compressor.process(data)
+        return out + self._compressor.flush() if flush else out
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing eligible responses for the client"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compressor(self, encoding: str):
+        return _Brotli(self.brotli_quality) if encoding == "br" else _Gzip(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if (message["status"] in UNCOMPRESSED_STATUSES or "content-encoding" in headers
+                        or not compressible(headers.get("content-type", ""))):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Wait for the first body message to see whether it is worth it
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=list(start_message.get("headers", [])))
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    start_message["headers"] = headers.raw
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = self._compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                if not more_body:
+                    body = compressor.compress(body, False) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    start_message["headers"] = headers.raw
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                start_message["headers"] = headers.raw
+                await send(start_message)
+
+            if more_body:
+                chunk = compressor.compress(body, True)
+            else:
+                chunk = compressor.compress(body, False) + compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
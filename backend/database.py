@@ -0,0 +1,184 @@
+"""Mongo client lifecycle and per-operation-class database handles.
+
+The client is created by the application lifespan, so each uvicorn worker
+opens its own pool (sized by the ``MONGO_*`` settings in ``client_options``).
+``db`` does primary reads and acknowledged writes, ``feed_db`` serves reads
+that tolerate replication lag, ``durable_db`` makes majority writes.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ReadPreference
+from pymongo.read_preferences import Nearest, PrimaryPreferred, Secondary, SecondaryPreferred
+from pymongo.write_concern import WriteConcern
+
+logger = logging.getLogger(__name__)
+
+# Replaced by the benchmark harness to run against mongomock
+client_factory = AsyncIOMotorClient
+
+_client = None
+_database = None
+_derived: Dict[tuple, object] = {}
+
+WRITE_CONCERNS = {
+    "durable": WriteConcern(w="majority", wtimeout=5000),
+}
+
+
+class DatabaseNotReady(RuntimeError):
+    pass
+
+
+class UniqueIndexError(RuntimeError):
+    """A unique index could not be created, so its constraint is not enforced"""
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, str(default)))
+
+
+def client_options() -> Dict:
+    return {
+        "maxPoolSize": _env_int('MONGO_MAX_POOL_SIZE', 100),
+        "minPoolSize": _env_int('MONGO_MIN_POOL_SIZE', 10),
+        "maxConnecting": _env_int('MONGO_MAX_CONNECTING', 4),
+        "maxIdleTimeMS": _env_int('MONGO_MAX_IDLE_TIME_MS', 300000),
+        "serverSelectionTimeoutMS": _env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        "connectTimeoutMS": _env_int('MONGO_CONNECT_TIMEOUT_MS', 5000),
+        "socketTimeoutMS": _env_int('MONGO_SOCKET_TIMEOUT_MS', 30000),
+        "retryWrites": True,
+        "appname": "renzo-api",
+    }
+
+
+def feed_read_preference():
+    mode = os.environ.get('MONGO_FEED_READ_PREFERENCE', 'secondaryPreferred')
+    if mode == "primary":
+        return ReadPreference.PRIMARY
+    modes = {
+        "primaryPreferred": PrimaryPreferred,
+        "secondary": Secondary,
+        "secondaryPreferred": SecondaryPreferred,
+        "nearest": Nearest,
+    }
+    if mode not in modes:
+        raise ValueError(f"Unknown MONGO_FEED_READ_PREFERENCE {mode!r}")
+    return modes[mode](max_staleness=_env_int('MONGO_FEED_MAX_STALENESS_SECONDS', 90))
+
+
+def connect(event_listeners: Optional[List] = None, url: Optional[str] = None, name: Optional[str] = None):
+    """Create this worker's client; called from the application lifespan"""
+    global _client, _database
+    if _client is not None:
+        return _client
+    _client = client_factory(
+        url or os.environ['MONGO_URL'], event_listeners=event_listeners or [], **client_options()
+    )
+    _database = _client[name or os.environ['DB_NAME']]
+    _derived.clear()
+    return _client
+
+
+async def ping(attempts: int = 5, delay: float = 0.5):
+    """Wait until the deployment answers, backing off between attempts"""
+    for attempt in range(1, attempts + 1):
+        try:
+            await get_client().admin.command("ping")
+            return
+        except Exception:
+            if attempt == attempts:
+                raise
+            await asyncio.sleep(delay * 2 ** (attempt - 1))
+
+
+async def create_indexes(collection, indexes: List[IndexModel]):
+    """Create each index on its own so one failure does not skip the rest
+
+    Failures are logged; if a unique index failed, ``UniqueIndexError`` is
+    raised once all of them have been tried.
+    """
+    results = await asyncio.gather(
+        *(collection.create_indexes([index]) for index in indexes), return_exceptions=True
+    )
+    failed_unique = []
+    for index, result in zip(indexes, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to create index {index.document['name']} on {collection.name}: {result}")
+            if index.document.get("unique"):
+                failed_unique.append(index.document["name"])
+    if failed_unique:
+        raise UniqueIndexError(f"Unique indexes {', '.join(failed_unique)} on {collection.name} are missing")
+
+
+def close():
+    global _client, _database
+    if _client is not None:
+        _client.close()
+    _client = _database = None
+    _derived.clear()
+
+
+def get_client():
+    if _client is None:
+        raise DatabaseNotReady("Mongo client is not connected yet")
+    return _client
+
+
+def get_database(reads: Optional[str] = None, writes: Optional[str] = None):
+    """The live database, optionally with a read preference and write concern"""
+    if _database is None:
+        raise DatabaseNotReady("Mongo client is not connected yet")
+    if reads is None and writes is None:
+        return _database
+    key = (reads, writes)
+    database = _derived.get(key)
+    if database is None:
+        options = {}
+        if reads == "feed":
+            options["read_preference"] = feed_read_preference()
+        if writes is not None:
+            options["write_concern"] = WRITE_CONCERNS[writes]
+        database = _derived[key] = _database.with_options(**options)
+    return database
+
+
+class CollectionProxy:
+    """Stands in for a collection until the client exists"""
+
+    def __init__(self, database: "DatabaseProxy", name: str):
+        self._database = database
+        self._name = name
+
+    def __getattr__(self, attribute):
+        return getattr(self._database.resolve()[self._name], attribute)
+
+
+class DatabaseProxy:
+    """Module level ``db`` handle that follows the lifespan-managed client"""
+
+    def __init__(self, reads: Optional[str] = None, writes: Optional[str] = None):
+        self._reads = reads
+        self._writes = writes
+
+    def resolve(self):
+        return get_database(self._reads, self._writes)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return CollectionProxy(self, name)
+
+    def __getitem__(self, name):
+        return CollectionProxy(self, name)
+
+    async def command(self, *args, **kwargs):
+        return await self.resolve().command(*args, **kwargs)
+
+
+db = DatabaseProxy()
+feed_db = DatabaseProxy(reads="feed")
+durable_db = DatabaseProxy(writes="durable")
@@ -0,0 +1,144 @@
+"""Filtered talent and video discovery backed by compound indexes.
+
+Indexes follow the equality, sort, range rule, and filters that are left
+out are expanded to ``$in`` over every known value, so every supported
+combination is answered from an index without a blocking sort
+(``benchmarks/index_coverage.py`` checks this against a real MongoDB).
+"""
+import itertools
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pymongo import IndexModel
+
+from database import create_indexes
+
+PROFILE_TYPES = ["dancer", "musician", "director", "fan"]
+VERIFICATION_STATUSES = ["pending", "verified", "rejected"]
+CATEGORIES = ["solo", "group", "duet", "rehearsal", "performance"]
+SORTS = ("rating", "recent")
+MAX_TAGS = 5
+
+
+def _ladder(prefix: List[str], rating_field: str) -> List[List[Tuple[str, int]]]:
+    keys = [(field, 1) for field in prefix]
+    return [
+        keys + [(rating_field, -1), ("id", 1)],
+        keys + [("created_at", -1), ("id", 1)],
+    ]
+
+
+USER_INDEXES = (
+    _ladder(["profile_type", "verification_status"], "skill_rating")
+    + _ladder(["tags", "profile_type", "verification_status"], "skill_rating")
+)
+VIDEO_INDEXES = (
+    _ladder(["category", "verification_status"], "ai_skill_rating")
+    + _ladder(["ai_generated_tags", "category", "verification_status"], "ai_skill_rating")
+    + _ladder(["genre", "category", "verification_status"], "ai_skill_rating")
+)
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def _one_of(value: Optional[str], known: List[str]):
+    return value if value else {"$in": known}
+
+
+def _tags(tags: Optional[List[str]]):
+    tags = [tag for tag in (tags or []) if tag]
+    if len(tags) > MAX_TAGS:
+        raise InvalidFilter(f"At most {MAX_TAGS} tags")
+    return {"$all": tags} if tags else None
+
+
+def _rating_range(min_rating: Optional[float], max_rating: Optional[float]):
+    if min_rating is not None and max_rating is not None and min_rating > max_rating:
+        raise InvalidFilter("min_rating is greater than max_rating")
+    bounds = {}
+    if min_rating is not None:
+        bounds["$gte"] = min_rating
+    if max_rating is not None:
+        bounds["$lte"] = max_rating
+    return bounds or None
+
+
+def _sort(sort: str, rating_field: str) -> List[Tuple[str, int]]:
+    if sort not in SORTS:
+        raise InvalidFilter(f"sort must be one of {', '.join(SORTS)}")
+    return [(rating_field if sort == "rating" else "created_at", -1), ("id", 1)]
+
+
+def user_query(profile_type: Optional[str] = None, verification_status: Optional[str] = None,
+               tags: Optional[List[str]] = None, min_rating: Optional[float] = None,
+               max_rating: Optional[float] = None, sort: str = "rating") -> Tuple[Dict, List]:
+    """Filter and sort for a discovery query over users"""
+    query = {
+        "profile_type": _one_of(profile_type, PROFILE_TYPES),
+        "verification_status": _one_of(verification_status, VERIFICATION_STATUSES),
+    }
+    tag_filter = _tags(tags)
+    if tag_filter:
+        query["tags"] = tag_filter
+    rating = _rating_range(min_rating, max_rating)
+    if rating:
+        query["skill_rating"] = rating
+    return query, _sort(sort, "skill_rating")
+
+
+def video_query(category: Optional[str] = None, genre: Optional[str] = None,
+                verification_status: Optional[str] = None, tags: Optional[List[str]] = None,
+                min_rating: Optional[float] = None, max_rating: Optional[float] = None,
+                sort: str = "rating") -> Tuple[Dict, List]:
+    """Filter and sort for a discovery query over videos"""
+    query = {
+        "category": _one_of(category, CATEGORIES),
+        "verification_status": _one_of(verification_status, VERIFICATION_STATUSES),
+    }
+    if genre:
+        query["genre"] = genre
+    tag_filter = _tags(tags)
+    if tag_filter:
+        query["ai_generated_tags"] = tag_filter
+    rating = _rating_range(min_rating, max_rating)
+    if rating:
+        query["ai_skill_rating"] = rating
+    return query, _sort(sort, "ai_skill_rating")
+
+
+async def ensure_discovery_indexes(db):
+    await create_indexes(db.users, [IndexModel(keys) for keys in USER_INDEXES])
+    await create_indexes(db.videos, [IndexModel(keys) for keys in VIDEO_INDEXES])
+
+
+def _combinations(options: Dict[str, list]) -> Iterator[Dict]:
+    names = list(options)
+    for values in itertools.product(*(options[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def supported_user_queries() -> Iterator[Tuple[Dict, Dict, List]]:
+    """Every supported shape: (arguments, filter, sort)"""
+    for args in _combinations({
+        "profile_type": [None, "dancer"],
+        "verification_status": [None, "verified"],
+        "tags": [None, ["contemporary"], ["contemporary", "ballet"]],
+        "min_rating": [None, 7.0],
+        "max_rating": [None, 9.0],
+        "sort": list(SORTS),
+    }):
+        yield (args, *user_query(**args))
+
+
+def supported_video_queries() -> Iterator[Tuple[Dict, Dict, List]]:
+    for args in _combinations({
+        "category": [None, "solo"],
+        "genre": [None, "jazz"],
+        "verification_status": [None, "verified"],
+        "tags": [None, ["contemporary"], ["contemporary", "ballet"]],
+        "min_rating": [None, 7.0],
+        "max_rating": [None, 9.0],
+        "sort": list(SORTS),
+    }):
+        yield (args, *video_query(**args))
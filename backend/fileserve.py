@@ -0,0 +1,106 @@
+"""Zero-copy file responses for media stored in the local blob store.
+
+When the ASGI server implements the ``http.response.zerocopysend``
+extension the file descriptor is handed over and the kernel sends the bytes
+with ``sendfile``. Otherwise the file is memory-mapped and the response
+body is a sequence of ``memoryview`` slices of the mapping, so media bytes
+are never copied into Python ``bytes`` objects on the way to the socket.
+"""
+import mmap
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.responses import Response
+
+import media
+
+CHUNK_SIZE = 1 << 20
+
+
+class ZeroCopyFileResponse(Response):
+    """Sends ``count`` bytes of ``path`` starting at ``offset``"""
+
+    def __init__(self, path, offset: int, count: int, status_code: int = 200,
+                 headers: Optional[Dict[str, str]] = None, media_type: Optional[str] = None,
+                 chunk_size: int = CHUNK_SIZE):
+        self.path = str(path)
+        self.offset = offset
+        self.count = count
+        self.chunk_size = chunk_size
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        headers = dict(headers or {})
+        headers["Content-Length"] = str(count)
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD" or self.count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            if "http.response.zerocopysend" in (scope.get("extensions") or {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": fd,
+                    "offset": self.offset,
+                    "count": self.count,
+                })
+                return
+            await self._send_mapped(fd, send)
+        finally:
+            os.close(fd)
+
+    async def _send_mapped(self, fd: int, send):
+        mapping = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        if hasattr(mapping, "madvise"):
+            mapping.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapping)
+        try:
+            position, end = self.offset, self.offset + self.count
+            while position < end:
+                next_position = min(end, position + self.chunk_size)
+                await send({
+                    "type": "http.response.body",
+                    "body": view[position:next_position],
+                    "more_body": next_position < end,
+                })
+                position = next_position
+        finally:
+            view.release()
+            try:
+                mapping.close()
+            except BufferError:
+                # The server still holds a slice in its write buffer, the
+                # mapping is closed when that is garbage collected
+                pass
+
+
+def file_mtime(path) -> datetime:
+    return datetime.fromtimestamp(os.stat(path).st_mtime, tz=timezone.utc)
+
+
+def conditional_file_response(request, path: Path, size: int, etag: str, last_modified: datetime,
+                              media_type: Optional[str]) -> Response:
+    """304/416/206/200 for ``path`` according to the request's validators and Range"""
+    headers = media.validator_headers(etag, last_modified)
+    if media.not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if media.if_range_matches(request.headers, etag, last_modified):
+        try:
+            byte_range = media.parse_range(request.headers.get("range"), size)
+        except media.RangeNotSatisfiable:
+            return Response(status_code=416, headers=dict(headers, **{"Content-Range": f"bytes */{size}"}))
+
+    if byte_range is None:
+        return ZeroCopyFileResponse(path, 0, size, headers=headers, media_type=media_type)
+    start, end = byte_range
+    headers["Content-Range"] = media.content_range(start, end, size)
+    return ZeroCopyFileResponse(path, start, end - start + 1, status_code=206, headers=headers, media_type=media_type)
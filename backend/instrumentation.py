@@ -0,0 +1,421 @@
+"""Request-level latency, Mongo round-trip and LLM call instrumentation.
+
+Every HTTP request gets a ``RequestStats`` object stored in a context
+variable. The Mongo command listener and the LLM tracking helper add to it
+while the request runs, and the ASGI middleware folds it into the process
+wide ``Registry`` once the response is sent. The registry renders the
+Prometheus text exposition format for the ``/metrics`` endpoint.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+import bson
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+BACKGROUND_ROUTE = "<background>"
+UNMATCHED_ROUTE = "<unmatched>"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class RequestStats:
+    """Counters collected while a single request is being served"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+        self.mongo_reply_bytes = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def add_mongo(self, seconds: float, reply_bytes: float):
+        # Listener callbacks run on Motor's executor threads
+        with self._lock:
+            self.mongo_commands += 1
+            self.mongo_seconds += seconds
+            self.mongo_reply_bytes += reply_bytes
+
+    def add_llm(self, seconds: float):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        app_seconds = max(0.0, total_seconds - self.mongo_seconds - self.llm_seconds)
+        return ", ".join([
+            f'mongo;dur={self.mongo_seconds * 1000:.1f};'
+            f'desc="{self.mongo_commands} commands, ~{self.mongo_reply_bytes:.0f} reply bytes"',
+            f'llm;dur={self.llm_seconds * 1000:.1f};desc="{self.llm_calls} calls"',
+            f"app;dur={app_seconds * 1000:.1f}",
+        ])
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+_current_route: ContextVar[str] = ContextVar("request_route", default=BACKGROUND_ROUTE)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current_stats.get()
+
+
+def current_route() -> str:
+    return _current_route.get()
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+class Registry:
+    """Minimal thread-safe store of counters and histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._bucket_specs: Dict[str, Sequence[float]] = {}
+        self._gauges: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str):
+        self._help[name] = ("counter", help_text)
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float]):
+        self._help[name] = ("histogram", help_text)
+        self._histograms.setdefault(name, {})
+        self._bucket_specs[name] = buckets
+
+    def gauge(self, name: str, help_text: str, collect):
+        """Register a gauge whose samples come from ``collect() -> [(labels, value)]``"""
+        self._help[name] = ("gauge", help_text)
+        self._gauges[name] = collect
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1.0):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Dict[str, str], value: float):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms[name]
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self._bucket_specs[name])
+            hist.observe(value)
+
+    def snapshot(self) -> Dict[str, Dict[Labels, float]]:
+        """Copy of all counters, mainly for tests and benchmarks"""
+        with self._lock:
+            return {name: dict(series) for name, series in self._counters.items()}
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in self._help.items():
+                if kind == "gauge":
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for labels, value in self._counters[name].items():
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                elif kind == "histogram":
+                    for labels, hist in self._histograms[name].items():
+                        cumulative = 0
+                        for bound, count in zip(hist.buckets, hist.counts):
+                            cumulative += count
+                            le = labels + (("le", _format_value(bound)),)
+                            lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+                        inf = labels + (("le", "+Inf"),)
+                        lines.append(f"{name}_bucket{_format_labels(inf)} {hist.total}")
+                        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(hist.sum)}")
+                        lines.append(f"{name}_count{_format_labels(labels)} {hist.total}")
+        # Gauges are collected outside the lock, their callbacks may be slow
+        for name, collect in self._gauges.items():
+            try:
+                samples = collect()
+            except Exception as e:
+                logger.warning(f"Gauge {name} collection failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {self._help[name][1]}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                key = tuple(sorted(labels.items()))
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+REGISTRY.counter("renzo_http_requests_total", "HTTP requests by route and status")
+REGISTRY.histogram("renzo_http_request_duration_seconds", "HTTP request latency by route", LATENCY_BUCKETS)
+REGISTRY.histogram("renzo_http_response_size_bytes", "HTTP response body size by route", SIZE_BUCKETS)
+REGISTRY.histogram("renzo_mongo_commands_per_request", "Mongo commands issued per HTTP request", COUNT_BUCKETS)
+REGISTRY.histogram("renzo_mongo_reply_bytes_per_request",
+                   "BSON bytes returned by Mongo per HTTP request, estimated from a sample", SIZE_BUCKETS)
+REGISTRY.counter("renzo_mongo_commands_total", "Mongo commands by route and command name")
+REGISTRY.counter("renzo_mongo_command_seconds_total", "Time spent in Mongo commands by route")
+REGISTRY.counter("renzo_mongo_reply_bytes_total", "BSON bytes returned by Mongo by route, estimated from a sample")
+REGISTRY.counter("renzo_mongo_command_failures_total", "Failed Mongo commands by route and command name")
+REGISTRY.counter("renzo_llm_calls_total", "LLM calls by route, operation and outcome")
+REGISTRY.histogram("renzo_llm_call_duration_seconds", "LLM call latency by operation", LATENCY_BUCKETS)
+REGISTRY.histogram("renzo_mongo_pool_wait_seconds", "Time spent waiting to check out a pooled connection",
+                   LATENCY_BUCKETS)
+REGISTRY.counter("renzo_mongo_pool_checkout_failures_total", "Failed connection checkouts by reason")
+REGISTRY.counter("renzo_requests_rejected_total", "Requests refused by rate limits and admission control")
+REGISTRY.counter("renzo_circuit_rejected_total", "Calls failed fast by an open circuit breaker")
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Attributes every Mongo round trip to the request that issued it
+
+    Reply sizes are only known by re-encoding the reply, which doubles the
+    BSON work for large listings, so they are measured for a
+    ``reply_bytes_sample_rate`` fraction of commands (1% by default) and
+    scaled up to an estimate.
+    """
+
+    def __init__(self, registry: Registry = REGISTRY, reply_bytes_sample_rate: float = 0.01):
+        self.registry = registry
+        self.reply_bytes_sample_rate = reply_bytes_sample_rate
+
+    def started(self, event):
+        pass
+
+    def _reply_bytes(self, event) -> float:
+        rate = self.reply_bytes_sample_rate
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return 0
+        return len(bson.encode(event.reply)) / min(rate, 1.0)
+
+    def succeeded(self, event):
+        seconds = event.duration_micros / 1e6
+        reply_bytes = self._reply_bytes(event)
+        route = current_route()
+        stats = current_stats()
+        if stats is not None:
+            stats.add_mongo(seconds, reply_bytes)
+        labels = {"route": route, "command": event.command_name}
+        self.registry.inc("renzo_mongo_commands_total", labels)
+        self.registry.inc("renzo_mongo_command_seconds_total", {"route": route}, seconds)
+        if reply_bytes:
+            self.registry.inc("renzo_mongo_reply_bytes_total", {"route": route}, reply_bytes)
+
+    def failed(self, event):
+        stats = current_stats()
+        if stats is not None:
+            stats.add_mongo(event.duration_micros / 1e6, 0)
+        self.registry.inc(
+            "renzo_mongo_command_failures_total",
+            {"route": current_route(), "command": event.command_name},
+        )
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Connection pool utilization and checkout waits per server"""
+
+    def __init__(self, registry: Registry = REGISTRY):
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Dict[str, int]] = {}
+        # Checkouts are synchronous within one Motor executor thread
+        self._local = threading.local()
+        registry.gauge("renzo_mongo_pool_connections", "Pooled Mongo connections by server and state",
+                       self.collect)
+
+    def collect(self):
+        with self._lock:
+            return [
+                ({"address": address, "state": state}, value)
+                for address, pool in self._pools.items()
+                for state, value in pool.items()
+            ]
+
+    def _pool(self, address) -> Dict[str, int]:
+        return self._pools.setdefault("%s:%s" % address, {"open": 0, "checked_out": 0, "max": 0})
+
+    def _adjust(self, address, state: str, delta: int):
+        with self._lock:
+            self._pool(address)[state] += delta
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)["max"] = (event.options or {}).get("maxPoolSize", 0)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        self._adjust(event.address, "open", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._adjust(event.address, "open", -1)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        self.registry.inc("renzo_mongo_pool_checkout_failures_total", {"reason": str(event.reason)})
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            self._local.started = None
+            self.registry.observe("renzo_mongo_pool_wait_seconds", {}, time.perf_counter() - started)
+        self._adjust(event.address, "checked_out", 1)
+
+    def connection_checked_in(self, event):
+        self._adjust(event.address, "checked_out", -1)
+
+
+@asynccontextmanager
+async def track_llm(operation: str, registry: Registry = REGISTRY):
+    """Time an LLM call and attribute it to the current request"""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        stats = current_stats()
+        if stats is not None:
+            stats.add_llm(seconds)
+        registry.inc(
+            "renzo_llm_calls_total",
+            {"route": current_route(), "operation": operation, "outcome": outcome},
+        )
+        registry.observe("renzo_llm_call_duration_seconds", {"operation": operation}, seconds)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware recording per-route latency, size and round trips"""
+
+    def __init__(self, app, registry: Registry = REGISTRY, server_timing: bool = False):
+        self.app = app
+        self.registry = registry
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        stats_token = _current_stats.set(stats)
+        # The route is only known once the router has matched, until then
+        # round trips are attributed to the raw path
+        route_token = _current_route.set(scope.get("path", UNMATCHED_ROUTE))
+        start = time.perf_counter()
+        status_code = 500
+        response_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    message["headers"] = list(message.get("headers", []))
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append("Server-Timing", stats.server_timing(time.perf_counter() - start))
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_stats.reset(stats_token)
+            _current_route.reset(route_token)
+            self._record(scope, status_code, elapsed, response_bytes, stats)
+
+    def _record(self, scope, status_code, elapsed, response_bytes, stats):
+        route = _route_template(scope)
+        labels = {"method": scope.get("method", ""), "route": route}
+        self.registry.inc("renzo_http_requests_total", dict(labels, status=str(status_code)))
+        self.registry.observe("renzo_http_request_duration_seconds", labels, elapsed)
+        self.registry.observe("renzo_http_response_size_bytes", labels, response_bytes)
+        self.registry.observe("renzo_mongo_commands_per_request", labels, stats.mongo_commands)
+        self.registry.observe("renzo_mongo_reply_bytes_per_request", labels, stats.mongo_reply_bytes)
+
+
+class InstrumentedRoute(APIRoute):
+    """Route class that labels round trips with the matched route template
+
+    Middleware runs before routing, so the route is only known inside the
+    handler. Setting it here lets Mongo and LLM counters carry the template
+    (``/api/videos/{video_id}``) instead of the raw path.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path = self.path
+
+        async def instrumented_handler(request):
+            _current_route.set(path)
+            return await handler(request)
+
+        return instrumented_handler
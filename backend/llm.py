@@ -0,0 +1,167 @@
+"""LLM provider access for the AI helpers.
+
+``LLM_PROVIDER`` is ``emergentintegrations`` (default), ``openai`` (opt-in,
+a pooled httpx client for the Chat Completions API, needs a real OpenAI key)
+or ``stub`` (canned responses, for running and benchmarking offline). Calls
+run under a deadline with retries behind a circuit breaker; while it is open
+``complete`` raises ``CircuitOpen`` and the helpers serve their fallbacks.
+"""
+import asyncio
+import os
+import random
+import weakref
+from functools import lru_cache
+from typing import Optional
+
+from instrumentation import track_llm
+from resilience import CircuitBreaker, call_with_resilience
+
+_STUB_RESPONSES = {
+    "bio": "Stub bio: a passionate performer with a distinctive style and years of stage experience.",
+    "video_tags": "performance, dance, talent, choreography, stage",
+    "skill_rating": "7.5",
+}
+
+
+async def _stub_complete(operation: str) -> str:
+    # Optional simulated latency, +/- 20% jitter so percentiles look like a
+    # real provider
+    latency_ms = float(os.environ.get('STUB_LLM_LATENCY_MS', '0'))
+    if latency_ms:
+        await asyncio.sleep(latency_ms / 1000 * random.uniform(0.8, 1.2))
+    # Optional simulated provider errors, to exercise the breaker offline
+    if random.random() < float(os.environ.get('STUB_LLM_ERROR_RATE', '0')):
+        raise ConnectionError("Stub provider error")
+    return _STUB_RESPONSES.get(operation, "")
+
+
+# Calls in flight in this worker; admission control sheds AI-backed routes
+# while it is at LLM_MAX_CONCURRENCY
+_in_flight = 0
+
+
+def in_flight() -> int:
+    return _in_flight
+
+
+def saturated() -> bool:
+    return _in_flight >= int(os.environ.get('LLM_MAX_CONCURRENCY', '16'))
+
+
+def provider() -> str:
+    return os.environ.get('LLM_PROVIDER', 'emergentintegrations')
+
+
+@lru_cache(maxsize=None)
+def provider_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        "llm",
+        failure_threshold=int(os.environ.get('LLM_BREAKER_FAILURES', '5')),
+        reset_timeout=float(os.environ.get('LLM_BREAKER_RESET_SECONDS', '30')),
+    )
+
+
+class ProviderError(Exception):
+    """Non-2xx answer from the provider; ``status_code`` drives retries"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+
+
+# One client per event loop: httpx pools are bound to the loop that opened
+# their connections, and uvicorn workers (or tests) may run several loops
+_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def provider_client():
+    """The current event loop's pooled client, created on first use"""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        max_connections = int(os.environ.get('LLM_MAX_CONNECTIONS', '32'))
+        client = _clients[loop] = httpx.AsyncClient(
+            base_url=os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1'),
+            headers={"Authorization": f"Bearer {os.environ.get('OPENAI_API_KEY', '')}"},
+            # The overall deadline is enforced by call_with_resilience
+            timeout=httpx.Timeout(float(os.environ.get('LLM_HTTP_TIMEOUT_SECONDS', '30')), connect=5.0),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=float(os.environ.get('LLM_KEEPALIVE_SECONDS', '60')),
+            ),
+        )
+    return client
+
+
+async def close_clients():
+    """Close the current loop's client; called from the application lifespan"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def _openai_complete(system_message: str, prompt: str) -> str:
+    import httpx
+
+    try:
+        response = await provider_client().post("/chat/completions", json={
+            "model": os.environ.get('LLM_MODEL', 'gpt-4o'),
+            "messages": [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": prompt},
+            ],
+        })
+    except httpx.TransportError as e:
+        raise ConnectionError(f"{type(e).__name__}: {e}") from e
+    if response.status_code >= 400:
+        raise ProviderError(response.status_code, response.text[:200])
+    return response.json()["choices"][0]["message"]["content"]
+
+
+@lru_cache(maxsize=None)
+def _emergent_sdk():
+    from emergentintegrations.llm.chat import LlmChat, UserMessage
+    return LlmChat, UserMessage
+
+
+async def _emergent_complete(session_id: str, system_message: str, prompt: str) -> str:
+    LlmChat, UserMessage = _emergent_sdk()
+    chat = LlmChat(
+        api_key=os.environ.get('OPENAI_API_KEY'),
+        session_id=session_id,
+        system_message=system_message
+    ).with_model("openai", os.environ.get('LLM_MODEL', 'gpt-4o'))
+    return await chat.send_message(UserMessage(text=prompt))
+
+
+async def _attempt(operation: str, session_id: str, system_message: str, prompt: str) -> str:
+    async with track_llm(operation):
+        selected = provider()
+        if selected == "stub":
+            return await _stub_complete(operation)
+        if selected == "openai":
+            return await _openai_complete(system_message, prompt)
+        return await _emergent_complete(session_id, system_message, prompt)
+
+
+async def complete(operation: str, session_id: str, system_message: str, prompt: str,
+                   deadline: Optional[float] = None) -> str:
+    """Send a single prompt and return the raw text response
+
+    ``deadline`` (seconds, retries included) overrides LLM_DEADLINE_SECONDS.
+    """
+    global _in_flight
+    # Settings are read per call because server.py loads .env after imports
+    _in_flight += 1
+    try:
+        return await call_with_resilience(
+            lambda: _attempt(operation, session_id, system_message, prompt),
+            breaker=provider_breaker(),
+            deadline=deadline or float(os.environ.get('LLM_DEADLINE_SECONDS', '10')),
+            attempts=int(os.environ.get('LLM_ATTEMPTS', '3')),
+        )
+    finally:
+        _in_flight -= 1
@@ -0,0 +1,189 @@
+"""Helpers for the video payloads clients upload.
+
+The frontend sends videos as data URLs (``data:video/mp4;base64,...``);
+older clients and scripts send bare base64.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+DEFAULT_CONTENT_TYPE = "video/mp4"
+
+
+class InvalidVideoData(ValueError):
+    pass
+
+
+def media_url(video_id: str) -> str:
+    """Where players stream a stored video from, in place of its payload
+
+    Responses never carry the inline base64; MEDIA_BASE_URL lets a CDN
+    front the media endpoint, as with ``blob_url``.
+    """
+    return f"{os.environ.get('MEDIA_BASE_URL', '')}/api/videos/{video_id}/media"
+
+
+def split_data_url(video_data: str) -> Tuple[str, str]:
+    """Return ``(content_type, base64_payload)`` without decoding"""
+    if video_data.startswith("data:"):
+        header, _, payload = video_data.partition(",")
+        content_type = header[5:].split(";")[0] or DEFAULT_CONTENT_TYPE
+        return content_type, payload
+    return DEFAULT_CONTENT_TYPE, video_data
+
+
+_BASE64 = re.compile(r"[A-Za-z0-9+/=\s]+")
+
+
+def is_inline_payload(video_data: Optional[str]) -> bool:
+    """A data URL or bare base64, not the media URL stored for chunked uploads"""
+    if not video_data:
+        return False
+    return video_data.startswith("data:") or _BASE64.fullmatch(video_data) is not None
+
+
+def decode_video_data(video_data: str) -> Tuple[bytes, str]:
+    """Decode a data URL or bare base64 video into ``(bytes, content_type)``"""
+    content_type, payload = split_data_url(video_data)
+    try:
+        return base64.b64decode(payload, validate=False), content_type
+    except (binascii.Error, ValueError) as e:
+        raise InvalidVideoData(str(e))
+
+
+EXTENSIONS = {
+    "video/mp4": "mp4",
+    "video/webm": "webm",
+    "video/quicktime": "mov",
+    "video/x-matroska": "mkv",
+    "video/ogg": "ogv",
+}
+
+
+def extension_for(content_type: str) -> str:
+    return EXTENSIONS.get(content_type, "bin")
+
+
+def store_video_data(store, video_data: str) -> Dict:
+    """Decode an upload into the blob store; returns the video's media fields"""
+    data, content_type = decode_video_data(video_data)
+    content_hash = hashlib.sha256(data).hexdigest()
+    return {
+        "video_blob": store.put(data, extension_for(content_type), digest=content_hash),
+        "content_hash": content_hash,
+        "content_type": content_type,
+        "content_length": len(data),
+    }
+
+
+# HTTP caching and byte-range helpers for media responses
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def etag_for(content_hash: str) -> str:
+    """Strong ETag; the content hash changes whenever the bytes do"""
+    return f'"sha256-{content_hash}"'
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _as_utc_seconds(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def validator_headers(etag: str, last_modified: datetime) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+
+def not_modified(headers, etag: str, last_modified: datetime) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110 13.2.2)"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison is allowed for If-None-Match
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is not None:
+        since = _parse_http_date(if_modified_since)
+        return since is not None and _as_utc_seconds(last_modified) <= since
+    return False
+
+
+def if_range_matches(headers, etag: str, last_modified: datetime) -> bool:
+    """Whether a Range header should be honoured given If-Range"""
+    if_range = headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Strong comparison only
+        return if_range == etag
+    since = _parse_http_date(if_range)
+    return since is not None and _as_utc_seconds(last_modified) == since
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive ``(start, end)`` of a single ``bytes=`` range, None to send everything
+
+    Multiple ranges are answered with the full representation, which RFC
+    9110 allows and players never need.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start < 0:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def content_range(start: int, end: int, size: int) -> str:
+    return f"bytes {start}-{end}/{size}"
@@ -0,0 +1,197 @@
+"""Real-time notifications over Server-Sent Events.
+
+``EventBus`` routes events to each recipient's streams through bounded,
+coalescing buffers. With several workers ``ChangeStreamSource`` shares
+events through a change stream on ``notifications`` (needs a replica set).
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+from database import create_indexes
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING = 100
+HEARTBEAT_SECONDS = 15
+EVENT_TTL = timedelta(hours=1)
+# ChangeStreamHistoryLost, and ChangeStreamFatalError from MongoDB 4.0
+HISTORY_LOST_CODES = {286, 280}
+
+
+def new_event(event_type: str, user_id: str, data: Dict, coalesce_key: Optional[str] = None) -> Dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "type": event_type,
+        "user_id": user_id,  # recipient
+        "data": data,
+        "coalesce_key": coalesce_key,
+        "count": 1,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def _merge(pending: Dict, event: Dict) -> Dict:
+    """Later data wins, the count says how many events were folded in"""
+    merged = dict(event)
+    merged["count"] = pending["count"] + event["count"]
+    return merged
+
+
+def format_sse(event: Dict) -> str:
+    payload = dict(event["data"], count=event["count"], created_at=event["created_at"].isoformat())
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(payload)}\n\n"
+
+
+class Subscription:
+    """One client's bounded, coalescing event buffer"""
+
+    def __init__(self, user_id: str, max_pending: int = MAX_PENDING):
+        self.user_id = user_id
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, Dict]" = OrderedDict()
+        self.overflowed = False
+        self._ready = asyncio.Event()
+
+    def offer(self, event: Dict):
+        """Never blocks the publisher"""
+        key = event["coalesce_key"] or event["id"]
+        if key in self.pending:
+            self.pending[key] = _merge(self.pending[key], event)
+        else:
+            self.pending[key] = event
+            if len(self.pending) > self.max_pending:
+                self.pending.popitem(last=False)
+                self.overflowed = True
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> List[Dict]:
+        """Events ready for the client, or [] after ``timeout`` seconds idle"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        batch = list(self.pending.values())
+        self.pending.clear()
+        if self.overflowed:
+            self.overflowed = False
+            batch.insert(0, new_event("resync", self.user_id, {"reason": "too many pending events"}))
+        return batch
+
+
+class EventBus:
+    """Per-user pub/sub inside one worker"""
+
+    def __init__(self, max_pending: int = MAX_PENDING):
+        self.max_pending = max_pending
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self.source: Optional["ChangeStreamSource"] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id, self.max_pending)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def deliver(self, event: Dict):
+        for subscription in self._subscriptions.get(event["user_id"], ()):
+            subscription.offer(event)
+
+    async def publish(self, event: Dict):
+        if self.source is not None:
+            await self.source.publish(event)
+        else:
+            self.deliver(event)
+
+    async def stream(self, user_id: str, heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[str]:
+        """SSE frames for ``user_id`` until the client goes away"""
+        subscription = self.subscribe(user_id)
+        try:
+            # Tells EventSource how long to wait before reconnecting
+            yield "retry: 3000\n\n"
+            while True:
+                batch = await subscription.next_batch(heartbeat)
+                if not batch:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield "".join(format_sse(event) for event in batch)
+        finally:
+            self.unsubscribe(subscription)
+
+
+class ChangeStreamSource:
+    """Shares events between workers through a Mongo change stream"""
+
+    def __init__(self, bus: EventBus, collection):
+        self.bus = bus
+        self.collection = collection
+        self._task: Optional[asyncio.Task] = None
+
+    async def publish(self, event: Dict):
+        await self.collection.insert_one(dict(event))
+
+    def start(self):
+        if self._task is None:
+            self.bus.source = self
+            # Not attributed to whichever request happens to start it
+            self._task = contextvars.Context().run(asyncio.create_task, self._run())
+
+    async def stop(self):
+        self.bus.source = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        resume_token = None
+        while True:
+            try:
+                async with self.collection.watch(
+                    [{"$match": {"operationType": "insert"}}], resume_after=resume_token
+                ) as stream:
+                    # Known from the first batch, so an outage before the
+                    # next event still resumes where this stream began
+                    resume_token = stream.resume_token or resume_token
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        event = change["fullDocument"]
+                        event.pop("_id", None)
+                        self.bus.deliver(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if isinstance(e, OperationFailure) and e.code in HISTORY_LOST_CODES:
+                    # Only a token that fell off the oplog is given up
+                    resume_token = None
+                logger.warning(f"Notification change stream failed, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+
+async def ensure_notification_indexes(db):
+    # Events only need to live long enough to reach the change stream
+    await create_indexes(db.notifications, [
+        IndexModel("created_at", expireAfterSeconds=int(EVENT_TTL.total_seconds()))
+    ])
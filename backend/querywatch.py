@@ -0,0 +1,273 @@
+"""Slow-query and N+1 detection for development and CI.
+
+With ``QUERY_DEBUG=1`` each request's Mongo command shapes are recorded and
+the route is checked against its budget, repeated shapes and collection
+scans. Tests use the same listener through ``assert_query_budget``.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_BUDGET = 10
+
+# Expected worst-case round trips per endpoint. Changing a handler so that
+# it needs more should be a deliberate decision, reflected here.
+ROUTE_BUDGETS: Dict[str, int] = {
+    "POST /api/auth/register": 2,
+    "POST /api/auth/username-availability": 1,
+    "POST /api/auth/login": 1,
+    "GET /api/users/{user_id}": 1,
+    "GET /api/users": 1,
+    "POST /api/videos": 3,
+    "POST /api/videos/upload-ticket": 1,
+    "GET /api/videos": 2,
+    "GET /api/videos/{video_id}": 2,
+    "GET /api/videos/{video_id}/media": 3,
+    "HEAD /api/videos/{video_id}/media": 3,
+    "GET /api/videos/{video_id}/manifest.m3u8": 1,
+    "POST /api/videos/{video_id}/like": 3,
+    "POST /api/uploads": 2,
+    "GET /api/uploads/{upload_id}": 1,
+    "PUT /api/uploads/{upload_id}/chunks/{index}": 2,
+    "POST /api/uploads/{upload_id}/complete": 4,
+    "DELETE /api/uploads/{upload_id}": 2,
+    "POST /api/connections": 4,
+    "GET /api/connections/{user_id}": 1,
+    "POST /api/connections/{connection_id}/respond": 7,
+    "GET /api/recommendations/{user_id}": 3,
+    "GET /api/feed/{user_id}": 4,
+    "GET /api/search/videos": 2,
+    "GET /api/search/users": 1,
+    "GET /api/search/autocomplete": 2,
+    "GET /api/discover/users": 1,
+    "GET /api/discover/videos": 2,
+    "GET /api/trending": 0,
+    "GET /api/trending/top-rated-week": 0,
+    "GET /api/trending/categories/{category}": 0,
+}
+
+# Budgets apply to page responses; exports (``stream=true``) are unbounded
+STREAMED_CONTENT_TYPE = b"application/x-ndjson"
+
+# Handshake, session and our own explain traffic never counts
+IGNORED_COMMANDS = {
+    "hello", "ismaster", "isMaster", "ping", "buildinfo", "buildInfo",
+    "saslStart", "saslContinue", "endSessions", "killCursors", "explain",
+}
+
+# Where each command keeps the filter that decides its plan
+_FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+
+QueryShape = Tuple
+
+
+def _shape(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _shape(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(sorted(set(_shape(item) for item in value), key=repr))
+    return "?"
+
+
+def _command_filter(command_name: str, command: dict) -> Optional[dict]:
+    if command_name in _FILTER_FIELDS:
+        return command.get(_FILTER_FIELDS[command_name]) or {}
+    if command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or [{}]
+        return statements[0].get("q") or {}
+    if command_name == "aggregate":
+        for stage in command.get("pipeline", []):
+            if "$match" in stage:
+                return stage["$match"]
+        return {}
+    return None
+
+
+def query_shape(command_name: str, command: dict) -> QueryShape:
+    """Collection, command and filter structure with all values erased"""
+    collection = command.get(command_name)
+    filter_doc = _command_filter(command_name, command)
+    return (command_name, collection, _shape(filter_doc) if filter_doc is not None else None)
+
+
+class QueryLog:
+    """Commands issued while one request or test scope was active"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.commands: List[QueryShape] = []
+        self.samples: Dict[QueryShape, Tuple[str, dict]] = {}
+        # NDJSON exports read the whole collection in batches by design
+        self.streamed = False
+
+    def add(self, shape: QueryShape, command_name: str, filter_doc: Optional[dict]):
+        with self._lock:
+            self.commands.append(shape)
+            if filter_doc is not None and shape not in self.samples:
+                self.samples[shape] = (command_name, filter_doc)
+
+    @property
+    def count(self) -> int:
+        return len(self.commands)
+
+    def repeated(self) -> Dict[QueryShape, int]:
+        # getMore batches of one cursor are expected to repeat
+        counts = Counter(shape for shape in self.commands if shape[0] != "getMore")
+        return {shape: n for shape, n in counts.items() if n > 1}
+
+    def problems(self, budget: int, allow_repeats: bool = False) -> List[str]:
+        found = []
+        if self.count > budget:
+            found.append(f"{self.count} Mongo commands (budget {budget})")
+        if not allow_repeats:
+            for shape, n in self.repeated().items():
+                found.append(f"{n}x repeated {shape[0]} on {shape[1]} with filter {shape[2]}")
+        return found
+
+
+_request_log: contextvars.ContextVar[Optional[QueryLog]] = contextvars.ContextVar("query_log", default=None)
+_scoped_logs: contextvars.ContextVar[Tuple[QueryLog, ...]] = contextvars.ContextVar("scoped_query_logs", default=())
+
+
+class QueryWatchListener(monitoring.CommandListener):
+    """Feeds command shapes to the active request log and test scopes"""
+
+    def started(self, event):
+        request_log = _request_log.get()
+        scoped = _scoped_logs.get()
+        if request_log is None and not scoped:
+            return
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        filter_doc = _command_filter(event.command_name, event.command)
+        shape = query_shape(event.command_name, event.command)
+        if request_log is not None:
+            request_log.add(shape, event.command_name, filter_doc)
+        for log in scoped:
+            log.add(shape, event.command_name, filter_doc)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _find_stage(plan, stage: str) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") == stage:
+            return True
+        return any(_find_stage(value, stage) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_find_stage(item, stage) for item in plan)
+    return False
+
+
+class QueryWatchMiddleware:
+    """ASGI middleware logging budget overruns, N+1 shapes and COLLSCANs"""
+
+    def __init__(self, app, database=None, default_budget: int = DEFAULT_QUERY_BUDGET, explain: bool = True):
+        self.app = app
+        self.database = database
+        self.default_budget = default_budget
+        self.explain = explain and database is not None
+        self._explained = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = _request_log.set(log)
+
+        async def watched_send(message):
+            if message["type"] == "http.response.start":
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                log.streamed = content_type.startswith(STREAMED_CONTENT_TYPE)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, watched_send)
+        finally:
+            _request_log.reset(token)
+            self._report(scope, log)
+
+    def _report(self, scope, log: QueryLog):
+        route = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+        key = f"{scope.get('method', '')} {route}"
+        budget = ROUTE_BUDGETS.get(key, self.default_budget)
+        problems = [] if log.streamed else log.problems(budget)
+        for problem in problems:
+            logger.warning(f"[querywatch] {key}: {problem}")
+
+        if not self.explain:
+            return
+        for shape, (command_name, filter_doc) in log.samples.items():
+            if command_name not in ("find", "count", "distinct") or shape in self._explained:
+                continue
+            self._explained.add(shape)
+            # Run outside the request context so the explain is not
+            # attributed to the route in metrics
+            contextvars.Context().run(asyncio.ensure_future, self._explain(key, shape, command_name, filter_doc))
+
+    async def _explain(self, key: str, shape: QueryShape, command_name: str, filter_doc: dict):
+        collection = shape[1]
+        field = _FILTER_FIELDS[command_name]
+        try:
+            result = await self.database.command(
+                "explain", {command_name: collection, field: filter_doc}, verbosity="queryPlanner"
+            )
+        except Exception as e:
+            logger.debug(f"[querywatch] explain failed for {shape}: {e}")
+            return
+        if _find_stage(result.get("queryPlanner", {}).get("winningPlan"), "COLLSCAN"):
+            logger.warning(f"[querywatch] {key}: COLLSCAN on {collection} for filter shape {shape[2]}")
+
+
+@contextmanager
+def record_queries():
+    """Collect the Mongo commands issued inside the block
+
+    Scoped by context like the request logs: code awaited in the block
+    (and Motor's executor threads it uses) is recorded, background tasks
+    running at the same time are not.
+    """
+    log = QueryLog()
+    token = _scoped_logs.set(_scoped_logs.get() + (log,))
+    try:
+        yield log
+    finally:
+        _scoped_logs.reset(token)
+
+
+@contextmanager
+def assert_query_budget(endpoint: Optional[str] = None, max_commands: Optional[int] = None, allow_repeats: bool = False):
+    """Fail if the block issues more commands than allowed or repeats a shape
+
+    ``endpoint`` is a ``"METHOD /route/template"`` key of ``ROUTE_BUDGETS``;
+    ``max_commands`` overrides it.
+    """
+    if max_commands is None:
+        if endpoint not in ROUTE_BUDGETS:
+            raise KeyError(f"No query budget defined for {endpoint!r}")
+        max_commands = ROUTE_BUDGETS[endpoint]
+    with record_queries() as log:
+        yield log
+    problems = log.problems(max_commands, allow_repeats=allow_repeats)
+    if problems:
+        raise AssertionError(f"{endpoint or 'block'}: " + "; ".join(problems))
+
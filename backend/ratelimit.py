@@ -0,0 +1,208 @@
+"""Per-client rate limits and load shedding for expensive routes.
+
+``RateLimiter`` keeps a token bucket per client and budget, in process or
+shared through Mongo (``RATE_LIMIT_STORE=mongo``), and answers 429.
+``AdmissionController`` sheds classes of work with 503 while they are at
+their in-flight limit or a saturation probe reports overload. Budgets are
+``<requests per minute>/<burst>``, overridable with ``RATE_LIMIT_<NAME>``.
+"""
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from pymongo import IndexModel, ReturnDocument
+
+from database import create_indexes
+from instrumentation import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGETS = {
+    "register": "5/5",
+    "upload": "20/5",
+    "write": "120/30",
+}
+
+
+@dataclass(frozen=True)
+class Budget:
+    name: str
+    rate: float  # tokens per second
+    burst: int
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "Budget":
+        per_minute, _, burst = spec.partition("/")
+        return cls(name, float(per_minute) / 60, int(burst or per_minute))
+
+
+def configured_budgets() -> Dict[str, Budget]:
+    return {
+        name: Budget.parse(name, os.environ.get(f'RATE_LIMIT_{name.upper()}', spec))
+        for name, spec in DEFAULT_BUDGETS.items()
+    }
+
+
+def _retry_after(tokens: float, budget: Budget) -> float:
+    return (1 - tokens) / budget.rate if budget.rate > 0 else 60.0
+
+
+class MemoryBuckets:
+    """Buckets of this worker, least recently used evicted first"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    async def take(self, key: str, budget: Budget) -> Optional[float]:
+        """Take a token; ``None`` if allowed, else seconds until one refills"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get((budget.name, key), (budget.burst, now))
+        tokens = min(budget.burst, tokens + (now - updated) * budget.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[(budget.name, key)] = (tokens, now)
+        self._buckets.move_to_end((budget.name, key))
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return None if allowed else _retry_after(tokens, budget)
+
+
+class MongoBuckets:
+    """Buckets shared by all workers, refilled on the server's clock"""
+
+    def __init__(self, collection, fallback: Optional[MemoryBuckets] = None):
+        self.collection = collection
+        self.fallback = fallback or MemoryBuckets()
+
+    @staticmethod
+    def _refill(budget: Budget) -> List[dict]:
+        elapsed = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated", "$$NOW"]}]}, 1000]}
+        tokens = {"$ifNull": ["$tokens", budget.burst]}
+        return [
+            {"$set": {
+                "tokens": {"$min": [budget.burst, {"$add": [tokens, {"$multiply": [elapsed, budget.rate]}]}]},
+                "updated": "$$NOW",
+            }},
+            {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+            {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}},
+        ]
+
+    async def take(self, key: str, budget: Budget) -> Optional[float]:
+        try:
+            bucket = await self.collection.find_one_and_update(
+                {"_id": f"{budget.name}:{key}"},
+                self._refill(budget),
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception as e:
+            # Limits stay on per worker rather than failing requests
+            logger.warning(f"Shared rate limit state unavailable, using local buckets: {e}")
+            return await self.fallback.take(key, budget)
+        return None if bucket["allowed"] else _retry_after(bucket["tokens"], budget)
+
+
+async def ensure_rate_limit_indexes(db):
+    await create_indexes(db.rate_limits, [IndexModel("updated", expireAfterSeconds=3600)])
+
+
+def client_ip(request: Request) -> str:
+    if os.environ.get('RATE_LIMIT_TRUST_FORWARDED', '0') == '1':
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def client_keys(request: Request) -> List[str]:
+    """The IP, plus the user when the request names one without a body read"""
+    keys = [f"ip:{client_ip(request)}"]
+    ticket = getattr(request.state, "upload_ticket", None)
+    user_id = ticket.user_id if ticket is not None else request.path_params.get("user_id")
+    if user_id:
+        keys.append(f"user:{user_id}")
+    return keys
+
+
+def reject(status_code: int, detail: str, retry_after: float, reason: str, route: str):
+    REGISTRY.inc("renzo_requests_rejected_total", {"route": route, "reason": reason})
+    raise HTTPException(
+        status_code=status_code, detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def _route(request: Request) -> str:
+    return getattr(request.scope.get("route"), "path", request.url.path)
+
+
+class RateLimiter:
+    def __init__(self, store=None, budgets: Optional[Dict[str, Budget]] = None):
+        self.store = store or MemoryBuckets()
+        self.budgets = budgets or configured_budgets()
+
+    def limit(self, name: str):
+        """Route dependency charging one token of budget ``name`` per key"""
+        budget = self.budgets[name]
+
+        async def dependency(request: Request):
+            waits = [await self.store.take(key, budget) for key in client_keys(request)]
+            waits = [wait for wait in waits if wait is not None]
+            if waits:
+                reject(429, "Too many requests", max(waits), f"rate_limit:{name}", _route(request))
+
+        return dependency
+
+
+class AdmissionController:
+    """In-flight limits and saturation probes per class of work"""
+
+    def __init__(self, retry_after: float = 5):
+        self.retry_after = retry_after
+        self._limits: Dict[str, int] = {}
+        self._probes: Dict[str, List[Callable[[], bool]]] = {}
+        self._in_flight: Dict[str, int] = {}
+
+    def configure(self, name: str, max_in_flight: int, probes: List[Callable[[], bool]] = ()):
+        self._limits[name] = max_in_flight
+        self._probes[name] = list(probes)
+        self._in_flight.setdefault(name, 0)
+
+    def in_flight(self, name: str) -> int:
+        return self._in_flight.get(name, 0)
+
+    def overloaded(self, name: str) -> Optional[str]:
+        if self._in_flight[name] >= self._limits[name]:
+            return "in_flight"
+        for probe in self._probes[name]:
+            if probe():
+                return probe.__name__
+        return None
+
+    def admit(self, name: str):
+        """Route dependency holding a slot of class ``name`` for the request"""
+
+        async def dependency(request: Request):
+            reason = self.overloaded(name)
+            if reason is not None:
+                reject(503, "Server busy, retry later", self.retry_after, f"{name}:{reason}", _route(request))
+            async with self._slot(name):
+                yield
+
+        return dependency
+
+    @asynccontextmanager
+    async def _slot(self, name: str):
+        self._in_flight[name] += 1
+        try:
+            yield
+        finally:
+            self._in_flight[name] -= 1
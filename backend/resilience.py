@@ -0,0 +1,153 @@
+"""Deadlines, retries and circuit breaking for calls to flaky dependencies.
+
+``call_with_resilience`` runs an async call under one overall deadline,
+retrying transient failures with full-jitter exponential backoff while
+time remains. A ``CircuitBreaker`` in front of it counts consecutive
+failures; once open it fails calls immediately with ``CircuitOpen`` so
+callers serve their fallbacks without waiting, and after ``reset_timeout``
+it lets a limited number of half-open probes through to decide whether to
+close again.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+from instrumentation import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+TRANSIENT_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+TRANSIENT_NAMES = ("Timeout", "RateLimit", "Connection", "ServiceUnavailable", "InternalServer", "Overloaded")
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+def is_transient(error: BaseException) -> bool:
+    """Timeouts, connection errors and retryable provider statuses"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUSES
+    return any(name in type(error).__name__ for name in TRANSIENT_NAMES)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with half-open probing"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30,
+                 half_open_probes: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._period = 0
+        _breakers.append(self)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit {self.name} {self.state} -> {state}")
+            self.state = state
+
+    def acquire(self) -> Optional[int]:
+        """Admit a call or raise ``CircuitOpen``; pass the token to ``release``
+
+        The token is the number of the half-open period for probes and None
+        for calls admitted while closed.
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                REGISTRY.inc("renzo_circuit_rejected_total", {"circuit": self.name})
+                raise CircuitOpen(f"{self.name} circuit is open")
+            self._set_state(HALF_OPEN)
+            self._period += 1
+            self._probes = 0
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                REGISTRY.inc("renzo_circuit_rejected_total", {"circuit": self.name})
+                raise CircuitOpen(f"{self.name} circuit is half open, probe in flight")
+            self._probes += 1
+            return self._period
+        return None
+
+    def release(self, token: Optional[int], ok: Optional[bool]):
+        """``ok`` is None when the call was cancelled and tells nothing
+
+        Only probes of the current half-open period decide it; calls that
+        were admitted before the circuit opened, or probes of an earlier
+        period, finish without touching the state.
+        """
+        if token is not None:
+            if self.state != HALF_OPEN or token != self._period:
+                return
+            self._probes -= 1
+        elif self.state != CLOSED:
+            return
+        if ok is None:
+            return
+        if ok:
+            self.failures = 0
+            self._set_state(CLOSED)
+            return
+        self.failures += 1
+        if token is not None or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+
+_breakers: List[CircuitBreaker] = []
+
+
+def _collect_breaker_states():
+    return [({"circuit": breaker.name}, 0 if breaker.state == CLOSED else 1 if breaker.state == OPEN else 0.5)
+            for breaker in _breakers]
+
+
+REGISTRY.gauge("renzo_circuit_open", "1 while a circuit is open, 0.5 half open, 0 closed",
+               _collect_breaker_states)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full jitter: uniform between 0 and the exponential step"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def call_with_resilience(call: Callable[[], Awaitable[T]], breaker: Optional[CircuitBreaker] = None,
+                               deadline: float = 10, attempts: int = 3, backoff_base: float = 0.2,
+                               backoff_cap: float = 2.0) -> T:
+    """Run ``call`` within ``deadline`` seconds, retrying transient errors"""
+    expires = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError(f"deadline of {deadline}s exceeded")
+        token = breaker.acquire() if breaker is not None else None
+        ok = None
+        try:
+            result = await asyncio.wait_for(call(), remaining)
+            ok = True
+            return result
+        except Exception as e:
+            ok = False
+            attempt += 1
+            delay = backoff_delay(attempt - 1, backoff_base, backoff_cap)
+            if attempt >= attempts or not is_transient(e) or time.monotonic() + delay >= expires:
+                raise
+            logger.info(f"Retrying after {type(e).__name__} (attempt {attempt} of {attempts})")
+        finally:
+            if breaker is not None:
+                breaker.release(token, ok)
+        await asyncio.sleep(delay)
@@ -0,0 +1,193 @@
+"""Full-text search and prefix autocomplete over videos and users.
+
+Relevance search uses weighted text indexes; autocomplete is an anchored
+regex on the multikey ``search_terms`` field. Older documents get their
+terms with ``python search.py --backfill``.
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from pymongo import IndexModel
+
+from database import create_indexes
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+")
+MAX_SEARCH_TERMS = 64
+
+# (field, weight); Mongo allows a single text index per collection
+VIDEO_TEXT_FIELDS = [("title", 10), ("ai_generated_tags", 5), ("description", 1)]
+USER_TEXT_FIELDS = [("name", 10), ("username", 10), ("tags", 5), ("bio", 1), ("ai_generated_bio", 1)]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def search_terms(*values: Union[None, str, Iterable[str]]) -> List[str]:
+    """Distinct lowercased words of the given strings and string lists"""
+    terms: Dict[str, None] = {}
+    for value in values:
+        if not value:
+            continue
+        for text in [value] if isinstance(value, str) else value:
+            for token in tokenize(text):
+                terms.setdefault(token)
+    return list(terms)[:MAX_SEARCH_TERMS]
+
+
+def video_search_terms(video: Dict) -> List[str]:
+    return search_terms(video.get("title"), video.get("ai_generated_tags"))
+
+
+def user_search_terms(user: Dict) -> List[str]:
+    return search_terms(user.get("name"), user.get("username"), user.get("tags"))
+
+
+async def ensure_search_indexes(db):
+    for collection, text_fields in ((db.videos, VIDEO_TEXT_FIELDS), (db.users, USER_TEXT_FIELDS)):
+        await create_indexes(collection, [
+            IndexModel([(field, "text") for field, _ in text_fields],
+                       weights=dict(text_fields), name=f"{collection.name}_text"),
+            IndexModel("search_terms"),
+            IndexModel([("created_at", -1), ("id", 1)]),
+        ])
+
+
+def encode_cursor(document: Dict, sort_field: str) -> str:
+    value = document[sort_field]
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    payload = json.dumps({"v": value, "id": document["id"]}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value = data["v"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$date"])
+        return {"value": value, "id": str(data["id"])}
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def search_pipeline(query: Optional[str], filters: Dict, limit: int, cursor: Optional[str] = None,
+                    exclude: Iterable[str] = (), projection: Optional[Dict] = None) -> List[Dict]:
+    """Aggregation for one page: by relevance with a query, newest first without
+
+    Fetches ``limit + 1`` documents so the caller can tell whether there is
+    a next page; see ``paginate``. An inclusion ``projection`` (a sparse
+    fieldset) replaces excluding ``exclude``; the sort keys the cursor is
+    built from are always kept.
+    """
+    match = dict(filters)
+    sort_field = "created_at"
+    if query:
+        match["$text"] = {"$search": query}
+        sort_field = "score"
+    pipeline: List[Dict] = [{"$match": match}]
+    if query:
+        pipeline.append({"$addFields": {"score": {"$meta": "textScore"}}})
+    if cursor:
+        after = decode_cursor(cursor)
+        pipeline.append({"$match": {"$or": [
+            {sort_field: {"$lt": after["value"]}},
+            {sort_field: after["value"], "id": {"$gt": after["id"]}},
+        ]}})
+    pipeline += [
+        {"$sort": {sort_field: -1, "id": 1}},
+        {"$limit": limit + 1},
+    ]
+    if projection is None:
+        pipeline.append({"$project": {"_id": 0, "search_terms": 0, **{field: 0 for field in exclude}}})
+    else:
+        pipeline.append({"$project": {**projection, "_id": 0, "id": 1, sort_field: 1}})
+    return pipeline
+
+
+def paginate(documents: List[Dict], limit: int, query: Optional[str]) -> Dict:
+    """Split a ``limit + 1`` result into the page and the next cursor"""
+    page = documents[:limit]
+    next_cursor = None
+    if len(documents) > limit and page:
+        next_cursor = encode_cursor(page[-1], "score" if query else "created_at")
+    return {"results": page, "next_cursor": next_cursor}
+
+
+def autocomplete_prefix(text: str) -> Optional[str]:
+    """The word being typed: the last token of the input"""
+    tokens = tokenize(text)
+    return tokens[-1] if tokens else None
+
+
+def prefix_filter(prefix: str) -> Dict:
+    # Anchored and case-sensitive (terms are stored lowercased), so the
+    # search_terms index is scanned as a range instead of in full
+    return {"search_terms": {"$regex": "^" + re.escape(prefix)}}
+
+
+def suggest_terms(documents: Iterable[Dict], prefix: str, limit: int) -> List[str]:
+    """Most common completions of ``prefix`` among the matched documents"""
+    counts = Counter(
+        term for document in documents for term in document.get("search_terms", [])
+        if term.startswith(prefix)
+    )
+    return [term for term, _ in counts.most_common(limit)]
+
+
+def backfill(collection, terms_for: Callable[[Dict], List[str]], batch_size: int = 1000) -> int:
+    """Set ``search_terms`` on documents that lack it (sync pymongo)"""
+    from pymongo import UpdateOne
+
+    updated = 0
+    batch = []
+    for document in collection.find({"search_terms": {"$exists": False}}, {"video_data": 0}):
+        batch.append(UpdateOne({"_id": document["_id"]}, {"$set": {"search_terms": terms_for(document)}}))
+        if len(batch) >= batch_size:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+
+def main():
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Maintain Renzo search fields")
+    parser.add_argument("--backfill", action="store_true", help="fill in search_terms on existing documents")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not args.backfill:
+        parser.print_help()
+        return
+
+    client = MongoClient(os.environ['MONGO_URL'])
+    try:
+        db = client[os.environ['DB_NAME']]
+        logger.info(f"Backfilled {backfill(db.videos, video_search_terms)} videos")
+        logger.info(f"Backfilled {backfill(db.users, user_search_terms)} users")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,87 @@
-from fastapi import FastAPI, APIRouter, HTTPException, File, UploadFile, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, File, UploadFile, Form, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import uuid
 from datetime import datetime, timedelta
-import hashlib
 import base64
 import json
 import asyncio
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from instrumentation import (
+    REGISTRY,
+    MongoPoolListener,
+    InstrumentationMiddleware,
+    InstrumentedRoute,
+    MongoCommandListener,
+)
+import llm
+from querywatch import QueryWatchListener, QueryWatchMiddleware
+from blobstore import InvalidBlobKey, LocalBlobStore, blob_url
+from thumbnails import ThumbnailPipeline
+from transcoder import new_job
+import media
+from fileserve import conditional_file_response, file_mtime
+from uploads import (
+    DEFAULT_CHUNK_SIZE,
+    MAX_CHUNK_SIZE,
+    MIN_CHUNK_SIZE,
+    SESSION_TTL,
+    ChunkError,
+    ChunkStore,
+    UploadSweeper,
+    missing_chunks,
+    new_session,
+)
+from upload_limits import UploadLimitMiddleware, UploadTicketSigner
+import search
+import discovery
+import trending
+from trending import TrendingBoard
+from timelines import TimelineService, ensure_timeline_indexes
+from notifications import ChangeStreamSource, EventBus, ensure_notification_indexes, new_event
+import database
+from database import create_indexes, db, durable_db, feed_db
+from caches import PageCache, UserSummaryCache
+from workers import EnrichmentQueue, ViewFlusher
+from streaming import ndjson_response
+from compression import CompressionMiddleware
+from ratelimit import AdmissionController, MemoryBuckets, MongoBuckets, RateLimiter, ensure_rate_limit_indexes
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
 
-# Create the main app without a prefix
-app = FastAPI()
+# MongoDB: the client is created per worker by the lifespan handler below,
+# `db` and friends resolve to it on use (see database.py)
+mongo_listeners = [
+    MongoCommandListener(
+        reply_bytes_sample_rate=float(os.environ.get('METRICS_MONGO_REPLY_BYTES_SAMPLE_RATE', '0.01'))
+    ),
+    MongoPoolListener(),
+    QueryWatchListener(),
+]
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+# Create the main app without a prefix; orjson renders every JSON response
+app = FastAPI(default_response_class=ORJSONResponse)
 
-# OpenAI Configuration
-OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+# Create a router with the /api prefix
+api_router = APIRouter(prefix="/api", route_class=InstrumentedRoute)
 
 # Data Models
 class User(BaseModel):
@@ -46,6 +95,8 @@ class User(BaseModel):
     tags: List[str] = []
     profile_image: Optional[str] = None
     verification_status: str = "pending"  # pending, verified, rejected
+    skill_rating: Optional[float] = None  # best ai_skill_rating of their videos
+    connection_count: int = 0  # accepted connections
     followers: List[str] = []
     following: List[str] = []
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -58,10 +109,20 @@ class UserCreate(BaseModel):
     profile_type: str = "dancer"
     tags: List[str] = []
 
+class UsernameAvailabilityRequest(BaseModel):
+    usernames: List[str]
+
 class UserLogin(BaseModel):
     email: str
     password: str
 
+class Rendition(BaseModel):
+    name: str  # 240p, 480p, 720p
+    width: int
+    height: int
+    bandwidth: int
+    playlist: str  # blob key of the variant playlist
+
 class Video(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -71,10 +132,18 @@ class Video(BaseModel):
     genre: Optional[str] = None
     category: str = "solo"  # solo, group, duet, rehearsal, performance
     video_data: str  # base64 encoded video
+    video_blob: Optional[str] = None  # blob store key of the decoded video
+    content_hash: Optional[str] = None  # sha256 of the decoded bytes
+    content_type: Optional[str] = None
+    content_length: Optional[int] = None
     thumbnail: Optional[str] = None
+    preview_frames: List[str] = []
+    renditions: List[Rendition] = []
+    transcode_status: str = "queued"  # queued, processing, ready, failed
     likes: List[str] = []
     views: int = 0
     ai_skill_rating: Optional[float] = None
+    analysis_status: str = "pending"  # pending, processing, done (AI tags and rating)
     verification_status: str = "pending"
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -85,6 +154,20 @@ class VideoCreate(BaseModel):
     category: str = "solo"
     video_data: str
 
+class UploadInit(BaseModel):
+    user_id: str
+    title: str
+    description: str = ""
+    category: str = "solo"
+    content_type: str = "video/mp4"
+    total_size: int
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    sha256: Optional[str] = None  # of the whole file, verified on completion
+
+class UploadTicketRequest(BaseModel):
+    user_id: str
+    size: int  # bytes of the request body that will carry the upload
+
 class VideoResponse(BaseModel):
     id: str
     user_id: str
@@ -95,9 +178,13 @@ class VideoResponse(BaseModel):
     category: str
     video_data: str
     thumbnail: Optional[str] = None
+    preview_frames: List[str] = []
+    renditions: List[Rendition] = []
+    transcode_status: Optional[str] = None
     likes: List[str] = []
     views: int
     ai_skill_rating: Optional[float] = None
+    analysis_status: Optional[str] = None
     verification_status: str
     created_at: datetime
     user_name: str
@@ -115,78 +202,222 @@ class ConnectionCreate(BaseModel):
     to_user_id: str
     message: Optional[str] = None
 
+# Response documents: Mongo documents were validated when they were written,
+# so read paths only trim them to the response model's fields and return
+# them as ORJSONResponse, skipping response_model validation and
+# jsonable_encoder. The models still document the routes.
+def document_shape(model) -> tuple:
+    defaults = {
+        name: field.default for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+    return tuple(model.model_fields), defaults
+
+USER_SHAPE = document_shape(User)
+VIDEO_SHAPE = document_shape(VideoResponse)
+CONNECTION_SHAPE = document_shape(Connection)
+
+def shape_document(shape: tuple, document: dict, **extra) -> dict:
+    fields, defaults = shape
+    shaped = dict(defaults)
+    for name in fields:
+        if name in document:
+            shaped[name] = document[name]
+    shaped.update(extra)
+    return shaped
+
+def user_document(user: dict) -> dict:
+    return shape_document(USER_SHAPE, user)
+
+# Sparse fieldsets: ``fields=id,title,thumbnail`` trims list and detail
+# responses to what the client renders, and the Mongo projection to match
+JOINED_FIELDS = {"user_name", "user_username"}  # looked up from users
+
+def requested_fields(fields: Optional[str], shape: tuple) -> Optional[Tuple[str, ...]]:
+    if fields is None:
+        return None
+    requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not requested:
+        raise HTTPException(status_code=400, detail="fields must name at least one field")
+    unknown = [name for name in requested if name not in shape[0]]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def field_projection(requested: Optional[Tuple[str, ...]], default: dict, required=("id",)) -> dict:
+    """Projection for a fieldset, ``default`` without one"""
+    if requested is None:
+        return default
+    stored = [name for name in (*required, *requested) if name not in JOINED_FIELDS]
+    return {"_id": 0, **dict.fromkeys(stored, 1)}
+
+def select_fields(documents, requested: Optional[Tuple[str, ...]]):
+    """One document or a list of them, trimmed to the fieldset"""
+    if requested is None:
+        return documents
+    if isinstance(documents, dict):
+        return {name: documents[name] for name in requested if name in documents}
+    return [{name: document[name] for name in requested if name in document} for document in documents]
+
+# Media storage and background thumbnail generation
+blob_store = LocalBlobStore(os.environ.get('BLOB_ROOT', ROOT_DIR / 'blobs'))
+
+async def save_thumbnails(video_id: str, result: dict):
+    await db.videos.update_one(
+        {"id": video_id},
+        {"$set": {
+            "thumbnail": blob_url(result["poster"]),
+            "preview_frames": [blob_url(key) for key in result["previews"]],
+            "updated_at": datetime.utcnow()
+        }}
+    )
+    feed_cache.invalidate()
+
+# Upload limits, enforced by UploadLimitMiddleware while the body streams in
+MAX_VIDEO_BYTES = int(os.environ.get('MAX_VIDEO_MB', '200')) * 1024 * 1024
+# The form upload carries the video base64 encoded inside a data URL, and
+# that data URL is stored in the video document, which Mongo caps at 16 MB.
+# Leave room for the multipart framing and the document's other fields;
+# larger videos go through the chunked /api/uploads protocol.
+MONGO_DOCUMENT_BYTES = 16 * 1024 * 1024
+MAX_FORM_UPLOAD_BYTES = min(MAX_VIDEO_BYTES * 4 // 3 + 64 * 1024, MONGO_DOCUMENT_BYTES - 512 * 1024)
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_KB', '1024')) * 1024
+upload_tickets = UploadTicketSigner(os.environ.get('UPLOAD_TICKET_SECRET'))
+
+chunk_store = ChunkStore(Path(os.environ.get('BLOB_ROOT', ROOT_DIR / 'blobs')) / '.uploads')
+upload_sweeper = UploadSweeper(chunk_store, db.upload_sessions)
+
+event_bus = EventBus()
+# Multiple workers share events through Mongo (needs a replica set)
+notification_source = (
+    ChangeStreamSource(event_bus, db.notifications)
+    if os.environ.get('NOTIFICATIONS_SOURCE', 'local') == 'changestream' else None
+)
+
+timeline_service = TimelineService(db, read_db=feed_db, fanout_limit=int(os.environ.get('TIMELINE_FANOUT_LIMIT', '5000')))
+
+thumbnail_pipeline = ThumbnailPipeline(
+    blob_store,
+    on_complete=save_thumbnails,
+    workers=int(os.environ.get('THUMBNAIL_WORKERS', '2')),
+    fmt=os.environ.get('THUMBNAIL_FORMAT', 'webp'),
+)
+
 # AI Helper Functions
 async def generate_ai_bio(user_data: dict) -> str:
     """Generate AI bio for user based on their profile"""
     try:
-        chat = LlmChat(
-            api_key=OPENAI_API_KEY,
-            session_id=f"bio-{user_data['id']}",
-            system_message="You are a creative bio writer for performers. Generate engaging, professional bios for dancers and musicians."
-        ).with_model("openai", "gpt-4o")
-        
         prompt = f"""Generate a creative and engaging bio for a {user_data['profile_type']} named {user_data['name']} with tags: {', '.join(user_data['tags'])}. 
         Keep it professional but vibrant, around 100-150 words. Focus on their passion and style."""
         
-        response = await chat.send_message(UserMessage(text=prompt))
+        response = await llm.complete(
+            "bio",
+            session_id=f"bio-{user_data['id']}",
+            system_message="You are a creative bio writer for performers. Generate engaging, professional bios for dancers and musicians.",
+            prompt=prompt,
+            # Sign-up waits for the bio, so it gets a tighter budget
+            deadline=float(os.environ.get('LLM_BIO_DEADLINE_SECONDS', '4'))
+        )
         return response.strip()
     except Exception as e:
-        print(f"Error generating AI bio: {e}")
+        logger.warning(f"Error generating AI bio: {e}")
         return f"Passionate {user_data['profile_type']} with expertise in {', '.join(user_data['tags'][:3])}."
 
 async def generate_video_tags(video_data: dict) -> List[str]:
     """Generate AI tags for uploaded video"""
     try:
-        chat = LlmChat(
-            api_key=OPENAI_API_KEY,
-            session_id=f"video-tags-{video_data['id']}",
-            system_message="You are an expert in dance and music analysis. Generate relevant tags for performance videos."
-        ).with_model("openai", "gpt-4o")
-        
         prompt = f"""Analyze this video titled "{video_data['title']}" with description: "{video_data.get('description', '')}" 
         and category: "{video_data['category']}". Generate 5-8 relevant tags for this performance video. 
         Return only the tags separated by commas."""
         
-        response = await chat.send_message(UserMessage(text=prompt))
+        response = await llm.complete(
+            "video_tags",
+            session_id=f"video-tags-{video_data['id']}",
+            system_message="You are an expert in dance and music analysis. Generate relevant tags for performance videos.",
+            prompt=prompt
+        )
         tags = [tag.strip() for tag in response.split(',')]
         return tags[:8]  # Limit to 8 tags
     except Exception as e:
-        print(f"Error generating video tags: {e}")
+        logger.warning(f"Error generating video tags: {e}")
         return ["performance", "talent", video_data['category']]
 
 async def generate_skill_rating(video_data: dict) -> float:
     """Generate AI skill rating for video"""
     try:
-        chat = LlmChat(
-            api_key=OPENAI_API_KEY,
-            session_id=f"skill-rating-{video_data['id']}",
-            system_message="You are a professional talent evaluator. Rate performances on a scale of 1-10 based on technical skill, creativity, and stage presence."
-        ).with_model("openai", "gpt-4o")
-        
         prompt = f"""Rate this {video_data['category']} performance titled "{video_data['title']}" on a scale of 1-10. 
         Consider technical skill, creativity, stage presence, and overall performance quality. 
         Return only the numeric rating (e.g., 8.5)."""
         
-        response = await chat.send_message(UserMessage(text=prompt))
+        response = await llm.complete(
+            "skill_rating",
+            session_id=f"skill-rating-{video_data['id']}",
+            system_message="You are a professional talent evaluator. Rate performances on a scale of 1-10 based on technical skill, creativity, and stage presence.",
+            prompt=prompt
+        )
         try:
             rating = float(response.strip())
             return max(1.0, min(10.0, rating))  # Ensure rating is between 1-10
         except ValueError:
             return 7.0  # Default rating if parsing fails
     except Exception as e:
-        print(f"Error generating skill rating: {e}")
+        logger.warning(f"Error generating skill rating: {e}")
         return 7.0
 
+# Author summaries for enrichment and the default listing pages, both
+# warmed by the lifespan handler
+user_cache = UserSummaryCache(db.users, ttl=float(os.environ.get('USER_CACHE_SECONDS', '600')))
+# Dropped by every write to listed fields in this worker except view
+# counts, which flush every second; other workers catch up within the TTL
+feed_cache = PageCache(ttl=float(os.environ.get('FEED_CACHE_SECONDS', '5')))
+
+async def enrich_videos(videos: List[dict]) -> List[dict]:
+    """VideoResponse documents with author name and username, misses in one
+    batched user lookup"""
+    users_by_id = await user_cache.get_many(video["user_id"] for video in videos)
+    
+    enriched_videos = []
+    for video in videos:
+        user = users_by_id.get(video["user_id"])
+        if user:
+            enriched_videos.append(shape_document(
+                VIDEO_SHAPE, video, user_name=user["name"], user_username=user["username"]
+            ))
+    return enriched_videos
+
+# Rate limits per client and load shedding for the routes that call the
+# LLM or write large payloads, so bursts there cannot starve cheap reads
+rate_limiter = RateLimiter(
+    MongoBuckets(db.rate_limits) if os.environ.get('RATE_LIMIT_STORE', 'memory') == 'mongo' else MemoryBuckets()
+)
+
+def llm_saturated() -> bool:
+    return llm.saturated()
+
+def upload_queue_saturated() -> bool:
+    limit = int(os.environ.get('UPLOAD_QUEUE_LIMIT', '200'))
+    return enrichment_queue.pending >= limit or thumbnail_pipeline.pending >= limit
+
+admission = AdmissionController(retry_after=float(os.environ.get('SHED_RETRY_AFTER_SECONDS', '5')))
+admission.configure("signup", int(os.environ.get('SIGNUP_MAX_IN_FLIGHT', '16')), probes=[llm_saturated])
+admission.configure("upload", int(os.environ.get('UPLOAD_MAX_IN_FLIGHT', '8')), probes=[upload_queue_saturated])
+
 # Authentication Routes
-@api_router.post("/auth/register", response_model=User)
+MAX_USERNAME_BATCH = 50
+
+@api_router.post("/auth/register", response_model=User, dependencies=[
+    Depends(rate_limiter.limit("register")), Depends(admission.admit("signup"))
+])
 async def register_user(user_data: UserCreate):
-    # Check if user already exists
-    existing_user = await db.users.find_one({"email": user_data.email})
-    if existing_user:
-        raise HTTPException(status_code=400, detail="User already exists")
-    
-    existing_username = await db.users.find_one({"username": user_data.username})
-    if existing_username:
+    # Reject taken emails and usernames with one indexed lookup before
+    # paying for the bio; the unique indexes still catch concurrent signups
+    existing = await durable_db.users.find_one(
+        {"$or": [{"email": user_data.email}, {"username": user_data.username}]},
+        {"_id": 0, "email": 1}
+    )
+    if existing:
+        if existing["email"] == user_data.email:
+            raise HTTPException(status_code=400, detail="User already exists")
         raise HTTPException(status_code=400, detail="Username already taken")
     
     # Create user object
@@ -194,12 +425,34 @@ async def register_user(user_data: UserCreate):
     user_obj = User(**user_dict)
     
     # Generate AI bio
-    user_obj.ai_generated_bio = await generate_ai_bio(user_dict)
+    user_obj.ai_generated_bio = await generate_ai_bio(user_obj.dict())
     
     # Save to database
-    await db.users.insert_one(user_obj.dict())
+    user_doc = user_obj.dict()
+    user_doc["search_terms"] = search.user_search_terms(user_doc)
+    try:
+        await durable_db.users.insert_one(user_doc)
+    except DuplicateKeyError as e:
+        key_pattern = (e.details or {}).get("keyPattern") or {}
+        if "username" in key_pattern or ("email" not in key_pattern and "username" in str(e)):
+            raise HTTPException(status_code=400, detail="Username already taken")
+        raise HTTPException(status_code=400, detail="User already exists")
     return user_obj
 
+@api_router.post("/auth/username-availability")
+async def check_username_availability(request: UsernameAvailabilityRequest):
+    """Check several candidate usernames with a single query"""
+    usernames = list(dict.fromkeys(request.usernames))
+    if len(usernames) > MAX_USERNAME_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_USERNAME_BATCH} usernames per request")
+    
+    taken = await db.users.find(
+        {"username": {"$in": usernames}}, {"_id": 0, "username": 1}
+    ).to_list(len(usernames))
+    taken_names = {user["username"] for user in taken}
+    
+    return {"availability": {username: username not in taken_names for username in usernames}}
+
 @api_router.post("/auth/login")
 async def login_user(login_data: UserLogin):
     user = await db.users.find_one({"email": login_data.email})
@@ -211,30 +464,65 @@ async def login_user(login_data: UserLogin):
     return {"user_id": user["id"], "message": "Login successful"}
 
 @api_router.get("/users/{user_id}", response_model=User)
-async def get_user(user_id: str):
-    user = await db.users.find_one({"id": user_id})
+async def get_user(user_id: str, fields: Optional[str] = None):
+    requested = requested_fields(fields, USER_SHAPE)
+    user = await db.users.find_one(
+        {"id": user_id}, field_projection(requested, {"_id": 0, "search_terms": 0})
+    )
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return User(**user)
+    return ORJSONResponse(select_fields(user_document(user), requested))
+
+async def user_batch(users: List[dict]) -> List[dict]:
+    return [user_document(user) for user in users]
 
 @api_router.get("/users", response_model=List[User])
-async def get_users(limit: int = 20, skip: int = 0):
-    users = await db.users.find().skip(skip).limit(limit).to_list(limit)
-    return [User(**user) for user in users]
+async def get_users(limit: Optional[int] = None, skip: int = 0, stream: bool = False,
+                    fields: Optional[str] = None):
+    """A page of users, or with ``stream=true`` every user from ``skip`` on
+    (up to ``limit``) as NDJSON"""
+    requested = requested_fields(fields, USER_SHAPE)
+    cursor = feed_db.users.find({}, field_projection(requested, {"_id": 0, "search_terms": 0})).skip(skip)
+    if stream:
+        async def batch(users):
+            return select_fields(await user_batch(users), requested)
+        return ndjson_response(cursor.limit(limit or 0), batch)
+    
+    limit = limit or 20
+    users = await cursor.limit(limit).to_list(limit)
+    return ORJSONResponse(select_fields(await user_batch(users), requested))
 
 # Video Routes
-@api_router.post("/videos", response_model=Video)
+@api_router.post("/videos", response_model=Video, dependencies=[
+    Depends(rate_limiter.limit("upload")), Depends(admission.admit("upload"))
+])
 async def create_video(
+    request: Request,
     user_id: str = Form(...),
     title: str = Form(...),
     description: str = Form(""),
     category: str = Form("solo"),
     video_data: str = Form(...)
 ):
-    # Verify user exists
-    user = await db.users.find_one({"id": user_id})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    """Publish a form upload. The response comes back before analysis:
+    ``ai_generated_tags`` is empty and ``ai_skill_rating`` null until
+    ``analysis_status`` reaches "done"; poll GET /api/videos/{id} for them"""
+    # A verified upload ticket already proves the user exists
+    ticket = getattr(request.state, "upload_ticket", None)
+    if ticket is not None:
+        if ticket.user_id != user_id:
+            raise HTTPException(status_code=403, detail="Upload ticket was issued for another user")
+    else:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "id": 1})
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+    
+    # Decode into the blob store off the event loop; playback is served from
+    # there and the content hash is the media ETag
+    try:
+        media_fields = await asyncio.to_thread(media.store_video_data, blob_store, video_data)
+    except media.InvalidVideoData:
+        raise HTTPException(status_code=400, detail="Invalid video data")
     
     # Create video object
     video_dict = {
@@ -242,86 +530,438 @@ async def create_video(
         "title": title,
         "description": description,
         "category": category,
-        "video_data": video_data
+        "video_data": video_data,
+        **media_fields
     }
-    video_obj = Video(**video_dict)
+    return await publish_video(Video(**video_dict))
+
+@api_router.post("/videos/upload-ticket")
+async def create_upload_ticket(ticket_request: UploadTicketRequest):
+    """Signed permission to POST /api/videos a body of at most ``size`` bytes"""
+    if ticket_request.size <= 0:
+        raise HTTPException(status_code=400, detail="size must be positive")
+    if ticket_request.size > MAX_FORM_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Form uploads are limited to {MAX_FORM_UPLOAD_BYTES} bytes, use POST /api/uploads for larger videos"
+        )
     
-    # Generate AI tags and skill rating
-    video_obj.ai_generated_tags = await generate_video_tags(video_dict)
-    video_obj.ai_skill_rating = await generate_skill_rating(video_dict)
+    user = await db.users.find_one({"id": ticket_request.user_id}, {"_id": 0, "id": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    # Save to database
-    await db.videos.insert_one(video_obj.dict())
+    ticket = upload_tickets.issue(ticket_request.user_id, ticket_request.size)
+    return {
+        "ticket": upload_tickets.encode(ticket),
+        "max_bytes": ticket.max_bytes,
+        "expires_at": datetime.utcfromtimestamp(ticket.expires_at)
+    }
+
+async def publish_video(video_obj: Video) -> Video:
+    """Insert a stored upload and schedule its background processing"""
+    video_doc = video_obj.dict()
+    video_doc["search_terms"] = search.video_search_terms(video_doc)
+    video_doc["trend_log_score"] = trending.log_weight("upload")
+    await db.videos.insert_one(video_doc)
+    feed_cache.invalidate()
+    
+    # AI tags and rating, poster and preview frames are filled in by
+    # background workers, renditions once a transcoder has run the job
+    enrichment_queue.submit(video_obj.id)
+    thumbnail_pipeline.submit(video_obj.id, str(blob_store.path(video_obj.video_blob)))
+    timeline_service.submit(video_doc)
+    await db.transcode_jobs.insert_one(new_job(video_obj.id))
     return video_obj
 
-@api_router.get("/videos", response_model=List[VideoResponse])
-async def get_videos(limit: int = 20, skip: int = 0):
-    videos = await db.videos.find().skip(skip).limit(limit).to_list(limit)
+# A video in analysis is leased to one worker; one that stays "processing"
+# past its lease belonged to a worker that died and is claimed again
+ANALYSIS_LEASE = timedelta(seconds=float(os.environ.get('ANALYSIS_LEASE_SECONDS', '300')))
+
+def analysis_claimable(now: datetime) -> dict:
+    return {"$or": [
+        {"analysis_status": "pending"},
+        {"analysis_status": "processing", "analysis_lease_until": {"$lt": now}},
+    ]}
+
+async def analyze_video(video_id: str):
+    """Enrichment queue handler: AI tags and skill rating for a new video"""
+    now = datetime.utcnow()
+    # Claim first so other workers recovering the same video skip the LLM
+    video = await db.videos.find_one_and_update(
+        {"id": video_id, **analysis_claimable(now)},
+        {"$set": {"analysis_status": "processing", "analysis_lease_until": now + ANALYSIS_LEASE}},
+        projection={"_id": 0, "id": 1, "user_id": 1, "title": 1, "description": 1, "category": 1}
+    )
+    if not video:
+        return
+    try:
+        tags, rating = await asyncio.gather(generate_video_tags(video), generate_skill_rating(video))
+    except Exception:
+        await db.videos.update_one(
+            {"id": video_id, "analysis_status": "processing"},
+            {"$set": {"analysis_status": "pending"}, "$unset": {"analysis_lease_until": ""}}
+        )
+        raise
+    await db.videos.update_one(
+        {"id": video_id},
+        {"$set": {
+            "ai_generated_tags": tags,
+            "ai_skill_rating": rating,
+            "search_terms": search.video_search_terms(dict(video, ai_generated_tags=tags)),
+            "analysis_status": "done"
+        }, "$unset": {"analysis_lease_until": ""}}
+    )
+    feed_cache.invalidate()
+    await db.users.update_one({"id": video["user_id"]}, {"$max": {"skill_rating": rating}})
+
+async def find_unanalyzed_videos(limit: int) -> List[str]:
+    """Pending videos and those whose analysis lease ran out"""
+    videos = await db.videos.find(
+        analysis_claimable(datetime.utcnow()), {"_id": 0, "id": 1}
+    ).sort("created_at", 1).limit(limit).to_list(limit)
+    return [video["id"] for video in videos]
+
+enrichment_queue = EnrichmentQueue(analyze_video, workers=int(os.environ.get('ENRICHMENT_WORKERS', '2')))
+view_flusher = ViewFlusher(
+    db.videos,
+    score=lambda count: trending.add_score("view", count),
+    interval=float(os.environ.get('VIEW_FLUSH_SECONDS', '1')),
+)
+
+# Resumable uploads: init, PUT chunks by index, complete
+def upload_status(session: dict) -> dict:
+    missing = missing_chunks(session)
+    return {
+        "id": session["id"],
+        "status": session["status"],
+        "total_size": session["total_size"],
+        "chunk_size": session["chunk_size"],
+        "chunk_count": session["chunk_count"],
+        "received_count": session["chunk_count"] - len(missing),
+        "missing": missing,
+        "expires_at": session["expires_at"],
+        "video_id": session.get("video_id")
+    }
+
+async def get_upload_session(upload_id: str) -> dict:
+    session = await db.upload_sessions.find_one({"id": upload_id}, {"_id": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+@api_router.post("/uploads", dependencies=[
+    Depends(rate_limiter.limit("upload")), Depends(admission.admit("upload"))
+])
+async def create_upload(upload: UploadInit):
+    if upload.total_size <= 0:
+        raise HTTPException(status_code=400, detail="total_size must be positive")
+    if not MIN_CHUNK_SIZE <= upload.chunk_size <= MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes"
+        )
+    if upload.total_size > MAX_VIDEO_BYTES:
+        raise HTTPException(status_code=413, detail=f"Uploads are limited to {MAX_VIDEO_BYTES} bytes")
     
-    # Enrich videos with user data
-    enriched_videos = []
+    user = await db.users.find_one({"id": upload.user_id}, {"_id": 0, "id": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    session = new_session(
+        upload.user_id,
+        {"title": upload.title, "description": upload.description, "category": upload.category},
+        total_size=upload.total_size,
+        chunk_size=upload.chunk_size,
+        content_type=upload.content_type,
+        sha256=upload.sha256
+    )
+    await db.upload_sessions.insert_one(dict(session))
+    return upload_status(session)
+
+@api_router.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    return upload_status(await get_upload_session(upload_id))
+
+@api_router.put("/uploads/{upload_id}/chunks/{index}", dependencies=[Depends(admission.admit("upload"))])
+async def put_upload_chunk(upload_id: str, index: int, request: Request):
+    """Store one chunk; send its SHA-256 hex digest in X-Chunk-SHA256"""
+    session = await get_upload_session(upload_id)
+    if session["status"] != "open":
+        raise HTTPException(status_code=409, detail=f"Upload is {session['status']}")
+    if not 0 <= index < session["chunk_count"]:
+        raise HTTPException(status_code=400, detail="Chunk index out of range")
+    
+    expected_sha256 = request.headers.get("x-chunk-sha256")
+    stored_sha256 = session["checksums"].get(str(index))
+    if stored_sha256 and expected_sha256 and stored_sha256 == expected_sha256.lower():
+        # Retransmission of a chunk we already have
+        return {"index": index, "sha256": stored_sha256, **upload_status(session)}
+    
+    try:
+        checksum = await chunk_store.write_chunk(session, index, request.stream(), expected_sha256)
+    except ChunkError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    session = await db.upload_sessions.find_one_and_update(
+        {"id": upload_id, "status": "open"},
+        {
+            "$addToSet": {"received": index},
+            "$set": {f"checksums.{index}": checksum, "expires_at": datetime.utcnow() + SESSION_TTL}
+        },
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not session:
+        raise HTTPException(status_code=409, detail="Upload is no longer open")
+    return {"index": index, "sha256": checksum, **upload_status(session)}
+
+@api_router.post("/uploads/{upload_id}/complete", response_model=Video, dependencies=[
+    Depends(admission.admit("upload"))
+])
+async def complete_upload(upload_id: str):
+    """Publish the assembled upload; AI fields follow as for POST /api/videos"""
+    # Claim the session so concurrent completes cannot publish twice
+    session = await db.upload_sessions.find_one_and_update(
+        {"id": upload_id, "status": "open"},
+        {"$set": {"status": "finalizing"}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not session:
+        existing = await get_upload_session(upload_id)
+        raise HTTPException(status_code=409, detail=f"Upload is {existing['status']}")
+    
+    missing = missing_chunks(session)
+    try:
+        if missing:
+            raise ChunkError(400, f"Missing chunks: {missing[:20]}")
+        media_fields = await asyncio.to_thread(chunk_store.assemble, session, blob_store)
+    except ChunkError as e:
+        await db.upload_sessions.update_one({"id": upload_id}, {"$set": {"status": "open"}})
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    video_obj = Video(
+        user_id=session["user_id"],
+        **session["metadata"],
+        # Chunked uploads are too large to inline; clients play from the
+        # media endpoint instead
+        video_data="",
+        **media_fields
+    )
+    video_obj.video_data = media.media_url(video_obj.id)
+    video_obj = await publish_video(video_obj)
+    
+    await db.upload_sessions.update_one(
+        {"id": upload_id},
+        {"$set": {"status": "complete", "video_id": video_obj.id}}
+    )
+    chunk_store.discard(upload_id)
+    return video_obj
+
+@api_router.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    result = await db.upload_sessions.delete_one({"id": upload_id, "status": "open"})
+    if not result.deleted_count:
+        await get_upload_session(upload_id)
+        raise HTTPException(status_code=409, detail="Upload cannot be aborted")
+    chunk_store.discard(upload_id)
+    return {"message": "Upload aborted"}
+
+async def export_video_batch(videos: List[dict]) -> List[dict]:
     for video in videos:
-        user = await db.users.find_one({"id": video["user_id"]})
-        if user:
-            video_response = VideoResponse(
-                **video,
-                user_name=user["name"],
-                user_username=user["username"]
-            )
-            enriched_videos.append(video_response)
+        video["video_data"] = media.media_url(video["id"])
+    return await enrich_videos(videos)
+
+@api_router.get("/videos", response_model=List[VideoResponse])
+async def get_videos(limit: Optional[int] = None, skip: int = 0, stream: bool = False,
+                     fields: Optional[str] = None):
+    """A page of videos, or with ``stream=true`` every video from ``skip`` on
+    (up to ``limit``) as NDJSON"""
+    requested = requested_fields(fields, VIDEO_SHAPE)
+    if stream:
+        cursor = feed_db.videos.find({}, field_projection(
+            requested, {"_id": 0, "video_data": 0, "search_terms": 0}, required=("id", "user_id")
+        ))
+        async def batch(videos):
+            return select_fields(await export_video_batch(videos), requested)
+        return ndjson_response(cursor.skip(skip).limit(limit or 0), batch)
     
-    return enriched_videos
+    limit = limit or 20
+    
+    async def load(projection):
+        videos = await feed_db.videos.find({}, projection).skip(skip).limit(limit).to_list(limit)
+        # Enrich videos with user data
+        return await enrich_videos(videos)
+    
+    # Every client loads the first pages on start; serve those from memory
+    # (whole, fieldsets are cut from the cached page)
+    if skip + limit <= 100:
+        page = await feed_cache.get_or_load(
+            ("videos", limit, skip), lambda: load({"_id": 0, "search_terms": 0})
+        )
+        return ORJSONResponse(select_fields(page, requested))
+    projection = field_projection(requested, {"_id": 0, "search_terms": 0}, required=("id", "user_id"))
+    return ORJSONResponse(select_fields(await load(projection), requested))
 
 @api_router.get("/videos/{video_id}", response_model=VideoResponse)
-async def get_video(video_id: str):
-    video = await db.videos.find_one({"id": video_id})
+async def get_video(video_id: str, fields: Optional[str] = None):
+    requested = requested_fields(fields, VIDEO_SHAPE)
+    video = await db.videos.find_one({"id": video_id}, field_projection(
+        requested, {"_id": 0, "search_terms": 0}, required=("id", "user_id")
+    ))
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     
-    # Increment view count
-    await db.videos.update_one({"id": video_id}, {"$inc": {"views": 1}})
-    video["views"] += 1
+    # Views (and their trending score) are buffered and flushed in bulk
+    view_flusher.add(video_id)
+    if "views" in video:
+        video["views"] += view_flusher.pending(video_id)
     
     # Get user data
-    user = await db.users.find_one({"id": video["user_id"]})
+    user = (await user_cache.get_many([video["user_id"]])).get(video["user_id"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return VideoResponse(
-        **video,
-        user_name=user["name"],
-        user_username=user["username"]
+    return ORJSONResponse(select_fields(shape_document(
+        VIDEO_SHAPE, video, user_name=user["name"], user_username=user["username"]
+    ), requested))
+
+@api_router.api_route("/videos/{video_id}/media", methods=["GET", "HEAD"])
+async def get_video_media(video_id: str, request: Request):
+    """Raw video bytes with byte ranges and conditional requests"""
+    video = await db.videos.find_one(
+        {"id": video_id},
+        {"_id": 0, "video_blob": 1, "content_hash": 1, "content_type": 1, "content_length": 1, "created_at": 1}
+    )
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    if not video.get("video_blob") or not blob_store.exists(video["video_blob"]):
+        # Uploaded before videos were kept in the blob store: move it once
+        payload = await db.videos.find_one({"id": video_id}, {"_id": 0, "video_data": 1})
+        video_data = payload.get("video_data") if payload else None
+        if not media.is_inline_payload(video_data):
+            # Chunked uploads only ever lived in the blob store
+            raise HTTPException(status_code=404, detail="Video media not found")
+        try:
+            media_fields = await asyncio.to_thread(media.store_video_data, blob_store, video_data)
+        except media.InvalidVideoData:
+            raise HTTPException(status_code=410, detail="Video media is unreadable")
+        await db.videos.update_one({"id": video_id}, {"$set": media_fields})
+        video.update(media_fields)
+    
+    return conditional_file_response(
+        request,
+        blob_store.path(video["video_blob"]),
+        size=video["content_length"],
+        etag=media.etag_for(video["content_hash"]),
+        last_modified=video["created_at"],
+        media_type=video["content_type"]
     )
 
-@api_router.post("/videos/{video_id}/like")
-async def like_video(video_id: str, user_id: str = Form(...)):
-    video = await db.videos.find_one({"id": video_id})
+@api_router.get("/videos/{video_id}/manifest.m3u8")
+async def get_video_manifest(video_id: str):
+    """HLS master playlist over the transcoded rendition ladder"""
+    video = await db.videos.find_one({"id": video_id}, {"_id": 0, "renditions": 1})
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
+    renditions = sorted(video.get("renditions") or [], key=lambda r: r["bandwidth"])
+    if not renditions:
+        raise HTTPException(status_code=404, detail="Renditions not ready")
     
-    likes = video.get("likes", [])
-    if user_id in likes:
-        # Unlike
-        likes.remove(user_id)
-    else:
-        # Like
-        likes.append(user_id)
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for rendition in renditions:
+        lines.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={rendition['bandwidth']},"
+            f"RESOLUTION={rendition['width']}x{rendition['height']},"
+            f"CODECS=\"avc1.4d401f,mp4a.40.2\""
+        )
+        lines.append(blob_url(rendition["playlist"]))
     
-    await db.videos.update_one({"id": video_id}, {"$set": {"likes": likes}})
-    return {"message": "Like updated", "likes_count": len(likes)}
+    return Response(
+        "\n".join(lines) + "\n",
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": "public, max-age=60"}
+    )
+
+@api_router.post("/videos/{video_id}/like", dependencies=[Depends(rate_limiter.limit("write"))])
+async def like_video(video_id: str, user_id: str = Form(...)):
+    # Toggle atomically instead of reading the whole video first: try to
+    # like, and if the user already liked it, unlike
+    video = await db.videos.find_one_and_update(
+        {"id": video_id, "likes": {"$ne": user_id}},
+        [{"$set": {
+            "likes": {"$concatArrays": [{"$ifNull": ["$likes", []]}, [{"$literal": user_id}]]},
+            **trending.add_score("like"),
+        }}],
+        projection={"_id": 0, "likes": 1, "user_id": 1, "title": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if video and video["user_id"] != user_id:
+        # Bursts of likes on one video reach the owner as one event
+        await event_bus.publish(new_event(
+            "like",
+            video["user_id"],
+            {"video_id": video_id, "title": video.get("title"), "user_id": user_id,
+             "likes_count": len(video["likes"])},
+            coalesce_key=f"like:{video_id}"
+        ))
+    if not video:
+        video = await db.videos.find_one_and_update(
+            {"id": video_id, "likes": user_id},
+            [{"$set": {
+                "likes": {"$filter": {"input": "$likes", "cond": {"$ne": ["$$this", {"$literal": user_id}]}}},
+                **trending.remove_score("like"),
+            }}],
+            projection={"_id": 0, "likes": 1},
+            return_document=ReturnDocument.AFTER
+        )
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    feed_cache.invalidate()
+    
+    return {"message": "Like updated", "likes_count": len(video.get("likes", []))}
+
+# Content-addressed media (thumbnails, preview frames, HLS playlists and
+# segments); keys never change content, so responses are cacheable forever
+BLOB_MEDIA_TYPES = {
+    "webp": "image/webp",
+    "jpg": "image/jpeg",
+    "m3u8": "application/vnd.apple.mpegurl",
+    "ts": "video/mp2t",
+}
+
+@api_router.api_route("/blobs/{key}", methods=["GET", "HEAD"])
+async def get_blob(key: str, request: Request):
+    try:
+        path = blob_store.path(key)
+    except InvalidBlobKey:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return conditional_file_response(
+        request,
+        path,
+        size=path.stat().st_size,
+        etag=f'"{key}"',
+        last_modified=file_mtime(path),
+        media_type=BLOB_MEDIA_TYPES.get(path.suffix.lstrip("."), "application/octet-stream")
+    )
 
 # Connection Routes
-@api_router.post("/connections", response_model=Connection)
+@api_router.post("/connections", response_model=Connection, dependencies=[
+    Depends(rate_limiter.limit("write"))
+])
 async def create_connection(
     from_user_id: str = Form(...),
     to_user_id: str = Form(...),
     message: str = Form("")
 ):
-    # Verify both users exist
-    from_user = await db.users.find_one({"id": from_user_id})
-    to_user = await db.users.find_one({"id": to_user_id})
+    # Verify both users exist with a single query
+    user_ids = list({from_user_id, to_user_id})
+    found_users = await db.users.count_documents({"id": {"$in": user_ids}})
     
-    if not from_user or not to_user:
+    if found_users != len(user_ids):
         raise HTTPException(status_code=404, detail="User not found")
     
     # Check if connection already exists
@@ -341,19 +981,30 @@ async def create_connection(
     }
     connection_obj = Connection(**connection_dict)
     
-    await db.connections.insert_one(connection_obj.dict())
+    await durable_db.connections.insert_one(connection_obj.dict())
+    await event_bus.publish(new_event(
+        "connection_request", to_user_id, jsonable_encoder(connection_obj)
+    ))
     return connection_obj
 
 @api_router.get("/connections/{user_id}")
-async def get_connections(user_id: str):
-    connections = await db.connections.find({
+async def get_connections(user_id: str, stream: bool = False, fields: Optional[str] = None):
+    """The user's first 100 connections, or with ``stream=true`` all of them
+    as NDJSON"""
+    requested = requested_fields(fields, CONNECTION_SHAPE)
+    cursor = db.connections.find({
         "$or": [
             {"from_user_id": user_id},
             {"to_user_id": user_id}
         ]
-    }).to_list(100)
+    }, field_projection(requested, {"_id": 0}))
+    if stream:
+        async def batch(connections):
+            return select_fields(connections, requested)
+        return ndjson_response(cursor, batch if requested is not None else None)
     
-    return {"connections": connections}
+    connections = await cursor.to_list(100)
+    return ORJSONResponse({"connections": select_fields(connections, requested)})
 
 @api_router.post("/connections/{connection_id}/respond")
 async def respond_to_connection(connection_id: str, status: str = Form(...)):
@@ -364,16 +1015,28 @@ async def respond_to_connection(connection_id: str, status: str = Form(...)):
     if not connection:
         raise HTTPException(status_code=404, detail="Connection not found")
     
-    await db.connections.update_one(
-        {"id": connection_id},
+    # Only the request that actually changes the status updates timelines
+    result = await durable_db.connections.update_one(
+        {"id": connection_id, "status": {"$ne": status}},
         {"$set": {"status": status}}
     )
+    if result.modified_count:
+        if status == "accepted":
+            await timeline_service.connect(connection["from_user_id"], connection["to_user_id"])
+        elif connection["status"] == "accepted":
+            await timeline_service.disconnect(connection["from_user_id"], connection["to_user_id"])
+        await event_bus.publish(new_event(
+            f"connection_{status}",
+            connection["from_user_id"],
+            {"connection_id": connection_id, "to_user_id": connection["to_user_id"], "status": status}
+        ))
     
     return {"message": f"Connection {status}"}
 
 # AI-powered recommendations
 @api_router.get("/recommendations/{user_id}")
-async def get_recommendations(user_id: str):
+async def get_recommendations(user_id: str, fields: Optional[str] = None):
+    requested = requested_fields(fields, VIDEO_SHAPE)
     user = await db.users.find_one({"id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -382,28 +1045,229 @@ async def get_recommendations(user_id: str):
     user_tags = user.get("tags", [])
     
     # Find videos with similar tags
-    videos = await db.videos.find({
+    videos = await feed_db.videos.find({
         "user_id": {"$ne": user_id},
         "ai_generated_tags": {"$in": user_tags}
-    }).limit(10).to_list(10)
+    }, field_projection(
+        requested, {"_id": 0, "search_terms": 0}, required=("id", "user_id")
+    )).limit(10).to_list(10)
     
     # Enrich with user data
-    enriched_videos = []
-    for video in videos:
-        video_user = await db.users.find_one({"id": video["user_id"]})
-        if video_user:
-            video_response = VideoResponse(
-                **video,
-                user_name=video_user["name"],
-                user_username=video_user["username"]
-            )
-            enriched_videos.append(video_response)
+    return ORJSONResponse({"recommended_videos": select_fields(await enrich_videos(videos), requested)})
+
+MAX_PAGE_LIMIT = 50
+
+def page_limit(limit: int) -> int:
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+    return limit
+
+# Push notifications (connection requests and responses, likes)
+@api_router.get("/notifications/{user_id}/stream")
+async def stream_notifications(user_id: str):
+    """Server-Sent Events stream of the user's notifications"""
+    return StreamingResponse(
+        event_bus.stream(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Following feed from the materialized timelines
+@api_router.get("/feed/{user_id}")
+async def get_feed(user_id: str, limit: int = 20, before: Optional[datetime] = None,
+                   fields: Optional[str] = None):
+    limit = page_limit(limit)
+    requested = requested_fields(fields, VIDEO_SHAPE)
+    entries = await timeline_service.read(user_id, limit, before)
+    if not entries:
+        return {"videos": [], "next_before": None}
     
-    return {"recommended_videos": enriched_videos}
+    video_ids = [entry["video_id"] for entry in entries]
+    videos = await feed_db.videos.find({"id": {"$in": video_ids}}, field_projection(
+        requested, {"_id": 0, "video_data": 0, "search_terms": 0}, required=("id", "user_id")
+    )).to_list(len(video_ids))
+    videos_by_id = {video["id"]: video for video in videos}
+    ordered = [videos_by_id[video_id] for video_id in video_ids if video_id in videos_by_id]
+    for video in ordered:
+        video["video_data"] = media.media_url(video["id"])
+    
+    return ORJSONResponse({
+        "videos": select_fields(await enrich_videos(ordered), requested),
+        "next_before": entries[-1]["created_at"] if len(entries) == limit else None
+    })
+
+# Search: relevance ranked text search, filters, autocomplete
+async def run_search(collection, q: Optional[str], filters: dict, limit: int, cursor: Optional[str],
+                     exclude=(), projection: Optional[dict] = None) -> dict:
+    query = (q or "").strip() or None
+    try:
+        pipeline = search.search_pipeline(query, filters, limit, cursor, exclude=exclude, projection=projection)
+    except search.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    documents = await collection.aggregate(pipeline).to_list(limit + 1)
+    return search.paginate(documents, limit, query)
+
+@api_router.get("/search/videos")
+async def search_videos(
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    genre: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    requested = requested_fields(fields, VIDEO_SHAPE)
+    projection = field_projection(requested, None, required=("id", "user_id"))
+    if projection is not None:
+        projection.pop("video_data", None)  # replaced by the media URL
+    filters = {key: value for key, value in (("category", category), ("genre", genre)) if value}
+    page = await run_search(feed_db.videos, q, filters, page_limit(limit), cursor,
+                            exclude=["video_data"], projection=projection)
+    for video in page["results"]:
+        video["video_data"] = media.media_url(video["id"])
+    page["results"] = select_fields(await enrich_videos(page["results"]), requested)
+    return ORJSONResponse(page)
+
+@api_router.get("/search/users")
+async def search_users(
+    q: Optional[str] = None,
+    profile_type: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    requested = requested_fields(fields, USER_SHAPE)
+    filters = {"profile_type": profile_type} if profile_type else {}
+    page = await run_search(feed_db.users, q, filters, page_limit(limit), cursor,
+                            projection=field_projection(requested, None))
+    page["results"] = select_fields([user_document(user) for user in page["results"]], requested)
+    return ORJSONResponse(page)
+
+@api_router.get("/search/autocomplete")
+async def autocomplete(q: str, limit: int = 10):
+    """Completions for the word being typed, plus matching people"""
+    prefix = search.autocomplete_prefix(q)
+    if prefix is None:
+        return {"terms": [], "users": []}
+    limit = page_limit(limit)
+    
+    # Sample enough matches to rank completions by frequency
+    sample = limit * 5
+    videos, users = await asyncio.gather(
+        db.videos.find(search.prefix_filter(prefix), {"_id": 0, "search_terms": 1}).limit(sample).to_list(sample),
+        db.users.find(
+            search.prefix_filter(prefix),
+            {"_id": 0, "id": 1, "name": 1, "username": 1, "profile_type": 1, "profile_image": 1, "search_terms": 1}
+        ).limit(sample).to_list(sample),
+    )
+    terms = search.suggest_terms(videos + users, prefix, limit)
+    for user in users:
+        user.pop("search_terms", None)
+    return {"terms": terms, "users": users[:limit]}
+
+# Discovery: filtered listings, see discovery.py for the supporting indexes
+@api_router.get("/discover/users", response_model=List[User])
+async def discover_users(
+    profile_type: Optional[str] = None,
+    verification_status: Optional[str] = None,
+    tags: List[str] = Query([]),
+    min_rating: Optional[float] = None,
+    max_rating: Optional[float] = None,
+    sort: str = "rating",
+    limit: int = 20,
+    skip: int = 0,
+    fields: Optional[str] = None
+):
+    requested = requested_fields(fields, USER_SHAPE)
+    try:
+        query, order = discovery.user_query(profile_type, verification_status, tags, min_rating, max_rating, sort)
+    except discovery.InvalidFilter as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    limit = page_limit(limit)
+    projection = field_projection(requested, {"_id": 0, "search_terms": 0})
+    users = await feed_db.users.find(query, projection).sort(order).skip(skip).limit(limit).to_list(limit)
+    return ORJSONResponse(select_fields([user_document(user) for user in users], requested))
+
+@api_router.get("/discover/videos", response_model=List[VideoResponse])
+async def discover_videos(
+    category: Optional[str] = None,
+    genre: Optional[str] = None,
+    verification_status: Optional[str] = None,
+    tags: List[str] = Query([]),
+    min_rating: Optional[float] = None,
+    max_rating: Optional[float] = None,
+    sort: str = "rating",
+    limit: int = 20,
+    skip: int = 0,
+    fields: Optional[str] = None
+):
+    requested = requested_fields(fields, VIDEO_SHAPE)
+    try:
+        query, order = discovery.video_query(
+            category, genre, verification_status, tags, min_rating, max_rating, sort
+        )
+    except discovery.InvalidFilter as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    limit = page_limit(limit)
+    videos = await feed_db.videos.find(query, field_projection(
+        requested, {"_id": 0, "video_data": 0, "search_terms": 0}, required=("id", "user_id")
+    )).sort(order).skip(skip).limit(limit).to_list(limit)
+    for video in videos:
+        video["video_data"] = media.media_url(video["id"])
+    return ORJSONResponse(select_fields(await enrich_videos(videos), requested))
+
+# Trending and leaderboards, served from the in-memory board
+trending_board = TrendingBoard(
+    feed_db.videos,
+    enrich=enrich_videos,
+    categories=discovery.CATEGORIES,
+    interval=float(os.environ.get('TRENDING_REFRESH_SECONDS', '30')),
+)
+
+def board_limit(limit: int) -> int:
+    if not 1 <= limit <= trending.BOARD_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {trending.BOARD_SIZE}")
+    return limit
+
+@api_router.get("/trending", response_model=List[VideoResponse])
+async def get_trending(limit: int = 20, fields: Optional[str] = None):
+    requested = requested_fields(fields, VIDEO_SHAPE)
+    return ORJSONResponse(select_fields(trending_board.trending[:board_limit(limit)], requested))
+
+@api_router.get("/trending/top-rated-week", response_model=List[VideoResponse])
+async def get_top_rated_week(limit: int = 20, fields: Optional[str] = None):
+    requested = requested_fields(fields, VIDEO_SHAPE)
+    return ORJSONResponse(select_fields(trending_board.top_rated_week[:board_limit(limit)], requested))
+
+@api_router.get("/trending/categories/{category}", response_model=List[VideoResponse])
+async def get_category_leaderboard(category: str, limit: int = 20, fields: Optional[str] = None):
+    if category not in discovery.CATEGORIES:
+        raise HTTPException(status_code=404, detail="Unknown category")
+    requested = requested_fields(fields, VIDEO_SHAPE)
+    board = trending_board.by_category.get(category, [])[:board_limit(limit)]
+    return ORJSONResponse(select_fields(board, requested))
+
+# Prometheus scrape endpoint, served outside the /api prefix
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Inside CORS so rejections still carry the CORS headers
+app.add_middleware(
+    UploadLimitMiddleware,
+    rules=[
+        ("POST", r"/api/videos", MAX_FORM_UPLOAD_BYTES),
+        ("PUT", r"/api/uploads/[^/]+/chunks/\d+", MAX_CHUNK_SIZE),
+    ],
+    default_limit=MAX_REQUEST_BYTES,
+    signer=upload_tickets,
+    ticket_routes=[("POST", r"/api/videos")],
+    require_ticket=os.environ.get('REQUIRE_UPLOAD_TICKET', '0') == '1',
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -412,13 +1276,112 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Negotiated gzip/brotli for JSON, NDJSON and playlists; media, ranges and
+# SSE pass through untouched
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get('COMPRESSION_MIN_BYTES', '1024')),
+    gzip_level=int(os.environ.get('GZIP_LEVEL', '6')),
+    brotli_quality=int(os.environ.get('BROTLI_QUALITY', '4')),
 )
-logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+# Development/CI aid: flag query budget overruns, N+1 shapes and COLLSCANs
+if os.environ.get('QUERY_DEBUG', '0') == '1':
+    app.add_middleware(
+        QueryWatchMiddleware,
+        database=db,
+        default_budget=int(os.environ.get('QUERY_BUDGET', '10')),
+    )
+
+# Added last so it wraps CORS and sees the full request
+app.add_middleware(
+    InstrumentationMiddleware,
+    server_timing=os.environ.get('SERVER_TIMING', '0') == '1',
+)
+
+async def ensure_indexes():
+    """Create the indexes the API relies on for uniqueness and lookups
+
+    Every index is attempted even when others fail. Failed lookup indexes
+    are only logged, but a missing unique index raises ``UniqueIndexError``
+    and the worker does not start.
+    """
+    results = await asyncio.gather(
+        create_indexes(db.users, [
+            IndexModel("id", unique=True),
+            IndexModel("email", unique=True),
+            IndexModel("username", unique=True),
+        ]),
+        create_indexes(db.transcode_jobs, [
+            IndexModel([("status", 1), ("created_at", 1)]),
+            IndexModel("video_id"),
+        ]),
+        create_indexes(db.upload_sessions, [
+            IndexModel("id", unique=True),
+            # Expired sessions are removed by Mongo, their chunks by the sweeper
+            IndexModel("expires_at", expireAfterSeconds=0),
+        ]),
+        create_indexes(db.videos, [
+            IndexModel("analysis_status", partialFilterExpression={"analysis_status": "pending"}),
+            IndexModel([("analysis_status", 1), ("analysis_lease_until", 1)],
+                       partialFilterExpression={"analysis_status": "processing"}),
+        ]),
+        search.ensure_search_indexes(db),
+        discovery.ensure_discovery_indexes(db),
+        trending.ensure_trending_indexes(db),
+        ensure_timeline_indexes(db),
+        ensure_notification_indexes(db),
+        ensure_rate_limit_indexes(db),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+async def warm_caches():
+    """Fill the trending boards, listing pages and user cache before traffic"""
+    await trending_board.refresh()
+    await user_cache.warm(int(os.environ.get('USER_CACHE_WARM', '1000')))
+    await get_videos()
+
+@asynccontextmanager
+async def lifespan(app):
+    """Per-worker startup and shutdown of the Mongo client and background work
+
+    A worker only takes requests once Mongo answers, indexes exist and the
+    caches are warm; on shutdown buffered views are flushed and queued work
+    is drained before the client closes.
+    """
+    logger.info(f"LLM provider: {llm.provider()}")
+    database.connect(mongo_listeners)
+    await database.ping(attempts=int(os.environ.get('MONGO_STARTUP_ATTEMPTS', '5')))
+    await ensure_indexes()
+    try:
+        await warm_caches()
+    except Exception as e:
+        logger.warning(f"Cache warm-up failed: {e}")
+    
+    view_flusher.start()
+    enrichment_queue.start()
+    recovered = await enrichment_queue.recover(find_unanalyzed_videos)
+    if recovered:
+        logger.info(f"Re-queued {recovered} videos awaiting analysis")
+    upload_sweeper.start()
+    trending_board.start()
+    if notification_source is not None:
+        notification_source.start()
+    try:
+        yield
+    finally:
+        if notification_source is not None:
+            await notification_source.stop()
+        await trending_board.stop()
+        await upload_sweeper.stop()
+        await enrichment_queue.stop(timeout=30)
+        await view_flusher.stop()
+        await timeline_service.drain(timeout=30)
+        await thumbnail_pipeline.drain(timeout=30)
+        await llm.close_clients()
+        database.close()
+
+app.router.lifespan_context = lifespan
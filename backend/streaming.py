@@ -0,0 +1,60 @@
+"""NDJSON export streams over Motor cursors.
+
+The listing endpoints take ``stream=true`` to return every matching
+document as newline-delimited JSON instead of one page. Documents are
+pulled from the cursor ``batch_size`` at a time, each batch is transformed
+(for videos, one batched author lookup) and written out before the next
+one is fetched, so memory stays at one batch however large the collection
+is, and the response starts as soon as the first batch is encoded.
+"""
+import inspect
+import os
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+import orjson
+from starlette.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+Transform = Callable[[List[dict]], Awaitable[List[dict]]]
+
+
+def export_batch_size() -> int:
+    return int(os.environ.get('EXPORT_BATCH_SIZE', '200'))
+
+
+async def _encode(batch: List[dict], transform: Optional[Transform]) -> bytes:
+    if transform is not None:
+        batch = await transform(batch)
+    return b"".join(orjson.dumps(document) + b"\n" for document in batch)
+
+
+async def ndjson_batches(cursor, transform: Optional[Transform] = None,
+                         batch_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """One encoded chunk per ``batch_size`` documents of ``cursor``"""
+    batch_size = batch_size or export_batch_size()
+    cursor.batch_size(batch_size)
+    batch = []
+    try:
+        async for document in cursor:
+            batch.append(document)
+            if len(batch) == batch_size:
+                yield await _encode(batch, transform)
+                batch = []
+        if batch:
+            yield await _encode(batch, transform)
+    finally:
+        # Kill the server-side cursor when the client goes away mid-export
+        # (mongomock cursors close synchronously)
+        closed = cursor.close()
+        if inspect.isawaitable(closed):
+            await closed
+
+
+def ndjson_response(cursor, transform: Optional[Transform] = None,
+                    batch_size: Optional[int] = None) -> StreamingResponse:
+    return StreamingResponse(
+        ndjson_batches(cursor, transform, batch_size),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,144 @@
+"""Poster and preview frame generation for uploaded videos.
+
+Frames are extracted with ffmpeg in a separate process pool, so decoding
+never competes with request handling for the event loop or the GIL. Each
+frame is scaled down, encoded as WebP (JPEG if the ffmpeg build lacks
+libwebp) and written to the blob store; only the blob keys travel back to
+the server process.
+"""
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from blobstore import LocalBlobStore
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTH = 320
+PREVIEW_POSITIONS = (0.25, 0.5, 0.75)
+FRAME_TIMEOUT_SECONDS = 30
+
+_CODECS = {
+    "webp": ("webp", ["-c:v", "libwebp", "-quality", "70", "-f", "webp"]),
+    "jpeg": ("jpg", ["-c:v", "mjpeg", "-q:v", "5", "-f", "mjpeg"]),
+}
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+def probe_duration(path: str) -> float:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", path],
+        capture_output=True, text=True, timeout=FRAME_TIMEOUT_SECONDS,
+    )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return 0.0
+
+
+def extract_frame(path: str, seconds: float, width: int, fmt: str) -> Optional[bytes]:
+    """Encode the frame at ``seconds`` as a ``width`` pixel wide image"""
+    _, codec_args = _CODECS[fmt]
+    command = [
+        "ffmpeg", "-v", "error", "-ss", f"{seconds:.3f}", "-i", path,
+        "-frames:v", "1", "-vf", f"scale={width}:-2", *codec_args, "pipe:1",
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=FRAME_TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0 or not result.stdout:
+        return None
+    return result.stdout
+
+
+def render_thumbnails(video_path: str, blob_root: str, fmt: str = "webp", width: int = THUMBNAIL_WIDTH) -> Dict:
+    """Worker process entry point: store poster and preview frames, return keys"""
+    store = LocalBlobStore(blob_root)
+    duration = probe_duration(video_path)
+    positions = [min(1.0, duration * 0.1)]
+    if duration > 0:
+        positions += [duration * fraction for fraction in PREVIEW_POSITIONS]
+
+    keys: List[str] = []
+    for seconds in positions:
+        frame_format = fmt
+        data = extract_frame(video_path, seconds, width, frame_format)
+        if data is None and frame_format == "webp":
+            frame_format = "jpeg"
+            data = extract_frame(video_path, seconds, width, frame_format)
+        if data is not None:
+            keys.append(store.put(data, _CODECS[frame_format][0]))
+
+    return {"poster": keys[0] if keys else None, "previews": keys[1:]}
+
+
+class ThumbnailPipeline:
+    """Runs thumbnail extraction for new uploads in the background"""
+
+    def __init__(self, store: LocalBlobStore, on_complete: Callable[[str, Dict], Awaitable[None]],
+                 workers: int = 2, fmt: str = "webp", width: int = THUMBNAIL_WIDTH):
+        self.store = store
+        self.on_complete = on_complete
+        self.workers = workers
+        self.fmt = fmt if fmt in _CODECS else "webp"
+        self.width = width
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._enabled: Optional[bool] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = ffmpeg_available()
+            if not self._enabled:
+                logger.warning("ffmpeg/ffprobe not found, thumbnail generation disabled")
+        return self._enabled
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs Motor's threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, video_id: str, video_path: str):
+        """Schedule thumbnail generation for a stored video without waiting for it"""
+        if not self.enabled():
+            return
+        # A fresh context keeps the thumbnail writes out of the uploading
+        # request's metrics and query budget
+        task = contextvars.Context().run(asyncio.create_task, self._process(video_id, video_path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, video_id: str, video_path: str):
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._get_executor(), render_thumbnails, video_path, str(self.store.root), self.fmt, self.width
+            )
+            if result["poster"]:
+                await self.on_complete(video_id, result)
+        except Exception as e:
+            logger.warning(f"Thumbnail generation failed for video {video_id}: {e}")
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Wait for in-flight jobs, then stop the worker processes"""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
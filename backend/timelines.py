@@ -0,0 +1,177 @@
+"""Materialized following feeds with hybrid fan-out.
+
+Each user's ``timelines`` document holds the newest entries from their
+connections, pushed there when a video is published. Authors with more than
+``fanout_limit`` connections are pulled at read time instead.
+"""
+import asyncio
+import contextvars
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from pymongo import IndexModel, UpdateOne
+
+from database import create_indexes
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_LENGTH = 500
+BACKFILL_LENGTH = 20
+WRITE_BATCH = 1000
+
+
+def timeline_entry(video: Dict) -> Dict:
+    return {"video_id": video["id"], "user_id": video["user_id"], "created_at": video["created_at"]}
+
+
+def recent_videos_pipeline(author_id: str) -> List[Dict]:
+    return [
+        {"$match": {"user_id": author_id}},
+        {"$sort": {"created_at": -1}},
+        {"$limit": BACKFILL_LENGTH},
+        {"$project": {"_id": 0, "id": 1, "user_id": 1, "created_at": 1}},
+    ]
+
+
+def push_entries(entries: List[Dict]) -> Dict:
+    return {
+        "$push": {"entries": {"$each": entries, "$sort": {"created_at": -1}, "$slice": TIMELINE_LENGTH}},
+        "$set": {"updated_at": datetime.utcnow()},
+    }
+
+
+async def ensure_timeline_indexes(db):
+    await create_indexes(db.timelines, [IndexModel("owner_id", unique=True)])
+    await create_indexes(db.videos, [IndexModel([("user_id", 1), ("created_at", -1)])])
+    await create_indexes(db.connections, [
+        IndexModel([("from_user_id", 1), ("status", 1)]),
+        IndexModel([("to_user_id", 1), ("status", 1)]),
+    ])
+
+
+class TimelineService:
+    """Maintains and reads the per-user timelines"""
+
+    def __init__(self, db, read_db=None, fanout_limit: int = 5000):
+        self.db = db
+        # Feed reads may go to secondaries
+        self.read_db = read_db or db
+        self.fanout_limit = fanout_limit
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def audience(self, user_id: str) -> List[str]:
+        """Ids of everyone with an accepted connection to ``user_id``"""
+        connections = await self.db.connections.find(
+            {"status": "accepted", "$or": [{"from_user_id": user_id}, {"to_user_id": user_id}]},
+            {"_id": 0, "from_user_id": 1, "to_user_id": 1},
+        ).to_list(None)
+        return list({
+            c["to_user_id"] if c["from_user_id"] == user_id else c["from_user_id"] for c in connections
+        })
+
+    def submit(self, video: Dict):
+        """Fan a new video out in the background"""
+        # A fresh context keeps the fan-out writes out of the publishing
+        # request's metrics and query budget
+        task = contextvars.Context().run(asyncio.create_task, self._fan_out_safely(video))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fan_out_safely(self, video: Dict):
+        try:
+            await self.fan_out(video)
+        except Exception as e:
+            logger.warning(f"Timeline fan-out failed for video {video['id']}: {e}")
+
+    async def fan_out(self, video: Dict):
+        author = await self.db.users.find_one({"id": video["user_id"]}, {"_id": 0, "timeline_pull": 1})
+        if author is None or author.get("timeline_pull"):
+            return
+        audience = await self.audience(video["user_id"])
+        if len(audience) > self.fanout_limit:
+            await self._switch_to_pull(video["user_id"], audience)
+            return
+
+        update = push_entries([timeline_entry(video)])
+        await self._bulk_upsert(audience, update)
+
+    async def _switch_to_pull(self, author_id: str, audience: List[str]):
+        await self._bulk_upsert(audience, {"$addToSet": {"pull_sources": author_id}})
+        await self.db.users.update_one({"id": author_id}, {"$set": {"timeline_pull": True}})
+        logger.info(f"User {author_id} has {len(audience)} connections, timeline switched to fan-out on read")
+
+    async def _bulk_upsert(self, owners: List[str], update: Dict):
+        for start in range(0, len(owners), WRITE_BATCH):
+            await self.db.timelines.bulk_write(
+                [UpdateOne({"owner_id": owner}, update, upsert=True) for owner in owners[start:start + WRITE_BATCH]],
+                ordered=False,
+            )
+
+    async def connect(self, user_a: str, user_b: str):
+        """A connection was accepted: count it and seed both timelines"""
+        pair = [user_a, user_b]
+        users = await self.db.users.find(
+            {"id": {"$in": pair}}, {"_id": 0, "id": 1, "timeline_pull": 1}
+        ).to_list(2)
+        await self.db.users.update_many({"id": {"$in": pair}}, {"$inc": {"connection_count": 1}})
+        pulled = {user["id"] for user in users if user.get("timeline_pull")}
+
+        # Each (pushed) author's own latest videos, in one round trip: a
+        # shared limit would let a prolific author crowd out the other
+        pushed = [user_id for user_id in pair if user_id not in pulled]
+        recent: Dict[str, List[Dict]] = {user_id: [] for user_id in pushed}
+        if pushed:
+            pipeline = recent_videos_pipeline(pushed[0])
+            for author in pushed[1:]:
+                pipeline.append({"$unionWith": {"coll": "videos", "pipeline": recent_videos_pipeline(author)}})
+            for video in await self.db.videos.aggregate(pipeline).to_list(None):
+                recent[video["user_id"]].append(timeline_entry(video))
+
+        operations = []
+        for owner, author in ((user_a, user_b), (user_b, user_a)):
+            if author in pulled:
+                operations.append(UpdateOne({"owner_id": owner}, {"$addToSet": {"pull_sources": author}}, upsert=True))
+            elif recent[author]:
+                operations.append(UpdateOne({"owner_id": owner}, push_entries(recent[author]), upsert=True))
+        if operations:
+            await self.db.timelines.bulk_write(operations, ordered=False)
+
+    async def disconnect(self, user_a: str, user_b: str):
+        """An accepted connection was withdrawn: drop each from the other's timeline"""
+        pair = [user_a, user_b]
+        await self.db.users.update_many({"id": {"$in": pair}}, {"$inc": {"connection_count": -1}})
+        await self.db.timelines.bulk_write([
+            UpdateOne({"owner_id": owner}, {"$pull": {"pull_sources": author, "entries": {"user_id": author}}})
+            for owner, author in ((user_a, user_b), (user_b, user_a))
+        ], ordered=False)
+
+    async def read(self, user_id: str, limit: int, before: Optional[datetime] = None) -> List[Dict]:
+        """Newest ``limit`` entries older than ``before``, pushed and pulled merged"""
+        timeline = await self.read_db.timelines.find_one(
+            {"owner_id": user_id}, {"_id": 0, "entries": 1, "pull_sources": 1}
+        ) or {}
+        entries = [
+            entry for entry in timeline.get("entries", [])
+            if before is None or entry["created_at"] < before
+        ][:limit]
+
+        if timeline.get("pull_sources"):
+            query = {"user_id": {"$in": timeline["pull_sources"]}}
+            if before is not None:
+                query["created_at"] = {"$lt": before}
+            pulled = await self.read_db.videos.find(
+                query, {"_id": 0, "id": 1, "user_id": 1, "created_at": 1}
+            ).sort("created_at", -1).limit(limit).to_list(limit)
+            seen = {entry["video_id"] for entry in entries}
+            entries += [timeline_entry(video) for video in pulled if video["id"] not in seen]
+            entries.sort(key=lambda entry: entry["created_at"], reverse=True)
+        return entries[:limit]
+
+    async def drain(self, timeout: Optional[float] = None):
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
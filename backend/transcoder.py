@@ -0,0 +1,319 @@
+"""Adaptive-bitrate transcoding workers, run outside the API server:
+
+    python transcoder.py --workers 2
+
+Workers claim queued jobs under a renewed lease and store an H.264/AAC HLS
+ladder in the blob store; a job whose worker died is claimed again.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from blobstore import LocalBlobStore, blob_url
+from media import decode_video_data
+
+logger = logging.getLogger(__name__)
+
+# name, height, video bitrate (bits/s)
+LADDER = [
+    ("240p", 240, 400_000),
+    ("480p", 480, 1_000_000),
+    ("720p", 720, 2_500_000),
+]
+AUDIO_BITRATE = 96_000
+SEGMENT_SECONDS = 4
+MAX_ATTEMPTS = 3
+# A running job whose lease expired is assumed to belong to a dead worker
+LEASE_SECONDS = 120
+HEARTBEAT_SECONDS = 30
+TRANSCODE_TIMEOUT_SECONDS = 20 * 60
+
+
+def new_job(video_id: str) -> dict:
+    now = datetime.utcnow()
+    return {
+        "id": str(uuid.uuid4()),
+        "video_id": video_id,
+        "status": "queued",  # queued, running, done, failed
+        "attempts": 0,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "locked_until": None,
+        "lease_id": None,
+    }
+
+
+def probe_video(path: str) -> Dict:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=width,height",
+         "-of", "csv=p=0:s=x", path],
+        capture_output=True, text=True, timeout=60,
+    )
+    try:
+        width, height = (int(value) for value in result.stdout.strip().split("x")[:2])
+    except ValueError:
+        raise RuntimeError(f"Cannot read video dimensions: {result.stderr.strip()}")
+    return {"width": width, "height": height}
+
+
+def ladder_for(source_height: int) -> List[tuple]:
+    """Rungs no taller than the source; tiny sources still get the lowest"""
+    rungs = [rung for rung in LADDER if rung[1] <= source_height]
+    return rungs or LADDER[:1]
+
+
+def transcode_rendition(source: str, out_dir: Path, height: int, bitrate: int):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    command = [
+        "ffmpeg", "-v", "error", "-y", "-i", source,
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-vf", f"scale=-2:{height}",
+        "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main",
+        "-b:v", str(bitrate), "-maxrate", str(int(bitrate * 1.07)), "-bufsize", str(bitrate * 2),
+        "-g", str(SEGMENT_SECONDS * 30), "-sc_threshold", "0",
+        "-c:a", "aac", "-b:a", str(AUDIO_BITRATE), "-ac", "2",
+        "-hls_time", str(SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+        "-hls_segment_filename", str(out_dir / "seg_%04d.ts"),
+        str(out_dir / "index.m3u8"),
+    ]
+    result = subprocess.run(command, capture_output=True, text=True, timeout=TRANSCODE_TIMEOUT_SECONDS)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed for {height}p: {result.stderr.strip()[-500:]}")
+
+
+def store_rendition(store: LocalBlobStore, out_dir: Path) -> str:
+    """Move segments into the blob store and return the rewritten playlist's key"""
+    lines = []
+    for line in (out_dir / "index.m3u8").read_text().splitlines():
+        if line and not line.startswith("#"):
+            line = blob_url(store.put_file(_stage(store, out_dir / line), "ts"))
+        lines.append(line)
+    return store.put("\n".join(lines).encode() + b"\n", "m3u8")
+
+
+def _stage(store: LocalBlobStore, path: Path) -> Path:
+    # put_file renames, which only works within the store's filesystem
+    staged = store.staging_file(path.suffix)
+    shutil.move(str(path), staged)
+    return staged
+
+
+def transcode_video(source: str, store: LocalBlobStore) -> List[Dict]:
+    info = probe_video(source)
+    renditions = []
+    with tempfile.TemporaryDirectory(prefix="renzo-hls-") as workdir:
+        for name, height, bitrate in ladder_for(info["height"]):
+            out_dir = Path(workdir) / name
+            transcode_rendition(source, out_dir, height, bitrate)
+            width = round(info["width"] * height / info["height"] / 2) * 2
+            renditions.append({
+                "name": name,
+                "width": width,
+                "height": height,
+                "bandwidth": bitrate + AUDIO_BITRATE,
+                "playlist": store_rendition(store, out_dir),
+            })
+    return renditions
+
+
+def claim_job(db) -> Optional[dict]:
+    from pymongo import ReturnDocument
+
+    now = datetime.utcnow()
+    return db.transcode_jobs.find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "locked_until": {"$lt": now}},
+        ], "attempts": {"$lt": MAX_ATTEMPTS}},
+        {"$set": {"status": "running", "locked_until": now + timedelta(seconds=LEASE_SECONDS),
+                  "lease_id": uuid.uuid4().hex, "updated_at": now},
+         "$inc": {"attempts": 1}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def fail_abandoned_jobs(db) -> int:
+    """Fail jobs whose worker died during their last attempt"""
+    failed = 0
+    while True:
+        now = datetime.utcnow()
+        job = db.transcode_jobs.find_one_and_update(
+            {"status": "running", "locked_until": {"$lt": now}, "attempts": {"$gte": MAX_ATTEMPTS}},
+            {"$set": {"status": "failed", "error": "Worker lost during the last attempt", "updated_at": now}},
+            projection={"_id": 0, "id": 1, "video_id": 1},
+        )
+        if job is None:
+            return failed
+        db.videos.update_one({"id": job["video_id"]}, {"$set": {"transcode_status": "failed"}})
+        logger.warning(f"Transcode job {job['id']} failed, its worker was lost on the last attempt")
+        failed += 1
+
+
+class LeaseKeeper:
+    """Renews a claimed job's lease from a background thread until stopped"""
+
+    def __init__(self, db, job: dict, interval: float = HEARTBEAT_SECONDS):
+        self.db = db
+        self.job = job
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{job['id']}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            now = datetime.utcnow()
+            try:
+                self.db.transcode_jobs.update_one(
+                    {"id": self.job["id"], "lease_id": self.job["lease_id"], "status": "running"},
+                    {"$set": {"locked_until": now + timedelta(seconds=LEASE_SECONDS), "updated_at": now}},
+                )
+            except Exception as e:
+                logger.warning(f"Renewing the lease of transcode job {self.job['id']} failed: {e}")
+
+
+def finish_job(db, job: dict, fields: dict) -> bool:
+    """Record the outcome unless the lease was lost and the job reclaimed"""
+    result = db.transcode_jobs.update_one(
+        {"id": job["id"], "lease_id": job["lease_id"]},
+        {"$set": {**fields, "updated_at": datetime.utcnow()}},
+    )
+    return result.modified_count == 1
+
+
+def process_job(db, store: LocalBlobStore, job: dict):
+    video = db.videos.find_one({"id": job["video_id"]}, {"_id": 0, "video_blob": 1})
+    if not video:
+        finish_job(db, job, {"status": "failed", "error": "Video not found"})
+        return
+
+    db.videos.update_one({"id": job["video_id"]}, {"$set": {"transcode_status": "processing"}})
+    with LeaseKeeper(db, job):
+        _transcode_job(db, store, job, video)
+
+
+def _transcode_job(db, store: LocalBlobStore, job: dict, video: dict):
+    source, temporary = None, False
+    try:
+        if video.get("video_blob") and store.exists(video["video_blob"]):
+            source = str(store.path(video["video_blob"]))
+        else:
+            # Uploaded before videos were kept in the blob store
+            payload = db.videos.find_one({"id": job["video_id"]}, {"_id": 0, "video_data": 1})
+            fd, source = tempfile.mkstemp(prefix="renzo-src-")
+            temporary = True
+            with os.fdopen(fd, "wb") as f:
+                f.write(decode_video_data(payload["video_data"])[0])
+            del payload
+        renditions = transcode_video(source, store)
+    except Exception as e:
+        final = job["attempts"] >= MAX_ATTEMPTS
+        owned = finish_job(db, job, {"status": "failed" if final else "queued", "error": str(e)})
+        if final and owned:
+            db.videos.update_one({"id": job["video_id"]}, {"$set": {"transcode_status": "failed"}})
+        logger.warning(f"Transcode job {job['id']} failed (attempt {job['attempts']}): {e}")
+        return
+    finally:
+        if temporary:
+            os.unlink(source)
+
+    db.videos.update_one(
+        {"id": job["video_id"]},
+        {"$set": {"renditions": renditions, "transcode_status": "ready", "updated_at": datetime.utcnow()}},
+    )
+    finish_job(db, job, {"status": "done", "error": None})
+    logger.info(f"Transcoded video {job['video_id']} into {[r['name'] for r in renditions]}")
+
+
+def worker_loop(mongo_url: str, db_name: str, blob_root: str, poll_interval: float):
+    """Entry point of one worker process"""
+    from pymongo import MongoClient
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    client = MongoClient(mongo_url)
+    db = client[db_name]
+    store = LocalBlobStore(blob_root)
+    try:
+        while not stopping:
+            job = claim_job(db)
+            if job is None:
+                fail_abandoned_jobs(db)
+                time.sleep(poll_interval)
+                continue
+            process_job(db, store, job)
+    finally:
+        client.close()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    root_dir = Path(__file__).parent
+    load_dotenv(root_dir / '.env')
+
+    parser = argparse.ArgumentParser(description="Run Renzo transcoding workers")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('TRANSCODE_WORKERS', '2')))
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+        raise SystemExit("ffmpeg and ffprobe are required for transcoding")
+
+    worker_args = (
+        os.environ['MONGO_URL'],
+        os.environ['DB_NAME'],
+        os.environ.get('BLOB_ROOT', str(root_dir / 'blobs')),
+        args.poll_interval,
+    )
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=worker_loop, args=worker_args, name=f"transcoder-{i}")
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {len(processes)} transcoding workers")
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Time-decayed trending scores and in-memory leaderboards.
+
+Scores use forward decay, stored as the logarithm of the summed weights
+(``trend_log_score``) so they stay in float range. ``TrendingBoard``
+refreshes the leaderboards in the background; the endpoints only slice them.
+"""
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+from database import create_indexes
+from media import media_url
+
+logger = logging.getLogger(__name__)
+
+WEIGHTS = {"upload": 2.0, "view": 1.0, "like": 5.0}
+BOARD_SIZE = 100
+TOP_RATED_WINDOW = timedelta(days=7)
+# Also the index key: walked in sort order, created_at checked on the keys
+TOP_RATED_SORT = [("ai_skill_rating", -1), ("created_at", -1)]
+# A removal leaving less than this fraction of the score clears it
+CLEAR_BELOW = 1e-9
+
+_PROJECTION = {"_id": 0, "video_data": 0, "search_terms": 0}
+_SCORE = "$trend_log_score"
+
+
+def _epoch() -> float:
+    value = os.environ.get('TRENDING_EPOCH', '2026-01-01T00:00:00')
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _tau() -> float:
+    half_life = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '24')) * 3600
+    return half_life / math.log(2)
+
+
+def log_weight(event: str, count: float = 1, when: Optional[float] = None) -> float:
+    """Logarithm of the forward-decayed weight of ``count`` events at ``when``"""
+    when = time.time() if when is None else when
+    return math.log(WEIGHTS[event] * count) + (when - _epoch()) / _tau()
+
+
+def log_add(*weights: float) -> float:
+    """``ln(sum(exp(w)))`` for scores computed outside Mongo"""
+    top = max(weights)
+    return top + math.log(sum(math.exp(weight - top) for weight in weights))
+
+
+def add_score(event: str, count: float = 1) -> dict:
+    """``$set`` fields of an update pipeline adding ``count`` events now"""
+    weight = log_weight(event, count)
+    top = {"$max": [_SCORE, weight]}
+    return {"trend_log_score": {"$cond": [
+        {"$eq": [{"$ifNull": [_SCORE, None]}, None]},
+        weight,
+        {"$add": [top, {"$ln": {"$add": [1, {"$exp": {"$subtract": [{"$min": [_SCORE, weight]}, top]}}]}}]},
+    ]}}
+
+
+def remove_score(event: str, count: float = 1) -> dict:
+    """``$set`` fields of an update pipeline taking back ``count`` events
+
+    Uses the events' weight now, so a score that would not stay positive
+    is cleared.
+    """
+    weight = log_weight(event, count)
+    return {"trend_log_score": {"$cond": [
+        {"$lt": [weight, {"$add": [{"$ifNull": [_SCORE, weight]}, math.log1p(-CLEAR_BELOW)]}]},
+        {"$add": [_SCORE, {"$ln": {"$subtract": [1, {"$exp": {"$subtract": [weight, _SCORE]}}]}}]},
+        None,
+    ]}}
+
+
+async def _migrate_linear_scores(videos):
+    """Convert ``trend_score`` sums written before scores were logarithms"""
+    indexes = await videos.index_information()
+    if "trend_score_-1" not in indexes:
+        return
+    await videos.update_many({"trend_score": {"$exists": True}}, [
+        {"$set": {"trend_log_score": {"$cond": [
+            {"$gt": ["$trend_score", 0]}, {"$ln": "$trend_score"}, None
+        ]}}},
+        {"$unset": "trend_score"},
+    ])
+    for name in ("trend_score_-1", "category_1_trend_score_-1"):
+        try:
+            await videos.drop_index(name)
+        except OperationFailure:
+            pass  # Dropped by another worker starting at the same time
+
+
+def top_rated_query(since: datetime) -> dict:
+    return {"created_at": {"$gte": since}, "ai_skill_rating": {"$ne": None}}
+
+
+async def ensure_trending_indexes(db):
+    await _migrate_linear_scores(db.videos)
+    await create_indexes(db.videos, [
+        IndexModel([("trend_log_score", -1)]),
+        IndexModel([("category", 1), ("trend_log_score", -1)]),
+        IndexModel(TOP_RATED_SORT),
+    ])
+
+
+class TrendingBoard:
+    """Leaderboards refreshed in the background and served from memory"""
+
+    def __init__(self, videos, enrich: Callable[[List[dict]], Awaitable[List]], categories: List[str],
+                 interval: float = 30, size: int = BOARD_SIZE):
+        self.videos = videos
+        self.enrich = enrich
+        self.categories = categories
+        self.interval = interval
+        self.size = size
+        self.trending: List = []
+        self.top_rated_week: List = []
+        self.by_category: Dict[str, List] = {}
+        self.refreshed_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            # Not attributed to whichever request happens to start it
+            self._task = contextvars.Context().run(asyncio.create_task, self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            # Skip the first refresh if the boards were just warmed
+            if self.refreshed_at is not None:
+                await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Trending refresh failed: {e}")
+                await asyncio.sleep(self.interval)
+
+    async def _top(self, query: dict, sort: list) -> List[dict]:
+        return await self.videos.find(query, _PROJECTION).sort(sort).limit(self.size).to_list(self.size)
+
+    async def refresh(self):
+        week_ago = datetime.utcnow() - TOP_RATED_WINDOW
+        lists = await asyncio.gather(
+            self._top({"trend_log_score": {"$ne": None}}, [("trend_log_score", -1)]),
+            self._top(top_rated_query(week_ago), TOP_RATED_SORT),
+            *(self._top({"category": category, "trend_log_score": {"$ne": None}}, [("trend_log_score", -1)])
+              for category in self.categories),
+        )
+
+        # Enrich every distinct video once for all boards
+        unique = {}
+        for videos in lists:
+            for video in videos:
+                video["video_data"] = media_url(video["id"])
+                unique.setdefault(video["id"], video)
+        enriched = {video["id"]: video for video in await self.enrich(list(unique.values()))}
+
+        boards = [[enriched[video["id"]] for video in videos if video["id"] in enriched] for videos in lists]
+        self.trending, self.top_rated_week = boards[0], boards[1]
+        self.by_category = dict(zip(self.categories, boards[2:]))
+        self.refreshed_at = datetime.utcnow()
@@ -0,0 +1,174 @@
+"""Request body limits enforced while the body streams in.
+
+``UploadLimitMiddleware`` rejects a request with 413 as soon as its
+declared ``Content-Length`` is over the route's limit, before any of the
+body is read, and cuts the stream off the moment a body without a
+trustworthy length goes over it. Upload routes can additionally require a
+signed upload ticket: the ticket is issued after the user has been
+validated, is checked from the headers alone, and carries the declared
+size, so unauthorized or oversized uploads are refused before buffering.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import re
+import secrets
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Pattern, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+BODY_METHODS = {"POST", "PUT", "PATCH"}
+
+
+class InvalidTicket(Exception):
+    pass
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+@dataclass
+class UploadTicket:
+    user_id: str
+    max_bytes: int
+    expires_at: int
+
+
+class UploadTicketSigner:
+    """HMAC-signed, stateless upload tickets"""
+
+    def __init__(self, secret: Optional[str] = None):
+        if not secret:
+            logger.warning("UPLOAD_TICKET_SECRET not set, tickets are only valid on this worker")
+            secret = secrets.token_hex(32)
+        self._key = secret.encode()
+
+    def _sign(self, payload: bytes) -> str:
+        return base64.urlsafe_b64encode(hmac.new(self._key, payload, hashlib.sha256).digest()).decode().rstrip("=")
+
+    def issue(self, user_id: str, max_bytes: int, ttl_seconds: int = 900) -> UploadTicket:
+        return UploadTicket(user_id=user_id, max_bytes=max_bytes, expires_at=int(time.time()) + ttl_seconds)
+
+    def encode(self, ticket: UploadTicket) -> str:
+        payload = json.dumps(
+            {"u": ticket.user_id, "n": ticket.max_bytes, "e": ticket.expires_at}, separators=(",", ":")
+        ).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip("=") + "." + self._sign(payload)
+
+    def verify(self, token: str) -> UploadTicket:
+        try:
+            encoded, signature = token.split(".", 1)
+            payload = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+        except ValueError:
+            raise InvalidTicket("Malformed upload ticket")
+        if not hmac.compare_digest(self._sign(payload), signature):
+            raise InvalidTicket("Invalid upload ticket signature")
+        data = json.loads(payload)
+        ticket = UploadTicket(user_id=data["u"], max_bytes=int(data["n"]), expires_at=int(data["e"]))
+        if ticket.expires_at < time.time():
+            raise InvalidTicket("Upload ticket expired")
+        return ticket
+
+
+class UploadLimitMiddleware:
+    """Per-route body size limits and upload ticket checks
+
+    ``rules`` are ``(method, path regex, max bytes)``; the first match wins
+    and other requests with a body get ``default_limit``. ``ticket_routes``
+    lists ``(method, path regex)`` pairs that accept an ``X-Upload-Ticket``
+    header; the verified ticket is exposed as ``request.state.upload_ticket``.
+    """
+
+    def __init__(self, app, rules: List[Tuple[str, str, int]], default_limit: int,
+                 signer: Optional[UploadTicketSigner] = None, ticket_routes: List[Tuple[str, str]] = (),
+                 require_ticket: bool = False):
+        self.app = app
+        self.rules: List[Tuple[str, Pattern, int]] = [(m, re.compile(p), n) for m, p, n in rules]
+        self.default_limit = default_limit
+        self.signer = signer
+        self.ticket_routes = [(m, re.compile(p)) for m, p in ticket_routes]
+        self.require_ticket = require_ticket
+
+    def limit_for(self, method: str, path: str) -> int:
+        for rule_method, pattern, limit in self.rules:
+            if rule_method == method and pattern.fullmatch(path):
+                return limit
+        return self.default_limit
+
+    def _is_ticket_route(self, method: str, path: str) -> bool:
+        return any(m == method and p.fullmatch(path) for m, p in self.ticket_routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in BODY_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        headers = Headers(scope=scope)
+        limit = self.limit_for(method, path)
+
+        if self.signer is not None and self._is_ticket_route(method, path):
+            token = headers.get("x-upload-ticket")
+            if token:
+                try:
+                    ticket = self.signer.verify(token)
+                except InvalidTicket as e:
+                    await JSONResponse({"detail": str(e)}, status_code=401)(scope, receive, send)
+                    return
+                limit = min(limit, ticket.max_bytes)
+                scope.setdefault("state", {})["upload_ticket"] = ticket
+            elif self.require_ticket:
+                await JSONResponse({"detail": "Upload ticket required"}, status_code=401)(scope, receive, send)
+                return
+
+        declared = headers.get("content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            await self._reject(scope, receive, send, limit)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise RequestTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # Once the limit is hit the app's own error response (body
+            # parsers turn our exception into a 400) is replaced by a 413
+            if exceeded:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except RequestTooLarge:
+            pass
+        if exceeded and not response_started:
+            await self._reject(scope, receive, send, limit)
+
+    async def _reject(self, scope, receive, send, limit: int):
+        response = JSONResponse(
+            {"detail": f"Request body exceeds the {limit} byte limit"},
+            status_code=413,
+            headers={"Connection": "close"},
+        )
+        await response(scope, receive, send)
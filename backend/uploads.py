@@ -0,0 +1,223 @@
+"""Resumable chunked uploads.
+
+A client opens a session with the total size, PUTs fixed-size chunks by
+index in any order (each with its SHA-256), asks which chunks are missing
+after a dropped connection, and finally completes the session. Chunks are
+streamed to disk as they arrive and kept per session until the upload is
+assembled into the blob store. Sessions expire through a Mongo TTL index;
+``UploadSweeper`` removes chunk directories left behind by expired or
+abandoned sessions.
+"""
+import asyncio
+import contextvars
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+from blobstore import LocalBlobStore
+from media import extension_for
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+SESSION_TTL = timedelta(hours=24)
+# Request body pieces are collected up to this size per write, so the disk
+# writes (and hashing) run in a worker thread without a hop per piece
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+class ChunkError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def new_session(user_id: str, metadata: Dict, total_size: int, chunk_size: int, content_type: str,
+                sha256: Optional[str] = None, ttl: timedelta = SESSION_TTL) -> Dict:
+    now = datetime.utcnow()
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "metadata": metadata,
+        "total_size": total_size,
+        "chunk_size": chunk_size,
+        "chunk_count": max(1, -(-total_size // chunk_size)),
+        "content_type": content_type,
+        "sha256": sha256,
+        "received": [],
+        "checksums": {},
+        "status": "open",  # open, finalizing, complete
+        "created_at": now,
+        "expires_at": now + ttl,
+    }
+
+
+def expected_chunk_length(session: Dict, index: int) -> int:
+    offset = index * session["chunk_size"]
+    return min(session["chunk_size"], session["total_size"] - offset)
+
+
+def missing_chunks(session: Dict) -> List[int]:
+    received = set(session.get("received", []))
+    return [index for index in range(session["chunk_count"]) if index not in received]
+
+
+class ChunkStore:
+    """Per-session chunk files under ``<root>/<session_id>/<index>``"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def session_dir(self, session_id: str) -> Path:
+        # Session ids are server generated uuids, but never trust a path
+        return self.root / str(uuid.UUID(session_id))
+
+    def chunk_path(self, session_id: str, index: int) -> Path:
+        return self.session_dir(session_id) / f"{index:06d}"
+
+    async def write_chunk(self, session: Dict, index: int, body: AsyncIterator[bytes],
+                          expected_sha256: Optional[str]) -> str:
+        """Stream one chunk to disk, verifying its length and checksum
+
+        The chunk only becomes visible under its final name once it is
+        complete and verified, so a dropped connection leaves no partial
+        chunk behind. File I/O runs in worker threads, off the event loop.
+        """
+        expected_length = expected_chunk_length(session, index)
+        directory = self.session_dir(session["id"])
+        await asyncio.to_thread(directory.mkdir, parents=True, exist_ok=True)
+        partial = directory / f".{index:06d}.{uuid.uuid4().hex}"
+        digest = hashlib.sha256()
+        written = 0
+
+        def write(f, data: bytearray):
+            digest.update(data)
+            f.write(data)
+
+        f = await asyncio.to_thread(open, partial, "wb")
+        try:
+            buffer = bytearray()
+            async for piece in body:
+                written += len(piece)
+                if written > expected_length:
+                    raise ChunkError(413, f"Chunk {index} exceeds {expected_length} bytes")
+                buffer += piece
+                if len(buffer) >= WRITE_BUFFER_BYTES:
+                    await asyncio.to_thread(write, f, buffer)
+                    buffer.clear()
+            await asyncio.to_thread(write, f, buffer)
+            await asyncio.to_thread(f.close)
+            if written != expected_length:
+                raise ChunkError(400, f"Chunk {index} has {written} bytes, expected {expected_length}")
+            checksum = digest.hexdigest()
+            if expected_sha256 and expected_sha256.lower() != checksum:
+                raise ChunkError(400, f"Checksum mismatch for chunk {index}")
+            await asyncio.to_thread(os.replace, partial, self.chunk_path(session["id"], index))
+            return checksum
+        finally:
+            await asyncio.to_thread(self._discard_partial, f, partial)
+
+    @staticmethod
+    def _discard_partial(f, partial: Path):
+        f.close()
+        if partial.exists():
+            partial.unlink()
+
+    def assemble(self, session: Dict, store: LocalBlobStore) -> Dict:
+        """Concatenate all chunks into the blob store (blocking, run in a thread)"""
+        staged = store.staging_file()
+        digest = hashlib.sha256()
+        try:
+            with open(staged, "wb") as out:
+                for index in range(session["chunk_count"]):
+                    with open(self.chunk_path(session["id"], index), "rb") as chunk:
+                        while True:
+                            block = chunk.read(1 << 20)
+                            if not block:
+                                break
+                            digest.update(block)
+                            out.write(block)
+            content_hash = digest.hexdigest()
+            if session.get("sha256") and session["sha256"].lower() != content_hash:
+                raise ChunkError(400, "Checksum mismatch for the assembled upload")
+            key = store.put_file(staged, extension_for(session["content_type"]), digest=content_hash)
+        except BaseException:
+            if staged.exists():
+                staged.unlink()
+            raise
+        return {
+            "video_blob": key,
+            "content_hash": content_hash,
+            "content_type": session["content_type"],
+            "content_length": session["total_size"],
+        }
+
+    def discard(self, session_id: str):
+        shutil.rmtree(self.session_dir(session_id), ignore_errors=True)
+
+
+class UploadSweeper:
+    """Periodically removes chunk directories without a live session"""
+
+    def __init__(self, chunk_store: ChunkStore, sessions, interval: float = 600, grace: timedelta = timedelta(hours=1)):
+        self.chunk_store = chunk_store
+        self.sessions = sessions
+        self.interval = interval
+        self.grace = grace
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            # Not attributed to whichever request happens to start it
+            self._task = contextvars.Context().run(asyncio.create_task, self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Upload sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def _stale_directories(self) -> List[str]:
+        root = self.chunk_store.root
+        if not root.is_dir():
+            return []
+        cutoff = time.time() - self.grace.total_seconds()
+        return [path.name for path in root.iterdir() if path.is_dir() and path.stat().st_mtime < cutoff]
+
+    async def sweep(self) -> int:
+        root = self.chunk_store.root
+        candidates = await asyncio.to_thread(self._stale_directories)
+        if not candidates:
+            return 0
+        live = await self.sessions.find(
+            {"id": {"$in": candidates}, "status": {"$ne": "complete"}}, {"_id": 0, "id": 1}
+        ).to_list(len(candidates))
+        live_ids = {session["id"] for session in live}
+        removed = 0
+        for session_id in candidates:
+            if session_id not in live_ids:
+                await asyncio.to_thread(shutil.rmtree, root / session_id, True)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} expired upload sessions")
+        return removed
@@ -0,0 +1,137 @@
+"""Background workers started and drained by the application lifespan.
+
+``ViewFlusher`` buffers view counts in memory and writes them as one
+``bulk_write`` per interval instead of an update per page view; counts that
+fail to write are put back, and stopping flushes whatever is left.
+
+``EnrichmentQueue`` runs slow per-item work (the AI analysis of new videos)
+off the request path on a fixed number of worker tasks. Items are also
+marked pending in Mongo, so anything still queued when a worker dies is
+picked up again by ``recover`` on the next start.
+"""
+import asyncio
+import contextvars
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+class ViewFlusher:
+    """Coalesces view updates per video
+
+    ``score(count)`` gives the extra ``$set`` fields of the update
+    pipeline for ``count`` views.
+    """
+
+    def __init__(self, videos, score: Callable[[int], dict], interval: float = 1.0):
+        self.videos = videos
+        self.score = score
+        self.interval = interval
+        self._counts: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, video_id: str, count: int = 1):
+        self._counts[video_id] = self._counts.get(video_id, 0) + count
+
+    def pending(self, video_id: str) -> int:
+        return self._counts.get(video_id, 0)
+
+    def start(self):
+        if self._task is None:
+            self._task = contextvars.Context().run(asyncio.create_task, self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        if not self._counts:
+            return 0
+        counts, self._counts = self._counts, {}
+        try:
+            await self.videos.bulk_write([
+                UpdateOne({"id": video_id}, [{"$set": {
+                    "views": {"$add": [{"$ifNull": ["$views", 0]}, count]}, **self.score(count)
+                }}])
+                for video_id, count in counts.items()
+            ], ordered=False)
+        except Exception as e:
+            logger.warning(f"Flushing {len(counts)} view counts failed, retrying later: {e}")
+            for video_id, count in counts.items():
+                self.add(video_id, count)
+            return 0
+        return len(counts)
+
+
+class EnrichmentQueue:
+    """Bounded queue of ids processed by ``handler`` on ``workers`` tasks"""
+
+    def __init__(self, handler: Callable[[str], Awaitable[None]], workers: int = 2, max_size: int = 1000):
+        self.handler = handler
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(max_size)
+        self._queued: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, item_id: str) -> bool:
+        """Queue without waiting; a full queue leaves the item to ``recover``"""
+        if item_id in self._queued:
+            return True
+        try:
+            self._queue.put_nowait(item_id)
+        except asyncio.QueueFull:
+            logger.warning(f"Enrichment queue full, {item_id} left for recovery")
+            return False
+        self._queued.add(item_id)
+        return True
+
+    async def recover(self, find_pending: Callable[[int], Awaitable[list]]) -> int:
+        """Re-queue items a previous worker left unfinished"""
+        capacity = self._queue.maxsize - self._queue.qsize()
+        item_ids = await find_pending(capacity)
+        return sum(self.submit(item_id) for item_id in item_ids)
+
+    def start(self):
+        for _ in range(self.workers - len(self._tasks)):
+            task = contextvars.Context().run(asyncio.create_task, self._work())
+            self._tasks.add(task)
+
+    async def _work(self):
+        while True:
+            item_id = await self._queue.get()
+            try:
+                await self.handler(item_id)
+            except Exception as e:
+                logger.warning(f"Enrichment of {item_id} failed: {e}")
+            finally:
+                self._queued.discard(item_id)
+                self._queue.task_done()
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Finish queued items (up to ``timeout``), then stop the workers"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping with {self._queue.qsize()} items unenriched, they are recovered on restart")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
@@ -0,0 +1,152 @@
+"""Synthetic dataset generator for the offline benchmarks.
+
+Documents are built from the server's own models so they stay in sync with
+the schema. Video payloads are data URLs like the ones the frontend sends,
+with sizes drawn from a log-normal distribution around ``video_kb``. Likes
+and views follow a Zipf-like popularity curve so a few videos are hot and
+most are cold, as in production.
+"""
+import base64
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List
+
+PROFILE_TYPES = ["dancer", "dancer", "dancer", "musician", "musician", "director", "fan"]
+CATEGORIES = ["solo", "group", "duet", "rehearsal", "performance"]
+TAGS = [
+    "ballet", "contemporary", "hip-hop", "jazz", "tap", "salsa", "choreography",
+    "breaking", "saxophone", "piano", "vocals", "guitar", "theater", "musical",
+    "improvisation", "street", "flamenco", "kpop", "drums", "direction",
+]
+
+# Distinct payloads are reused across videos, generating hundreds of MB of
+# random bytes would dominate the setup time
+PAYLOAD_POOL_SIZE = 16
+
+
+@dataclass
+class DatasetSpec:
+    users: int = 200
+    videos: int = 500
+    connections: int = 1000
+    likes: int = 10000
+    video_kb: int = 128
+    zipf_s: float = 1.1
+    seed: int = 42
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class Dataset:
+    users: List[dict] = field(default_factory=list)
+    videos: List[dict] = field(default_factory=list)
+    connections: List[dict] = field(default_factory=list)
+    # Video ids ordered from most to least popular, for skewed traffic
+    popularity: List[str] = field(default_factory=list)
+
+
+def zipf_weights(n: int, s: float) -> List[float]:
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def _payload_pool(rng: random.Random, video_kb: int) -> List[str]:
+    pool = []
+    for _ in range(PAYLOAD_POOL_SIZE):
+        size = max(1024, int(rng.lognormvariate(0, 0.6) * video_kb * 1024))
+        raw = rng.randbytes(size)
+        pool.append("data:video/mp4;base64," + base64.b64encode(raw).decode())
+    return pool
+
+
+def build_dataset(spec: DatasetSpec) -> Dataset:
+    """Build users, videos, connections and skewed likes in memory"""
+    from server import Connection, User, Video
+
+    rng = random.Random(spec.seed)
+    dataset = Dataset()
+
+    for i in range(spec.users):
+        tags = rng.sample(TAGS, rng.randint(2, 5))
+        user = User(
+            email=f"bench{i}@example.com",
+            name=f"Bench User {i}",
+            username=f"bench_user_{i}",
+            profile_type=rng.choice(PROFILE_TYPES),
+            tags=tags,
+            ai_generated_bio=f"Benchmark performer {i} into {', '.join(tags)}.",
+            verification_status=rng.choice(["pending", "verified", "verified"]),
+        )
+        dataset.users.append(user.dict())
+
+    user_ids = [user["id"] for user in dataset.users]
+    payloads = _payload_pool(rng, spec.video_kb)
+    for i in range(spec.videos):
+        video = Video(
+            user_id=rng.choice(user_ids),
+            title=f"Benchmark performance {i}",
+            description=f"Synthetic {rng.choice(TAGS)} routine number {i}",
+            category=rng.choice(CATEGORIES),
+            genre=rng.choice(TAGS),
+            video_data=rng.choice(payloads),
+            ai_generated_tags=rng.sample(TAGS, rng.randint(3, 8)),
+            ai_skill_rating=round(rng.uniform(4.0, 9.8), 1),
+        )
+        dataset.videos.append(video.dict())
+
+    # Mirrors the $max the server applies to the author on every upload
+    users_by_id = {user["id"]: user for user in dataset.users}
+    for video in dataset.videos:
+        user = users_by_id[video["user_id"]]
+        user["skill_rating"] = max(user["skill_rating"] or 0, video["ai_skill_rating"])
+
+    # Popularity ranking is a random permutation, weights follow Zipf
+    dataset.popularity = [video["id"] for video in dataset.videos]
+    rng.shuffle(dataset.popularity)
+    videos_by_id = {video["id"]: video for video in dataset.videos}
+    weights = zipf_weights(len(dataset.popularity), spec.zipf_s)
+    if dataset.popularity:
+        liked = rng.choices(dataset.popularity, weights=weights, k=spec.likes)
+        likers = {}
+        for video_id in liked:
+            likers.setdefault(video_id, set()).add(rng.choice(user_ids))
+        for video_id, users in likers.items():
+            videos_by_id[video_id]["likes"] = list(users)
+        for rank, video_id in enumerate(dataset.popularity):
+            videos_by_id[video_id]["views"] = int(weights[rank] * spec.likes * 5)
+
+    # As if all engagement happened at upload time
+    from trending import log_add, log_weight
+
+    for video in dataset.videos:
+        when = video["created_at"].timestamp()
+        engagement = [log_weight("upload", when=when)]
+        engagement += [log_weight(event, count, when)
+                       for event, count in (("view", video["views"]), ("like", len(video["likes"]))) if count]
+        video["trend_log_score"] = log_add(*engagement)
+
+    pairs = set()
+    max_pairs = len(user_ids) * (len(user_ids) - 1)
+    while len(pairs) < min(spec.connections, max_pairs):
+        from_id, to_id = rng.sample(user_ids, 2)
+        pairs.add((from_id, to_id))
+    for from_id, to_id in pairs:
+        connection = Connection(
+            from_user_id=from_id,
+            to_user_id=to_id,
+            status=rng.choice(["pending", "accepted", "accepted", "rejected"]),
+            message="Let's collaborate!",
+        )
+        dataset.connections.append(connection.dict())
+
+    return dataset
+
+
+async def load_dataset(db, dataset: Dataset, batch_size: int = 500):
+    """Replace the users, videos and connections collections with ``dataset``"""
+    for name, docs in (("users", dataset.users), ("videos", dataset.videos), ("connections", dataset.connections)):
+        await db[name].delete_many({})
+        for start in range(0, len(docs), batch_size):
+            # insert_many adds _id to the dicts, insert copies
+            await db[name].insert_many([dict(doc) for doc in docs[start:start + batch_size]])
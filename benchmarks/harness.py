@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark harness for the Renzo backend.
+
+Runs the FastAPI app in-process (httpx ASGI transport, no network) against a
+local MongoDB or a mongomock-motor stand-in, with the stub LLM provider.
+A synthetic dataset is loaded first, then every endpoint is driven by a
+concurrent load generator. Per-endpoint p50/p95/p99 latency, throughput and
+peak Python memory are written to a JSON file that can be compared across
+commits:
+
+    python benchmarks/harness.py --mongo mock --output bench.json
+    python benchmarks/harness.py --mongo mongodb://localhost:27017 \\
+        --compare bench.json --output bench-new.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "backend"))
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.dataset import (  # noqa: E402
+    CATEGORIES, TAGS, Dataset, DatasetSpec, build_dataset, load_dataset, zipf_weights,
+)
+from benchmarks.mock_mongo import use_mongomock  # noqa: E402
+from benchmarks.stats import compare, summarize  # noqa: E402
+
+Scenario = Callable[["BenchContext"], Awaitable["object"]]
+
+
+class BenchContext:
+    """Shared state the endpoint scenarios draw their inputs from"""
+
+    def __init__(self, client, dataset: Dataset, seed: int, zipf_s: float):
+        self.client = client
+        self.dataset = dataset
+        self.rng = random.Random(seed)
+        self.user_ids = [user["id"] for user in dataset.users]
+        self.emails = [user["email"] for user in dataset.users]
+        self.popular_videos = dataset.popularity
+        self.popularity_weights = zipf_weights(len(dataset.popularity), zipf_s)
+        self.counter = itertools.count()
+        self.payload = dataset.videos[0]["video_data"] if dataset.videos else "data:video/mp4;base64,AAAA"
+
+    def user_id(self) -> str:
+        return self.rng.choice(self.user_ids)
+
+    def hot_video_id(self) -> str:
+        return self.rng.choices(self.popular_videos, weights=self.popularity_weights)[0]
+
+
+async def _register(ctx: BenchContext):
+    n = next(ctx.counter)
+    return await ctx.client.post("/api/auth/register", json={
+        "email": f"bench-new-{n}-{time.time_ns()}@example.com",
+        "name": f"New Bench User {n}",
+        "username": f"bench_new_{n}_{time.time_ns()}",
+        "profile_type": "dancer",
+        "tags": ["ballet", "jazz"],
+    })
+
+
+async def _login(ctx: BenchContext):
+    return await ctx.client.post("/api/auth/login", json={"email": ctx.rng.choice(ctx.emails), "password": "x"})
+
+
+async def _get_user(ctx: BenchContext):
+    return await ctx.client.get(f"/api/users/{ctx.user_id()}")
+
+
+async def _list_users(ctx: BenchContext):
+    return await ctx.client.get("/api/users", params={"limit": 20, "skip": ctx.rng.randint(0, 5) * 20})
+
+
+async def _list_videos(ctx: BenchContext):
+    return await ctx.client.get("/api/videos", params={"limit": 20, "skip": ctx.rng.randint(0, 5) * 20})
+
+
+async def _export_videos(ctx: BenchContext):
+    # The ASGI transport buffers the body, so this measures time, not memory
+    async with ctx.client.stream("GET", "/api/videos", params={"stream": "true"}) as response:
+        async for _ in response.aiter_bytes():
+            pass
+        return response
+
+
+async def _get_video(ctx: BenchContext):
+    return await ctx.client.get(f"/api/videos/{ctx.hot_video_id()}")
+
+
+async def _create_video(ctx: BenchContext):
+    return await ctx.client.post("/api/videos", data={
+        "user_id": ctx.user_id(),
+        "title": f"Bench upload {next(ctx.counter)}",
+        "description": "Load generated upload",
+        "category": "solo",
+        "video_data": ctx.payload,
+    })
+
+
+async def _like_video(ctx: BenchContext):
+    return await ctx.client.post(f"/api/videos/{ctx.hot_video_id()}/like", data={"user_id": ctx.user_id()})
+
+
+async def _create_connection(ctx: BenchContext):
+    from_id, to_id = ctx.rng.sample(ctx.user_ids, 2)
+    return await ctx.client.post("/api/connections", data={
+        "from_user_id": from_id, "to_user_id": to_id, "message": "bench"
+    })
+
+
+async def _get_connections(ctx: BenchContext):
+    return await ctx.client.get(f"/api/connections/{ctx.user_id()}")
+
+
+async def _recommendations(ctx: BenchContext):
+    return await ctx.client.get(f"/api/recommendations/{ctx.user_id()}")
+
+
+async def _discover_users(ctx: BenchContext):
+    return await ctx.client.get("/api/discover/users", params={
+        "profile_type": "dancer", "verification_status": "verified", "tags": ctx.rng.choice(TAGS),
+    })
+
+
+async def _discover_videos(ctx: BenchContext):
+    return await ctx.client.get("/api/discover/videos", params={
+        "category": ctx.rng.choice(CATEGORIES), "min_rating": 7.0, "sort": "recent",
+    })
+
+
+async def _trending(ctx: BenchContext):
+    return await ctx.client.get("/api/trending", params={"limit": 20})
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "register_user": _register,
+    "login_user": _login,
+    "get_user": _get_user,
+    "get_users": _list_users,
+    "get_videos": _list_videos,
+    "get_video": _get_video,
+    "export_videos": _export_videos,
+    "create_video": _create_video,
+    "like_video": _like_video,
+    "create_connection": _create_connection,
+    "get_connections": _get_connections,
+    "get_recommendations": _recommendations,
+    "discover_users": _discover_users,
+    "discover_videos": _discover_videos,
+    "trending": _trending,
+}
+
+# Duplicate connection pairs are expected to be rejected with 400
+EXPECTED_STATUS = {"create_connection": {200, 400}}
+
+
+async def drive(ctx: BenchContext, name: str, scenario: Scenario, requests: int, concurrency: int,
+                trace_memory: bool) -> Dict:
+    """Issue ``requests`` calls with ``concurrency`` workers and summarize them"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = itertools.count()
+    allowed = EXPECTED_STATUS.get(name, {200})
+
+    async def worker():
+        nonlocal errors
+        while next(remaining) < requests:
+            start = time.perf_counter()
+            try:
+                response = await scenario(ctx)
+                ok = response.status_code in allowed
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    if trace_memory:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize(latencies, errors, elapsed)
+    if trace_memory:
+        result["peak_alloc_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+    return result
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def _max_rss_bytes() -> int:
+    try:
+        import resource
+    except ImportError:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _configure_environment(args):
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["MONGO_URL"] = "mongodb://localhost:27017" if args.mongo == "mock" else args.mongo
+    if not args.rate_limits:
+        # All load comes from one address; measure handlers, not the limiter
+        for name in ("REGISTER", "UPLOAD", "WRITE"):
+            os.environ[f"RATE_LIMIT_{name}"] = "1000000/1000000"
+        os.environ["SIGNUP_MAX_IN_FLIGHT"] = os.environ["UPLOAD_MAX_IN_FLIGHT"] = "1000000"
+
+
+async def run(args) -> Dict:
+    _configure_environment(args)
+    import httpx
+    import database
+    import server
+
+    if args.mongo == "mock":
+        use_mongomock()
+
+    spec = DatasetSpec(
+        users=args.users, videos=args.videos, connections=args.connections,
+        likes=args.likes, video_kb=args.video_kb, seed=args.seed,
+    )
+    print(f"Generating dataset {spec.as_dict()}")
+    dataset = build_dataset(spec)
+
+    selected = args.endpoints.split(",") if args.endpoints else list(SCENARIOS)
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    # The lifespan creates the Mongo client, load the data once it exists
+    async with server.app.router.lifespan_context(server.app):
+        await load_dataset(database.get_database(), dataset)
+        # Pages warmed against the empty database are stale now
+        server.feed_cache.invalidate()
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            ctx = BenchContext(client, dataset, args.seed, spec.zipf_s)
+            if args.trace_memory:
+                tracemalloc.start()
+            for name in selected:
+                scenario = SCENARIOS[name]
+                # Warm up code paths and caches before measuring
+                await drive(ctx, name, scenario, min(args.warmup, args.requests), args.concurrency, False)
+                results[name] = await drive(ctx, name, scenario, args.requests, args.concurrency, args.trace_memory)
+                print(f"{name:22s} p50={results[name]['p50_ms']:8.2f}ms p95={results[name]['p95_ms']:8.2f}ms "
+                      f"p99={results[name]['p99_ms']:8.2f}ms {results[name]['throughput_rps']:8.1f} req/s "
+                      f"errors={results[name]['errors']}")
+            if args.trace_memory:
+                tracemalloc.stop()
+
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "mongo": "mongomock" if args.mongo == "mock" else "mongodb",
+            "dataset": spec.as_dict(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llm_latency_ms": args.llm_latency_ms,
+            "max_rss_bytes": _max_rss_bytes(),
+        },
+        "endpoints": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo", default="mock", help="'mock' for mongomock-motor or a MongoDB URL")
+    parser.add_argument("--db-name", default="renzo_bench")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--videos", type=int, default=500)
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--likes", type=int, default=10000)
+    parser.add_argument("--video-kb", type=int, default=128, help="median decoded video size")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated stub LLM latency")
+    parser.add_argument("--endpoints", default="", help="comma separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        help="skip tracemalloc, which slows allocation-heavy endpoints")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="keep the production rate limits and admission control")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", help="previous JSON result to diff against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        print(f"\nCompared with {previous['meta'].get('revision')}:")
+        for line in compare(previous["endpoints"], report["endpoints"]):
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
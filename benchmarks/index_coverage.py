@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Query-shape check for the discovery endpoints.
+
+Creates the documented discovery indexes in a scratch database, loads a few
+representative documents (so multikey paths are marked as such), then
+explains every supported filter combination and fails if any winning plan
+contains a COLLSCAN or an in-memory SORT:
+
+    python benchmarks/index_coverage.py --mongo mongodb://localhost:27017
+
+Needs a real MongoDB; mongomock has no query planner.
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Set
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "backend"))
+
+import discovery  # noqa: E402
+
+FORBIDDEN_STAGES = {"COLLSCAN", "SORT"}
+
+SAMPLE_USERS = [
+    {"id": f"u{i}", "profile_type": profile_type, "verification_status": status,
+     "tags": ["contemporary", "ballet", "jazz"][: 1 + i % 3], "skill_rating": 5.0 + i % 5,
+     "created_at": i}
+    for i, (profile_type, status) in enumerate(
+        (p, s) for p in discovery.PROFILE_TYPES for s in discovery.VERIFICATION_STATUSES
+    )
+]
+SAMPLE_VIDEOS = [
+    {"id": f"v{i}", "category": category, "verification_status": status, "genre": "jazz",
+     "ai_generated_tags": ["contemporary", "ballet", "jazz"][: 1 + i % 3], "ai_skill_rating": 5.0 + i % 5,
+     "created_at": i}
+    for i, (category, status) in enumerate(
+        (c, s) for c in discovery.CATEGORIES for s in discovery.VERIFICATION_STATUSES
+    )
+]
+
+
+def plan_stages(plan) -> Set[str]:
+    """Stage names anywhere in an explain plan, classic or SBE layout"""
+    stages = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            stages |= plan_stages(value)
+    return stages
+
+
+def check(collection, shapes: Iterable, limit: int = 20) -> List[str]:
+    failures = []
+    count = 0
+    for args, query, order in shapes:
+        count += 1
+        explain = collection.find(query).sort(order).limit(limit).explain()
+        stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+        bad = stages & FORBIDDEN_STAGES
+        if bad:
+            shown = {key: value for key, value in args.items() if value is not None}
+            failures.append(f"{collection.name} {shown}: {', '.join(sorted(bad))} in {sorted(stages)}")
+    print(f"{collection.name}: {count} shapes, {count - len(failures)} fully indexed")
+    return failures
+
+
+def create_indexes(collection, indexes: List) -> None:
+    for keys in indexes:
+        collection.create_index(keys)
+
+
+def main(argv=None) -> int:
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="renzo_index_coverage")
+    args = parser.parse_args(argv)
+
+    client = MongoClient(args.mongo)
+    client.drop_database(args.db_name)
+    db = client[args.db_name]
+    try:
+        db.users.insert_many([dict(user) for user in SAMPLE_USERS])
+        db.videos.insert_many([dict(video) for video in SAMPLE_VIDEOS])
+        create_indexes(db.users, discovery.USER_INDEXES)
+        create_indexes(db.videos, discovery.VIDEO_INDEXES)
+
+        failures = check(db.users, discovery.supported_user_queries())
+        failures += check(db.videos, discovery.supported_video_queries())
+    finally:
+        client.drop_database(args.db_name)
+        client.close()
+
+    for failure in failures:
+        print(f"NOT INDEXED: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
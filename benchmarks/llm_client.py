@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Per-call overhead of the LLM provider client.
+
+Serves a minimal Chat Completions endpoint on localhost (fixed reply,
+optional ``--server-latency-ms``) and times ``--calls`` prompts, with
+``--concurrency`` in flight, through:
+
+* ``per_call``: a new httpx client for every prompt, which is what
+  constructing an ``LlmChat`` per prompt amounts to;
+* ``pooled``: ``llm.complete`` with ``LLM_PROVIDER=openai``, one long-lived
+  keep-alive client per event loop;
+* ``emergentintegrations``: the previous provider path, only with
+  ``--legacy`` and when the package is installed.
+
+For each it reports latency percentiles (see stats.py) and how many TCP
+connections the server accepted. Plain HTTP on loopback leaves out TLS and
+network round trips, which a pooled connection saves as well, so real
+savings are larger than the numbers shown:
+
+    python benchmarks/llm_client.py --calls 500 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "backend"))
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.stats import summarize  # noqa: E402
+
+REPLY = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "model": "bench",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": "performance, dance, talent"}}],
+    "usage": {"prompt_tokens": 40, "completion_tokens": 6, "total_tokens": 46},
+}).encode()
+
+SYSTEM_MESSAGE = "You are an expert in dance and music analysis. Generate relevant tags for performance videos."
+PROMPT = 'Analyze this video titled "Bench" with description: "" and category: "solo". Return only the tags.'
+
+
+class FakeProvider:
+    """HTTP/1.1 keep-alive server answering every request with ``REPLY``"""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                             b"content-length: " + str(len(REPLY)).encode() + b"\r\n\r\n" + REPLY)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def per_call_client(base_url: str) -> str:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, headers={"Authorization": "Bearer bench"}) as client:
+        response = await client.post("/chat/completions", json={
+            "model": "bench",
+            "messages": [{"role": "system", "content": SYSTEM_MESSAGE}, {"role": "user", "content": PROMPT}],
+        })
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+async def drive(call: Callable[[], Awaitable[str]], calls: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(calls))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run(args) -> Dict:
+    provider = FakeProvider(args.server_latency_ms)
+    base_url = await provider.start()
+    os.environ.update({
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_KEY": "bench",
+        "LLM_MODEL": "bench",
+        "LLM_ATTEMPTS": "1",
+    })
+    import llm
+
+    variants = {
+        "per_call": lambda: per_call_client(base_url),
+        "pooled": lambda: llm.complete("video_tags", "video-tags-bench", SYSTEM_MESSAGE, PROMPT),
+    }
+    if args.legacy:
+        try:
+            llm._emergent_sdk()
+            variants["emergentintegrations"] = lambda: llm.complete(
+                "video_tags", "video-tags-bench", SYSTEM_MESSAGE, PROMPT
+            )
+        except ImportError:
+            print("emergentintegrations is not installed, skipping the legacy path")
+
+    results = {"calls": args.calls, "concurrency": args.concurrency,
+               "server_latency_ms": args.server_latency_ms}
+    try:
+        for name, call in variants.items():
+            os.environ["LLM_PROVIDER"] = "emergentintegrations" if name == "emergentintegrations" else "openai"
+            os.environ["OPENAI_API_BASE"] = base_url
+            await drive(call, min(args.warmup, args.calls), args.concurrency)
+            await llm.close_clients()
+            provider.connections = 0
+            result = await drive(call, args.calls, args.concurrency)
+            result["connections_opened"] = provider.connections
+            await llm.close_clients()
+            results[name] = result
+            print(f"{name:22s} p50={result['p50_ms']:7.2f}ms p95={result['p95_ms']:7.2f}ms "
+                  f"p99={result['p99_ms']:7.2f}ms {result['throughput_rps']:8.1f} calls/s "
+                  f"connections={result['connections_opened']} errors={result['errors']}")
+    finally:
+        await provider.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--server-latency-ms", type=float, default=0.0)
+    parser.add_argument("--legacy", action="store_true", help="also time emergentintegrations if installed")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
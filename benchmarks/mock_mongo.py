@@ -0,0 +1,16 @@
+"""In-memory MongoDB for the benchmarks' ``--mongo mock`` mode."""
+
+
+def use_mongomock():
+    """Have the app's lifespan connect to an in-memory mongomock-motor client
+
+    mongomock has no read preferences or write concerns, and the databases
+    ``with_options`` derives from it are plain synchronous mongomock ones,
+    so ``feed_db`` and ``durable_db`` resolve to the main database instead.
+    """
+    import database
+    from mongomock_motor import AsyncMongoMockClient
+
+    database.client_factory = lambda url, **options: AsyncMongoMockClient()
+    get_database = database.get_database
+    database.get_database = lambda reads=None, writes=None: get_database()
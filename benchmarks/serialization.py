@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Serialization microbenchmark for listing responses.
+
+Renders pages of ``--page-size`` videos and users (1000 by default) from
+synthetic Mongo documents two ways and reports CPU time per page:
+
+* ``validated``: what the routes did before, building ``VideoResponse`` /
+  ``User`` models from every document, then FastAPI's response_model
+  validation and serialization and the stdlib-JSON ``JSONResponse``;
+* ``shaped``: the current path, trimming documents to the model fields
+  (``shape_document``) and rendering with ``ORJSONResponse``.
+
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --page-size 100 --iterations 200 --output serialization.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "backend"))
+sys.path.insert(0, str(REPO_ROOT))
+
+os.environ.setdefault("LLM_PROVIDER", "stub")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "renzo_bench")
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import server  # noqa: E402
+from benchmarks.dataset import DatasetSpec, build_dataset  # noqa: E402
+
+
+def cpu_ms(render: Callable[[], bytes], iterations: int) -> Dict[str, float]:
+    samples = []
+    size = 0
+    for _ in range(iterations):
+        started = time.process_time()
+        size = len(render())
+        samples.append((time.process_time() - started) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "bytes": size,
+    }
+
+
+def page_documents(page_size: int, seed: int):
+    spec = DatasetSpec(users=max(1, page_size // 5), videos=page_size, connections=0,
+                       likes=page_size * 10, video_kb=1, seed=seed)
+    dataset = build_dataset(spec)
+    authors = {user["id"]: user for user in dataset.users}
+    for video in dataset.videos:
+        video["video_data"] = f"/api/videos/{video['id']}/media"
+    return dataset.videos, dataset.users[:page_size], authors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    videos, users, authors = page_documents(args.page_size, args.seed)
+    video_page = TypeAdapter(List[server.VideoResponse])
+    user_page = TypeAdapter(List[server.User])
+
+    def videos_validated() -> bytes:
+        models = [server.VideoResponse(**video, user_name=authors[video["user_id"]]["name"],
+                                       user_username=authors[video["user_id"]]["username"])
+                  for video in videos]
+        content = video_page.dump_python(video_page.validate_python(models), mode="json")
+        return JSONResponse(content).body
+
+    def videos_shaped() -> bytes:
+        documents = [server.shape_document(server.VIDEO_SHAPE, video,
+                                           user_name=authors[video["user_id"]]["name"],
+                                           user_username=authors[video["user_id"]]["username"])
+                     for video in videos]
+        return ORJSONResponse(documents).body
+
+    def users_validated() -> bytes:
+        models = [server.User(**user) for user in users]
+        return JSONResponse(user_page.dump_python(user_page.validate_python(models), mode="json")).body
+
+    def users_shaped() -> bytes:
+        return ORJSONResponse([server.user_document(user) for user in users]).body
+
+    # Both paths must produce the same documents
+    assert json.loads(videos_validated()) == json.loads(videos_shaped())
+    assert json.loads(users_validated()) == json.loads(users_shaped())
+
+    results = {"page_size": args.page_size, "iterations": args.iterations}
+    for name, validated, shaped in (("videos", videos_validated, videos_shaped),
+                                    ("users", users_validated, users_shaped)):
+        before, after = cpu_ms(validated, args.iterations), cpu_ms(shaped, args.iterations)
+        speedup = before["mean_ms"] / after["mean_ms"] if after["mean_ms"] else float("inf")
+        results[name] = {"validated": before, "shaped": after, "speedup": round(speedup, 2)}
+        print(f"{name:7s} validated {before['mean_ms']:8.2f}ms  shaped {after['mean_ms']:8.2f}ms  "
+              f"x{speedup:.1f} per {args.page_size}-item page")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
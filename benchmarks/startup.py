@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Worker boot-time check for the Renzo backend.
+
+Measures what an autoscaled uvicorn worker pays before it can serve, in
+fresh interpreters so nothing is already imported or cached:
+
+* ``import server`` wall time plus a ``python -X importtime`` breakdown of
+  the slowest modules ``server`` imports;
+* time to first request: interpreter start, import, lifespan startup
+  (against mongomock or a real MongoDB) and one ``GET /api/videos``;
+* modules that must not be loaded at boot (LLM SDKs, analytics libraries).
+
+Each measurement is the median of ``--runs`` processes and is checked
+against ``startup_budget.json``; the exit status is non-zero on a breach:
+
+    python benchmarks/startup.py --mongo mock
+    python benchmarks/startup.py --mongo mongodb://localhost:27017 --output startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BACKEND = REPO_ROOT / "backend"
+DEFAULT_BUDGET = Path(__file__).resolve().parent / "startup_budget.json"
+
+
+def _child_environment(args) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["LLM_PROVIDER"] = "stub"
+    env["DB_NAME"] = "renzo_startup"
+    env["MONGO_URL"] = "mongodb://localhost:27017" if args.mongo == "mock" else args.mongo
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def import_profile(args) -> Dict:
+    """``-X importtime`` of ``import server``: total and slowest direct imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND, env=_child_environment(args), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import server failed:\n{result.stderr[-2000:]}")
+
+    top_level, children, pending = [], {}, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        name = name[1:].rstrip()
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        module = {"module": name.strip(), "self_ms": int(self_us) / 1000,
+                  "cumulative_ms": int(cumulative_us) / 1000}
+        # A module's line follows those of the imports it triggered, which
+        # are indented one level deeper
+        if depth == 0:
+            top_level.append(module)
+            children[module["module"]], pending = pending, []
+        elif depth == 1:
+            pending.append(module)
+
+    # Everything the app pulls in is nested under server, so rank its
+    # direct imports rather than the interpreter's top-level modules
+    return {
+        "total_ms": round(sum(module["cumulative_ms"] for module in top_level), 2),
+        "slowest": sorted(children.get("server", []), key=lambda module: module["cumulative_ms"],
+                          reverse=True)[:args.top],
+    }
+
+
+async def _first_request(mongo: str):
+    """Child process body: import, start the lifespan, serve one request"""
+    sys.path.insert(0, str(BACKEND))
+    started = time.perf_counter()
+    import server
+    import_done = time.perf_counter()
+
+    import httpx
+
+    if mongo == "mock":
+        sys.path.insert(0, str(REPO_ROOT))
+        from benchmarks.mock_mongo import use_mongomock
+        use_mongomock()
+
+    async with server.app.router.lifespan_context(server.app):
+        lifespan_done = time.perf_counter()
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            response = await client.get("/api/videos")
+            response.raise_for_status()
+        first_response = time.time()
+        request_done = time.perf_counter()
+
+    loaded = set(sys.modules)
+    print(json.dumps({
+        "first_response_at": first_response,
+        "import_ms": (import_done - started) * 1000,
+        "lifespan_ms": (lifespan_done - import_done) * 1000,
+        "request_ms": (request_done - lifespan_done) * 1000,
+        "modules": sorted(name for name in loaded if "." not in name),
+    }))
+
+
+def first_request(args) -> Dict:
+    """Spawn a fresh worker and time spawn to first response"""
+    spawned = time.time()
+    result = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--child", "--mongo", args.mongo],
+        cwd=BACKEND, env=_child_environment(args), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["first_request_ms"] = (report.pop("first_response_at") - spawned) * 1000
+    return report
+
+
+def median(runs: List[Dict], key: str) -> float:
+    return round(statistics.median(run[key] for run in runs), 2)
+
+
+def check(results: Dict, budget: Dict) -> List[str]:
+    failures = []
+    for key in ("import_ms", "first_request_ms"):
+        limit = budget.get(key)
+        if limit is not None and results[key] > limit:
+            failures.append(f"{key} {results[key]:.1f}ms over budget {limit}ms")
+    for module in sorted(set(budget.get("forbidden_modules", [])) & set(results["modules"])):
+        failures.append(f"{module} is imported at startup")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo", default="mock", help='"mock" for mongomock-motor or a MongoDB URL')
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to report")
+    parser.add_argument("--budget", type=Path, default=DEFAULT_BUDGET)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_first_request(args.mongo))
+        return
+
+    runs = [first_request(args) for _ in range(args.runs)]
+    profile = import_profile(args)
+    results = {
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+        "import_ms": median(runs, "import_ms"),
+        "lifespan_ms": median(runs, "lifespan_ms"),
+        "request_ms": median(runs, "request_ms"),
+        "first_request_ms": median(runs, "first_request_ms"),
+        "importtime": profile,
+        "modules": runs[0]["modules"],
+    }
+
+    print(f"import server     {results['import_ms']:8.1f}ms (importtime total {profile['total_ms']:.1f}ms)")
+    print(f"lifespan startup  {results['lifespan_ms']:8.1f}ms")
+    print(f"first request     {results['request_ms']:8.1f}ms")
+    print(f"spawn to response {results['first_request_ms']:8.1f}ms")
+    print("slowest imports by server (cumulative):")
+    for module in profile["slowest"]:
+        print(f"  {module['cumulative_ms']:8.1f}ms  {module['module']}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    budget = json.loads(args.budget.read_text())
+    failures = check(results, budget)
+    for failure in failures:
+        print(f"BUDGET: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Latency statistics shared by the benchmark harness and the load tester"""
+import math
+from typing import Dict, List, Sequence
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    """p50/p95/p99/mean latency in milliseconds plus throughput and error rate"""
+    values = sorted(latencies)
+    total = len(values)
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(values) / total * 1000, 3) if total else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def compare(previous: Dict[str, Dict[str, float]], current: Dict[str, Dict[str, float]],
+            metrics: Sequence[str] = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")) -> List[str]:
+    """Human readable per-endpoint deltas between two result sets"""
+    lines = []
+    for name in sorted(set(previous) | set(current)):
+        if name not in previous or name not in current:
+            lines.append(f"{name}: only in {'current' if name in current else 'previous'} run")
+            continue
+        parts = []
+        for metric in metrics:
+            before, after = previous[name].get(metric), current[name].get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            parts.append(f"{metric} {before:g} -> {after:g} ({change:+.1f}%)")
+        lines.append(f"{name}: " + ", ".join(parts))
+    return lines
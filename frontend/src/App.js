@@ -5,6 +5,9 @@ import axios from 'axios';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Media URLs from the API are relative unless a CDN base URL is configured
+const mediaUrl = (url) => (url && url.startsWith('/') ? `${BACKEND_URL}${url}` : url || undefined);
+
 // Auth Context
 const AuthContext = React.createContext();
 
@@ -556,7 +559,8 @@ const VideoFeed = () => {
 
                 <div className="mb-4">
                   <video
-                    src={video.video_data}
+                    src={mediaUrl(video.video_data)}
+                    poster={mediaUrl(video.thumbnail)}
                     controls
                     className="w-full h-64 object-cover rounded-lg"
                   />
@@ -703,7 +707,8 @@ const Profile = () => {
             {userVideos.map(video => (
               <div key={video.id} className="bg-gray-50 rounded-lg p-4">
                 <video
-                  src={video.video_data}
+                  src={mediaUrl(video.video_data)}
+                  poster={mediaUrl(video.thumbnail)}
                   controls
                   className="w-full h-32 object-cover rounded-lg mb-3"
                 />
@@ -834,6 +839,16 @@ const Connections = () => {
     fetchConnections();
   }, []);
 
+  // Refresh when the server pushes a connection event instead of polling
+  useEffect(() => {
+    const source = new EventSource(`${API}/notifications/${user.id}/stream`);
+    const refresh = () => fetchConnections();
+    ['connection_request', 'connection_accepted', 'connection_rejected', 'resync'].forEach(type =>
+      source.addEventListener(type, refresh)
+    );
+    return () => source.close();
+  }, [user.id]);
+
   const fetchConnections = async () => {
     try {
       const response = await axios.get(`${API}/connections/${user.id}`);
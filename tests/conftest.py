@@ -0,0 +1,79 @@
+"""Shared fixtures for the backend tests.
+
+The backend modules import each other by flat name, so its directory goes
+on ``sys.path``. Tests that need MongoDB ask for ``mongo_url`` (or ``api``)
+and are skipped when nothing answers at ``TEST_MONGO_URL`` (default
+``mongodb://localhost:27017``); each session works in a throwaway database
+that is dropped at the end.
+"""
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "backend"))
+
+# server.py reads part of its configuration at import time
+os.environ.setdefault("TEST_MONGO_URL", "mongodb://localhost:27017")
+os.environ["MONGO_URL"] = os.environ["TEST_MONGO_URL"]
+os.environ["DB_NAME"] = f"renzo_test_{uuid.uuid4().hex[:8]}"
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["BLOB_ROOT"] = tempfile.mkdtemp(prefix="renzo-test-blobs-")
+# Every request comes from one address; tests exercise handlers, not limits
+for name in ("REGISTER", "UPLOAD", "WRITE"):
+    os.environ[f"RATE_LIMIT_{name}"] = "1000000/1000000"
+# Keep background refreshes out of the way of the assertions
+os.environ["TRENDING_REFRESH_SECONDS"] = "3600"
+os.environ["VIEW_FLUSH_SECONDS"] = "3600"
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def mongo_url():
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    url = os.environ["TEST_MONGO_URL"]
+    client = MongoClient(url, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        pytest.skip(f"No MongoDB at {url}: {e}")
+    yield url
+    client.drop_database(os.environ["DB_NAME"])
+    client.close()
+
+
+@pytest.fixture(scope="session")
+async def api(mongo_url):
+    """httpx client calling the app in process, lifespan included
+
+    Requests run in the test's own context, so ``query_budget`` sees
+    exactly the commands a handler issues.
+    """
+    import httpx
+    import server
+
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+
+@pytest.fixture
+def query_budget():
+    """Context manager asserting the Mongo query budget of an endpoint
+
+    ``with query_budget("GET /api/videos"): await api.get("/api/videos")``
+    """
+    from querywatch import assert_query_budget
+
+    return assert_query_budget
@@ -0,0 +1,125 @@
+"""Discovery filters: the query documents built for every supported filter
+combination, and (with MongoDB) that each one is answered from an index.
+"""
+import os
+
+import pytest
+
+import discovery
+
+USER_SHAPES = list(discovery.supported_user_queries())
+VIDEO_SHAPES = list(discovery.supported_video_queries())
+
+
+def _shape_id(shape) -> str:
+    args = shape[0]
+    return ",".join(f"{name}={value}" for name, value in args.items() if value is not None) or "defaults"
+
+
+def _equality_field(query: dict, field: str, value, known: list):
+    assert query[field] == (value if value else {"$in": known})
+
+
+def _rating_bounds(query: dict, field: str, min_rating, max_rating):
+    bounds = {}
+    if min_rating is not None:
+        bounds["$gte"] = min_rating
+    if max_rating is not None:
+        bounds["$lte"] = max_rating
+    if bounds:
+        assert query[field] == bounds
+    else:
+        assert field not in query
+
+
+def _served_by(query: dict, order: list, indexes: list) -> list:
+    """Indexes whose fields before the sort key are all pinned by the query
+    and whose sort key matches, so no blocking sort is needed"""
+    matches = []
+    for keys in indexes:
+        fields = [field for field, _ in keys]
+        sort_at = fields.index(order[0][0]) if order[0][0] in fields else None
+        if sort_at is None or keys[sort_at:] != order[:1] + [("id", 1)]:
+            continue
+        if all(field in query for field in fields[:sort_at]):
+            matches.append(keys)
+    return matches
+
+
+@pytest.mark.parametrize("shape", USER_SHAPES, ids=_shape_id)
+def test_user_query(shape):
+    args, query, order = shape
+    _equality_field(query, "profile_type", args["profile_type"], discovery.PROFILE_TYPES)
+    _equality_field(query, "verification_status", args["verification_status"], discovery.VERIFICATION_STATUSES)
+    if args["tags"]:
+        assert query["tags"] == {"$all": args["tags"]}
+    else:
+        assert "tags" not in query
+    _rating_bounds(query, "skill_rating", args["min_rating"], args["max_rating"])
+    sort_field = "skill_rating" if args["sort"] == "rating" else "created_at"
+    assert order == [(sort_field, -1), ("id", 1)]
+    assert _served_by(query, order, discovery.USER_INDEXES)
+
+
+@pytest.mark.parametrize("shape", VIDEO_SHAPES, ids=_shape_id)
+def test_video_query(shape):
+    args, query, order = shape
+    _equality_field(query, "category", args["category"], discovery.CATEGORIES)
+    _equality_field(query, "verification_status", args["verification_status"], discovery.VERIFICATION_STATUSES)
+    if args["genre"]:
+        assert query["genre"] == args["genre"]
+    else:
+        assert "genre" not in query
+    if args["tags"]:
+        assert query["ai_generated_tags"] == {"$all": args["tags"]}
+    else:
+        assert "ai_generated_tags" not in query
+    _rating_bounds(query, "ai_skill_rating", args["min_rating"], args["max_rating"])
+    sort_field = "ai_skill_rating" if args["sort"] == "rating" else "created_at"
+    assert order == [(sort_field, -1), ("id", 1)]
+    assert _served_by(query, order, discovery.VIDEO_INDEXES)
+
+
+def test_every_filter_combination_is_covered():
+    # 2 * 2 * 3 tag choices * 2 * 2 * 2 sorts, and twice that with genre
+    assert len(USER_SHAPES) == 96
+    assert len(VIDEO_SHAPES) == 192
+
+
+@pytest.mark.parametrize("build", [discovery.user_query, discovery.video_query])
+@pytest.mark.parametrize("args", [
+    {"tags": [f"tag{i}" for i in range(discovery.MAX_TAGS + 1)]},
+    {"min_rating": 9.0, "max_rating": 7.0},
+    {"sort": "views"},
+])
+def test_invalid_filters(build, args):
+    with pytest.raises(discovery.InvalidFilter):
+        build(**args)
+
+
+def test_blank_tags_are_ignored():
+    query, _ = discovery.user_query(tags=["", "salsa", ""])
+    assert query["tags"] == {"$all": ["salsa"]}
+    query, _ = discovery.video_query(tags=[""])
+    assert "ai_generated_tags" not in query
+
+
+def test_every_shape_avoids_collscan_and_blocking_sort(mongo_url):
+    from pymongo import MongoClient
+
+    from benchmarks import index_coverage
+
+    client = MongoClient(mongo_url)
+    db = client[f"{os.environ['DB_NAME']}_index_coverage"]
+    try:
+        db.users.insert_many([dict(user) for user in index_coverage.SAMPLE_USERS])
+        db.videos.insert_many([dict(video) for video in index_coverage.SAMPLE_VIDEOS])
+        index_coverage.create_indexes(db.users, discovery.USER_INDEXES)
+        index_coverage.create_indexes(db.videos, discovery.VIDEO_INDEXES)
+
+        failures = index_coverage.check(db.users, USER_SHAPES)
+        failures += index_coverage.check(db.videos, VIDEO_SHAPES)
+    finally:
+        client.drop_database(db.name)
+        client.close()
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,21 @@
+"""Video payload helpers."""
+import pytest
+
+import media
+
+
+@pytest.mark.parametrize("video_data, inline", [
+    ("data:video/mp4;base64,AAAAGGZ0eXA=", True),
+    ("/9j/4AAQSkZJRg==", True),
+    ("/api/videos/0d5e8a2c-1f4b-4c1e-9a57-3b1f0e6c2d11/media", False),
+    ("https://cdn.example.com/api/videos/0d5e8a2c/media", False),
+    ("", False),
+    (None, False),
+])
+def test_is_inline_payload(video_data, inline):
+    assert media.is_inline_payload(video_data) is inline
+
+
+def test_media_url_honours_the_media_base_url(monkeypatch):
+    monkeypatch.setenv("MEDIA_BASE_URL", "https://cdn.example.com")
+    assert media.media_url("v1") == "https://cdn.example.com/api/videos/v1/media"
@@ -0,0 +1,56 @@
+"""Change stream resume tokens survive reconnects unless history is lost."""
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from notifications import ChangeStreamSource, EventBus
+
+
+class FakeStream:
+    def __init__(self, token, error):
+        self.resume_token = token
+        self.error = error
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise self.error
+
+
+class FakeNotifications:
+    """Each watch() opens at the next token and fails with the next error"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.resumed_after = []
+
+    def watch(self, pipeline, resume_after=None):
+        self.resumed_after.append(resume_after)
+        if not self.outcomes:
+            raise asyncio.CancelledError()
+        return FakeStream(*self.outcomes.pop(0))
+
+
+@pytest.mark.anyio
+async def test_only_lost_history_discards_the_resume_token(monkeypatch):
+    async def no_wait(seconds):
+        pass
+
+    monkeypatch.setattr(asyncio, "sleep", no_wait)
+    notifications = FakeNotifications([
+        ("t0", AutoReconnect("primary stepped down")),
+        (None, AutoReconnect("still down")),
+        ("t1", OperationFailure("history lost", code=286)),
+        ("t2", OperationFailure("interrupted", code=11601)),
+    ])
+    with pytest.raises(asyncio.CancelledError):
+        await ChangeStreamSource(EventBus(), notifications)._run()
+    assert notifications.resumed_after == [None, "t0", "t0", None, "t2"]
@@ -0,0 +1,175 @@
+"""Every endpoint in ``querywatch.ROUTE_BUDGETS`` stays within its budget.
+
+Each case performs one representative request against a seeded database
+inside ``query_budget``, which fails on more Mongo commands than budgeted
+and on repeated query shapes (N+1 loops). Needs MongoDB, see conftest.py.
+"""
+import base64
+import hashlib
+import uuid
+
+import pytest
+
+from querywatch import ROUTE_BUDGETS
+
+pytestmark = pytest.mark.anyio
+
+VIDEO_BYTES = b"\x00\x00\x00\x18ftypmp42" + bytes(range(256)) * 8
+VIDEO_DATA = "data:video/mp4;base64," + base64.b64encode(VIDEO_BYTES).decode()
+
+
+def new_user(name: str) -> dict:
+    suffix = uuid.uuid4().hex[:8]
+    return {
+        "email": f"{name}-{suffix}@example.com",
+        "name": name.title(),
+        "username": f"{name}_{suffix}",
+        "profile_type": "dancer",
+        "tags": ["salsa", "tango"],
+    }
+
+
+async def register(api, name: str) -> str:
+    response = await api.post("/api/auth/register", json=new_user(name))
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+async def upload_video(api, user_id: str, title: str = "Salsa night") -> str:
+    response = await api.post("/api/videos", data={
+        "user_id": user_id, "title": title, "category": "solo", "video_data": VIDEO_DATA
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+async def open_upload(api, user_id: str) -> dict:
+    response = await api.post("/api/uploads", json={
+        "user_id": user_id, "title": "Chunked", "total_size": len(VIDEO_BYTES), "chunk_size": 256 * 1024
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def put_chunk(api, upload_id: str):
+    return await api.put(
+        f"/api/uploads/{upload_id}/chunks/0", content=VIDEO_BYTES,
+        headers={"X-Chunk-SHA256": hashlib.sha256(VIDEO_BYTES).hexdigest()},
+    )
+
+
+async def request_connection(api, from_user_id: str, to_user_id: str):
+    return await api.post("/api/connections", data={"from_user_id": from_user_id, "to_user_id": to_user_id})
+
+
+@pytest.fixture(scope="session")
+async def seeded(api):
+    """Two connected users with a video each, plus a transcoded rendition"""
+    import database
+
+    alice_profile = new_user("alice")
+    response = await api.post("/api/auth/register", json=alice_profile)
+    alice = response.json()["id"]
+    bob = await register(api, "bob")
+    video_id = await upload_video(api, alice)
+    await upload_video(api, bob, "Tango practice")
+    response = await request_connection(api, bob, alice)
+    await api.post(f"/api/connections/{response.json()['id']}/respond", data={"status": "accepted"})
+    await database.get_database().videos.update_one({"id": video_id}, {"$set": {
+        "ai_generated_tags": ["salsa"],
+        "renditions": [{"name": "240p", "width": 426, "height": 240, "bandwidth": 400000,
+                        "playlist": "rendition.m3u8"}],
+    }})
+    return {"alice": alice, "alice_email": alice_profile["email"], "bob": bob, "video_id": video_id}
+
+
+def _like(api, ids):
+    return api.post(f"/api/videos/{ids['video_id']}/like", data={"user_id": ids["bob"]})
+
+
+async def _complete_upload(api, ids):
+    upload = await open_upload(api, ids["alice"])
+    await put_chunk(api, upload["id"])
+    return upload["id"]
+
+
+async def _pending_connection(api, ids):
+    carol = await register(api, "carol")
+    return (await request_connection(api, carol, ids["alice"])).json()["id"]
+
+
+# endpoint: (setup run outside the budget or None, the request given the
+# setup's result, expected status)
+CASES = {
+    "POST /api/auth/register": (None, lambda api, ids, _: api.post(
+        "/api/auth/register", json=new_user("carol")), 200),
+    "POST /api/auth/username-availability": (None, lambda api, ids, _: api.post(
+        "/api/auth/username-availability", json={"usernames": ["alice", "nobody", "bob"]}), 200),
+    "POST /api/auth/login": (None, lambda api, ids, _: api.post(
+        "/api/auth/login", json={"email": ids["alice_email"], "password": "x"}), 200),
+    "GET /api/users/{user_id}": (None, lambda api, ids, _: api.get(f"/api/users/{ids['alice']}"), 200),
+    "GET /api/users": (None, lambda api, ids, _: api.get("/api/users"), 200),
+    "POST /api/videos": (None, lambda api, ids, _: api.post("/api/videos", data={
+        "user_id": ids["alice"], "title": "Budget", "video_data": VIDEO_DATA}), 200),
+    "POST /api/videos/upload-ticket": (None, lambda api, ids, _: api.post(
+        "/api/videos/upload-ticket", json={"user_id": ids["alice"], "size": 4096}), 200),
+    "GET /api/videos": (None, lambda api, ids, _: api.get("/api/videos?skip=200"), 200),
+    "GET /api/videos/{video_id}": (None, lambda api, ids, _: api.get(f"/api/videos/{ids['video_id']}"), 200),
+    "GET /api/videos/{video_id}/media": (None, lambda api, ids, _: api.get(
+        f"/api/videos/{ids['video_id']}/media"), 200),
+    "HEAD /api/videos/{video_id}/media": (None, lambda api, ids, _: api.head(
+        f"/api/videos/{ids['video_id']}/media"), 200),
+    "GET /api/videos/{video_id}/manifest.m3u8": (None, lambda api, ids, _: api.get(
+        f"/api/videos/{ids['video_id']}/manifest.m3u8"), 200),
+    # Unliking is the slow path: the like attempt misses, then the pull
+    "POST /api/videos/{video_id}/like": (_like, lambda api, ids, _: _like(api, ids), 200),
+    "POST /api/uploads": (None, lambda api, ids, _: api.post("/api/uploads", json={
+        "user_id": ids["alice"], "title": "Chunked", "total_size": 4096, "chunk_size": 256 * 1024}), 200),
+    "GET /api/uploads/{upload_id}": (
+        lambda api, ids: open_upload(api, ids["alice"]),
+        lambda api, ids, upload: api.get(f"/api/uploads/{upload['id']}"), 200),
+    "PUT /api/uploads/{upload_id}/chunks/{index}": (
+        lambda api, ids: open_upload(api, ids["alice"]),
+        lambda api, ids, upload: put_chunk(api, upload["id"]), 200),
+    "POST /api/uploads/{upload_id}/complete": (
+        _complete_upload,
+        lambda api, ids, upload_id: api.post(f"/api/uploads/{upload_id}/complete"), 200),
+    "DELETE /api/uploads/{upload_id}": (
+        lambda api, ids: open_upload(api, ids["alice"]),
+        lambda api, ids, upload: api.delete(f"/api/uploads/{upload['id']}"), 200),
+    "POST /api/connections": (
+        lambda api, ids: register(api, "carol"),
+        lambda api, ids, carol: request_connection(api, carol, ids["alice"]), 200),
+    "GET /api/connections/{user_id}": (None, lambda api, ids, _: api.get(f"/api/connections/{ids['alice']}"), 200),
+    "POST /api/connections/{connection_id}/respond": (
+        _pending_connection,
+        lambda api, ids, connection_id: api.post(
+            f"/api/connections/{connection_id}/respond", data={"status": "accepted"}), 200),
+    "GET /api/recommendations/{user_id}": (None, lambda api, ids, _: api.get(
+        f"/api/recommendations/{ids['bob']}"), 200),
+    "GET /api/feed/{user_id}": (None, lambda api, ids, _: api.get(f"/api/feed/{ids['bob']}"), 200),
+    "GET /api/search/videos": (None, lambda api, ids, _: api.get("/api/search/videos?q=salsa"), 200),
+    "GET /api/search/users": (None, lambda api, ids, _: api.get("/api/search/users?q=alice"), 200),
+    "GET /api/search/autocomplete": (None, lambda api, ids, _: api.get("/api/search/autocomplete?q=sal"), 200),
+    "GET /api/discover/users": (None, lambda api, ids, _: api.get(
+        "/api/discover/users?profile_type=dancer&tags=salsa"), 200),
+    "GET /api/discover/videos": (None, lambda api, ids, _: api.get(
+        "/api/discover/videos?category=solo&sort=recent"), 200),
+    "GET /api/trending": (None, lambda api, ids, _: api.get("/api/trending"), 200),
+    "GET /api/trending/top-rated-week": (None, lambda api, ids, _: api.get("/api/trending/top-rated-week"), 200),
+    "GET /api/trending/categories/{category}": (None, lambda api, ids, _: api.get(
+        "/api/trending/categories/solo"), 200),
+}
+
+
+def test_every_budgeted_route_has_a_case():
+    assert sorted(ROUTE_BUDGETS) == sorted(CASES)
+
+
+@pytest.mark.parametrize("endpoint", sorted(CASES))
+async def test_route_stays_within_budget(api, seeded, query_budget, endpoint):
+    setup, call, status = CASES[endpoint]
+    prepared = await setup(api, seeded) if setup is not None else None
+    with query_budget(endpoint):
+        response = await call(api, seeded, prepared)
+    assert response.status_code == status, response.text
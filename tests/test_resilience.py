@@ -0,0 +1,86 @@
+"""Circuit breaker states and the resilient call wrapper."""
+import asyncio
+
+import pytest
+
+from resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, call_with_resilience
+
+
+def tripped(**options) -> CircuitBreaker:
+    """A breaker opened by one failure that half-opens on the next call"""
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0, **options)
+    breaker.release(breaker.acquire(), False)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_failures_open_the_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.release(breaker.acquire(), False)
+    assert breaker.state == CLOSED
+    breaker.release(breaker.acquire(), False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.acquire()
+
+
+def test_probe_success_closes_and_failure_reopens():
+    breaker = tripped()
+    probe = breaker.acquire()
+    assert breaker.state == HALF_OPEN and probe is not None
+    with pytest.raises(CircuitOpen):
+        breaker.acquire()
+    breaker.release(probe, False)
+    assert breaker.state == OPEN
+
+    breaker.release(breaker.acquire(), True)
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_calls_admitted_while_closed_do_not_decide_the_half_open_state():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    slow = [breaker.acquire() for _ in range(3)]
+    breaker.release(breaker.acquire(), False)
+    probe = breaker.acquire()
+    assert breaker.state == HALF_OPEN
+
+    # The slow calls finish while the probe is in flight
+    breaker.release(slow[0], True)
+    breaker.release(slow[1], False)
+    breaker.release(slow[2], None)
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.acquire()
+    breaker.release(probe, True)
+    assert breaker.state == CLOSED
+
+
+def test_probes_of_an_earlier_half_open_period_are_ignored():
+    breaker = tripped(half_open_probes=2)
+    first, second = breaker.acquire(), breaker.acquire()
+    breaker.release(first, False)
+    assert breaker.state == OPEN
+    probe = breaker.acquire()
+    breaker.release(second, True)
+    assert breaker.state == HALF_OPEN
+    breaker.acquire()
+    with pytest.raises(CircuitOpen):
+        breaker.acquire()
+    breaker.release(probe, True)
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.anyio
+async def test_transient_failures_are_retried():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise asyncio.TimeoutError()
+        return "ok"
+
+    breaker = CircuitBreaker("test", failure_threshold=5)
+    assert await call_with_resilience(flaky, breaker, attempts=3, backoff_base=0) == "ok"
+    assert len(calls) == 3
+    assert breaker.state == CLOSED and breaker.failures == 0
@@ -0,0 +1,21 @@
+"""Search aggregation pipelines."""
+import search
+
+
+def test_default_projection_excludes_payload_fields():
+    pipeline = search.search_pipeline(None, {}, 20, exclude=["video_data"])
+    assert pipeline[-1] == {"$project": {"_id": 0, "search_terms": 0, "video_data": 0}}
+
+
+def test_fieldset_projection_keeps_the_cursor_keys():
+    projection = {"_id": 0, "id": 1, "title": 1}
+    pipeline = search.search_pipeline("salsa", {}, 20, projection=projection)
+    assert pipeline[-1] == {"$project": {"_id": 0, "id": 1, "title": 1, "score": 1}}
+    pipeline = search.search_pipeline(None, {}, 20, projection=projection)
+    assert pipeline[-1] == {"$project": {"_id": 0, "id": 1, "title": 1, "created_at": 1}}
+
+
+def test_fieldset_pages_carry_a_cursor():
+    documents = [{"id": str(i), "created_at": 100 - i} for i in range(3)]
+    page = search.paginate(documents, 2, None)
+    assert search.decode_cursor(page["next_cursor"]) == {"value": 99, "id": "1"}
@@ -0,0 +1,43 @@
+"""Timeline backfill and cleanup when connections change. Needs MongoDB."""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from timelines import BACKFILL_LENGTH, TimelineService
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def timeline_db(mongo_url):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[f"{os.environ['DB_NAME']}_timelines"]
+    yield db
+    await client.drop_database(db.name)
+    client.close()
+
+
+async def test_connect_backfills_each_author_and_disconnect_removes_them(timeline_db):
+    start = datetime(2026, 1, 1)
+    # The prolific author's videos are all newer than the other's
+    await timeline_db.videos.insert_many(
+        [{"id": f"p{i}", "user_id": "prolific", "created_at": start + timedelta(days=10, minutes=i)}
+         for i in range(BACKFILL_LENGTH + 10)]
+        + [{"id": f"q{i}", "user_id": "quiet", "created_at": start + timedelta(minutes=i)} for i in range(3)]
+    )
+    await timeline_db.users.insert_many([{"id": "prolific"}, {"id": "quiet"}])
+    service = TimelineService(timeline_db)
+
+    await service.connect("prolific", "quiet")
+    quiet_feed = await service.read("quiet", 100)
+    prolific_feed = await service.read("prolific", 100)
+    assert len(quiet_feed) == BACKFILL_LENGTH
+    assert {entry["user_id"] for entry in quiet_feed} == {"prolific"}
+    assert [entry["video_id"] for entry in prolific_feed] == ["q2", "q1", "q0"]
+
+    await service.disconnect("prolific", "quiet")
+    assert await service.read("quiet", 100) == []
+    assert await service.read("prolific", 100) == []
@@ -0,0 +1,86 @@
+"""Trending scores stay finite and ordered long after the decay epoch."""
+import math
+import os
+from datetime import datetime
+
+import pytest
+
+import trending
+
+YEAR = 365 * 24 * 3600
+
+
+@pytest.fixture
+def far_from_epoch(monkeypatch):
+    """Fifty years after the epoch with a one hour half-life: linear
+    weights would be around exp(300000)"""
+    monkeypatch.setenv("TRENDING_EPOCH", datetime.fromtimestamp(0).isoformat())
+    monkeypatch.setenv("TRENDING_HALF_LIFE_HOURS", "1")
+    return 50 * YEAR
+
+
+def test_log_weight_stays_finite(far_from_epoch):
+    weight = trending.log_weight("like", when=far_from_epoch)
+    assert math.isfinite(weight)
+    assert trending.log_weight("like", when=far_from_epoch) - trending.log_weight(
+        "view", when=far_from_epoch) == pytest.approx(math.log(5))
+    assert math.isfinite(trending.log_weight("view"))
+
+
+def test_log_add_matches_the_linear_sum():
+    weights = [math.log(2.0), math.log(1.0), math.log(5.0)]
+    assert trending.log_add(*weights) == pytest.approx(math.log(8.0))
+
+
+def test_log_add_ranks_by_decayed_engagement(far_from_epoch):
+    now = far_from_epoch
+    # Two half-lives old likes: 5 + 5 decayed to 2.5 now
+    old = trending.log_add(*[trending.log_weight("like", when=now - 2 * 3600)] * 2)
+    # Three fresh views
+    fresh = trending.log_weight("view", 3, when=now)
+    assert fresh > old
+    assert math.exp(fresh - old) == pytest.approx(3 / 2.5)
+
+
+@pytest.fixture
+def scores(mongo_url):
+    from pymongo import MongoClient
+
+    client = MongoClient(mongo_url)
+    collection = client[os.environ["DB_NAME"]]["trending_scores"]
+    yield collection
+    collection.drop()
+    client.close()
+
+
+def _apply(collection, fields: dict):
+    collection.update_one({"id": "v"}, [{"$set": fields}], upsert=True)
+    return collection.find_one({"id": "v"})["trend_log_score"]
+
+
+def test_score_pipelines_add_and_clear(scores, far_from_epoch):
+    like = trending.log_weight("like")
+    assert _apply(scores, trending.add_score("like")) == pytest.approx(like, abs=1e-3)
+    assert _apply(scores, trending.add_score("like")) == pytest.approx(like + math.log(2), abs=1e-3)
+    assert _apply(scores, trending.remove_score("like")) == pytest.approx(like, abs=1e-3)
+    # Whatever is left is within rounding of zero and gets cleared
+    assert _apply(scores, trending.remove_score("like")) is None
+    assert _apply(scores, trending.remove_score("like")) is None
+    assert _apply(scores, trending.add_score("view")) == pytest.approx(trending.log_weight("view"), abs=1e-3)
+
+
+def test_top_rated_week_avoids_collscan_and_blocking_sort(scores):
+    from benchmarks.index_coverage import FORBIDDEN_STAGES, plan_stages
+
+    videos = scores.database["trending_videos"]
+    try:
+        videos.insert_many([
+            {"id": f"v{i}", "ai_skill_rating": 5.0 + i % 5, "created_at": datetime(2026, 1, 1 + i)}
+            for i in range(20)
+        ])
+        videos.create_index(trending.TOP_RATED_SORT)
+        explain = videos.find(trending.top_rated_query(datetime(2026, 1, 10))).sort(
+            trending.TOP_RATED_SORT).limit(trending.BOARD_SIZE).explain()
+    finally:
+        videos.drop()
+    assert not plan_stages(explain["queryPlanner"]["winningPlan"]) & FORBIDDEN_STAGES